@@ -1,19 +1,22 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtWidgets import (
     QMainWindow, QApplication, QVBoxLayout, QHBoxLayout, QWidget,
-    QLabel, QPushButton, QTextEdit, QComboBox, QTableWidget, QTableWidgetItem,
+    QLabel, QPushButton, QTextEdit, QComboBox, QTableView,
     QMessageBox, QHeaderView, QCompleter
 )
 from PyQt5.QtCore import Qt
 
 from utils import (
-    get_all_companies,
     fetch_company_info,
     fetch_all_watchlist,
     add_to_watchlist_api,
     remove_from_watchlist_api,
     toggle_watchlist_status_api
 )
+from workers import RequestPool
+from symbol_directory import SymbolDirectory
+from symbol_model import SymbolListModel, SymbolSearchModel
+from watchlist_model import WatchlistModel, ButtonDelegate, TOGGLE, REMOVE
 
 
 class StockApp(QMainWindow):
@@ -52,7 +55,10 @@ class StockApp(QMainWindow):
             }
         """)
 
-        self.all_companies = []
+        self.directory = None
+        self._info_symbol = None
+        # Every network call runs here; handlers only update widgets
+        self.requests = RequestPool(parent=self)
         self.setup_ui()
         self.load_companies()
         self.load_watchlist()
@@ -93,13 +99,23 @@ class StockApp(QMainWindow):
         main_layout.addWidget(label)
 
         # ---- Watchlist Table ----
-        self.table_watchlist = QTableWidget()
-        self.table_watchlist.setColumnCount(4)
-        self.table_watchlist.setHorizontalHeaderLabels(["Symbol", "Status", "Toggle", "Remove"])
+        self.watchlist_model = WatchlistModel(self)
+        self.table_watchlist = QTableView()
+        self.table_watchlist.setModel(self.watchlist_model)
+        self.table_watchlist.setMouseTracking(True)
+        self.table_watchlist.verticalHeader().setVisible(False)
+        self.table_watchlist.verticalHeader().setDefaultSectionSize(36)
         self.table_watchlist.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table_watchlist.setAlternatingRowColors(True)
+
+        toggle_delegate = ButtonDelegate("#388E3C", self.table_watchlist)
+        remove_delegate = ButtonDelegate("#D32F2F", self.table_watchlist)
+        toggle_delegate.clicked.connect(lambda row: self.toggle_status(self.watchlist_model.symbol_at(row)))
+        remove_delegate.clicked.connect(lambda row: self.remove_from_watchlist_direct(self.watchlist_model.symbol_at(row)))
+        self.table_watchlist.setItemDelegateForColumn(TOGGLE, toggle_delegate)
+        self.table_watchlist.setItemDelegateForColumn(REMOVE, remove_delegate)
         self.table_watchlist.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #ffffff;
                 alternate-background-color: #f0f2f5;
                 border: 1px solid #ccc;
@@ -122,133 +138,147 @@ class StockApp(QMainWindow):
         self.btn_add_watchlist.clicked.connect(self.add_to_watchlist)
         self.btn_remove_watchlist.clicked.connect(self.remove_from_watchlist)
 
-    # ----------------- LOAD COMPANIES -----------------
     # ----------------- LOAD COMPANIES -----------------
     def load_companies(self):
-        self.all_companies = get_all_companies()
-        if not self.all_companies:
-            QMessageBox.warning(self, "Error", "Failed to load company symbols.")
+        try:
+            self.directory = SymbolDirectory.load()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to load company symbols.\n{e}")
             return
-    
-        cleaned_companies = []
-        for symbol, name in self.all_companies:
-            clean_symbol = symbol.strip().upper()
-            clean_name = name.split(" - ")[0].strip()
-            cleaned_companies.append((clean_symbol, clean_name))
-    
-        # Sort by symbol
-        cleaned_companies.sort(key=lambda x: x[0])
-    
-        self.combo_companies.clear()
-    
-        for symbol, name in cleaned_companies:
-            display_text = f"{symbol} – {name}"
-            self.combo_companies.addItem(display_text, userData=symbol)
-    
-        # Enable search completer
-        completer = QCompleter([f"{s} – {n}" for s, n in cleaned_companies])
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.combo_companies.setCompleter(completer)
-    
-        # Save cleaned data for later reference
-        self.all_companies = cleaned_companies
-    
+
+        # Typing searches the directory's index; the popup shows ranked hits
+        self.search_model = SymbolSearchModel(self.directory, self)
+        completer = QCompleter(self.search_model, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.setMaxVisibleItems(12)
+        completer.activated[QtCore.QModelIndex].connect(
+            lambda index: self.select_company(self.search_model.directory_row(index))
+        )
+
         # ---------------- UX IMPROVEMENTS ----------------
         self.combo_companies.setEditable(True)
         line_edit = self.combo_companies.lineEdit()
-    
+        # Replaces the combo's own completer, which would page in every row
+        line_edit.setCompleter(completer)
+
+        # The dropdown pulls rows in batches as it scrolls instead of holding
+        # one item per listed company
+        self.symbol_model = SymbolListModel(self.directory, self)
+        self.combo_companies.setModel(self.symbol_model)
+        self.combo_companies.setInsertPolicy(QComboBox.NoInsert)
+
         # --- Clear only once on first edit ---
         self._first_edit = True
-    
-        def handle_first_edit():
+
+        def handle_edit(text):
             if self._first_edit:
                 line_edit.clear()
                 self._first_edit = False
-    
-        line_edit.textEdited.connect(handle_first_edit)
-    
+                text = ""
+            if self.search_model.search(text):
+                completer.complete()
+
+        line_edit.textEdited.connect(handle_edit)
+
         # --- Show info automatically on Enter ---
         line_edit.returnPressed.connect(self.show_company_info)
-    
 
+    def select_company(self, row):
+        """Make directory row `row` the current dropdown entry."""
+        self.symbol_model.ensure_loaded(row)
+        self.combo_companies.setCurrentIndex(row)
+
+    def selected_symbol(self):
+        """
+        Ticker for the search box: the current entry, or the best match for
+        typed text that doesn't name it.
+        """
+        text = self.combo_companies.currentText().strip()
+        if not text or self.directory is None:
+            return self.combo_companies.currentData()
+        row = self.combo_companies.currentIndex()
+        if row < 0 or self.directory.labels[row] != text:
+            hits = self.directory.search(text, 1)
+            if not hits:
+                return None
+            self.select_company(hits[0])
+        return self.combo_companies.currentData()
 
     # ----------------- SHOW COMPANY INFO -----------------
     def show_company_info(self):
-        current_text = self.combo_companies.currentText()
-        if not current_text:
+        # Use the actual symbol
+        symbol = self.selected_symbol()
+        if not symbol:
             QMessageBox.warning(self, "Select Company", "Please select a company first.")
             return
-        # Use the actual symbol
-        symbol = self.combo_companies.currentData()
-        info = fetch_company_info(symbol)
-        self.txt_company_info.setPlainText(info)
+        self._info_symbol = symbol
+        self.txt_company_info.setPlainText(f"Loading {symbol}...")
+
+        def show(info):
+            # Ignore answers for a company the user has already moved away from
+            if symbol == self._info_symbol:
+                self.txt_company_info.setPlainText(info)
+
+        self.requests.submit(("info", symbol), fetch_company_info, symbol, on_done=show)
+
+    # ----------------- WATCHLIST MUTATIONS -----------------
+    def _mutate(self, action, api_call, symbol, done_message, error_message, on_success=None):
+        """Run a watchlist call off the UI thread, then re-sync the table."""
+        self.watchlist_model.set_pending(symbol)
+
+        def done(success):
+            if success:
+                if on_success:
+                    on_success()
+                self.statusBar().showMessage(done_message, 4000)
+            else:
+                self.watchlist_model.set_pending(symbol, False)
+                QMessageBox.warning(self, "Error", error_message)
+            self.load_watchlist()
+
+        def failed(message):
+            self.watchlist_model.set_pending(symbol, False)
+            QMessageBox.warning(self, "Error", f"{error_message}\n{message}")
+
+        self.requests.submit((action, symbol), api_call, symbol, on_done=done, on_error=failed)
+
     # ----------------- ADD TO WATCHLIST -----------------
-    # Example: Add to watchlist button
     def add_to_watchlist(self):
-        symbol = self.combo_companies.currentData()  # <--- Use currentData() instead of currentText()
+        symbol = self.selected_symbol()
         if not symbol:
             QMessageBox.warning(self, "Select Company", "Please select a company first.")
             return
-
-        success = add_to_watchlist_api(symbol)
-        if success:
-            QMessageBox.information(self, "Success", f"{symbol} added to watchlist.")
-            self.load_watchlist()  # reload watchlist table
-        else:
-            QMessageBox.warning(self, "Error", f"Failed to add {symbol} to watchlist.")
-
+        self._mutate("add", add_to_watchlist_api, symbol,
+                     f"{symbol} added to watchlist.", f"Failed to add {symbol} to watchlist.")
 
     # ----------------- REMOVE FROM WATCHLIST -----------------
     def remove_from_watchlist(self):
-        current_text = self.combo_companies.currentText()
-        if not current_text:
+        symbol = self.selected_symbol()
+        if not symbol:
             return
-        symbol = current_text.split("(")[-1].strip(")")
-        if remove_from_watchlist_api(symbol):
-            QMessageBox.information(self, "Success", f"{symbol} removed from watchlist.")
-            self.load_watchlist()
-        else:
-            QMessageBox.warning(self, "Error", "Failed to remove company.")
+        self.remove_from_watchlist_direct(symbol)
 
     # ----------------- LOAD WATCHLIST -----------------
     def load_watchlist(self):
-        self.table_watchlist.setRowCount(0)
-        watchlist = fetch_all_watchlist()
-        for row, item in enumerate(watchlist):
-            symbol = item["symbol"]
-            status = "🟢 Active" if item["active"] else "⚪ Inactive"
-
-            self.table_watchlist.insertRow(row)
-            self.table_watchlist.setItem(row, 0, QTableWidgetItem(symbol))
-            self.table_watchlist.setItem(row, 1, QTableWidgetItem(status))
-
-            btn_toggle = QPushButton("Toggle")
-            btn_remove = QPushButton("Remove")
-
-            btn_toggle.setStyleSheet("background-color:#388E3C;")
-            btn_remove.setStyleSheet("background-color:#D32F2F;")
-
-            btn_toggle.clicked.connect(lambda _, s=symbol: self.toggle_status(s))
-            btn_remove.clicked.connect(lambda _, s=symbol: self.remove_from_watchlist_direct(s))
-
-            self.table_watchlist.setCellWidget(row, 2, btn_toggle)
-            self.table_watchlist.setCellWidget(row, 3, btn_remove)
+        # A reload requested while one is running runs once more afterwards,
+        # so the table reflects mutations that landed in between
+        self.requests.submit(
+            "watchlist", fetch_all_watchlist, True,
+            on_done=self.watchlist_model.apply,
+            on_error=lambda message: self.statusBar().showMessage(f"Failed to load watchlist: {message}", 6000),
+            rerun=True,
+        )
 
     # ----------------- TOGGLE WATCHLIST STATUS -----------------
     def toggle_status(self, symbol):
-        if toggle_watchlist_status_api(symbol):
-            QMessageBox.information(self, "Success", f"{symbol} status toggled.")
-            self.load_watchlist()
-        else:
-            QMessageBox.warning(self, "Error", "Failed to toggle status.")
+        self._mutate("toggle", toggle_watchlist_status_api, symbol,
+                     f"{symbol} status toggled.", "Failed to toggle status.")
 
     # ----------------- REMOVE DIRECT -----------------
     def remove_from_watchlist_direct(self, symbol):
-        if remove_from_watchlist_api(symbol):
-            QMessageBox.information(self, "Success", f"{symbol} removed.")
-            self.load_watchlist()
-        else:
-            QMessageBox.warning(self, "Error", "Failed to remove company.")
+        self._mutate("remove", remove_from_watchlist_api, symbol,
+                     f"{symbol} removed.", "Failed to remove company.",
+                     on_success=lambda: self.watchlist_model.remove(symbol))
 
 
 # ----------------- MAIN -----------------
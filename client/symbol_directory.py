@@ -0,0 +1,179 @@
+"""
+Symbol directory for the search box.
+
+Parses the NASDAQ Trader listing files (data/nasdaqlisted.txt and
+data/otherlisted.txt) into one symbol-sorted table, caches the result in
+data/symbols.cache.npz (rebuilt when a source file's mtime or size
+changes) and indexes it for ranked prefix/substring search over symbol and
+company name.
+
+    python symbol_directory.py [QUERY ...]   # load/search timings
+"""
+import json
+import re
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+import numpy as np
+
+DATA_DIR = Path(__file__).parent / "data"
+SOURCES = ("nasdaqlisted.txt", "otherlisted.txt")
+CACHE_FILE = "symbols.cache.npz"
+CACHE_VERSION = 1
+
+
+# ----------------- Parsing -----------------
+def parse_listing(path):
+    """
+    One listing file as a (symbol, name) DataFrame, vectorized.
+
+    nasdaqlisted.txt has a Symbol column, otherlisted.txt an ACT Symbol
+    column; test issues and the trailing "File Creation Time" line are dropped.
+    """
+    import pandas as pd
+    df = pd.read_csv(path, sep="|", dtype=str, keep_default_na=False, encoding="utf-8")
+    symbol_col = "Symbol" if "Symbol" in df.columns else "ACT Symbol"
+    if "Test Issue" in df.columns:
+        df = df[df["Test Issue"] != "Y"]
+    out = pd.DataFrame({
+        "symbol": df[symbol_col].str.strip().str.upper(),
+        # "Apple Inc. - Common Stock" -> "Apple Inc."
+        "name": df["Security Name"].str.split(" - ", n=1).str[0].str.strip(),
+    })
+    return out[(out["symbol"] != "") & (out["name"] != "") & ~out["symbol"].str.startswith("FILE CREATION TIME")]
+
+def _fingerprint(paths):
+    return [[p.name, p.stat().st_mtime_ns, p.stat().st_size] for p in paths]
+
+
+class SymbolDirectory:
+    """
+    Symbols sorted by ticker with their company names; row ids are positions
+    in that order. Build one with load().
+    """
+
+    def __init__(self, symbols, names):
+        self.symbols = list(symbols)
+        self.names = list(names)
+        self.labels = [f"{s} – {n}" for s, n in zip(self.symbols, self.names)]
+        self._build_index()
+
+    # ----------------- Loading -----------------
+    @classmethod
+    def load(cls, data_dir=None):
+        """Load from the cache if it matches the source files, else parse and rewrite it."""
+        data_dir = Path(data_dir or DATA_DIR)
+        paths = [data_dir / name for name in SOURCES]
+        missing = [str(p) for p in paths if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"{', '.join(missing)} does not exist")
+
+        fingerprint = _fingerprint(paths)
+        cache = data_dir / CACHE_FILE
+        try:
+            with np.load(cache, allow_pickle=False) as stored:
+                meta = json.loads(str(stored["meta"]))
+                if meta == {"version": CACHE_VERSION, "sources": fingerprint}:
+                    return cls(stored["symbols"].tolist(), stored["names"].tolist())
+        except (OSError, KeyError, ValueError):
+            pass
+
+        import pandas as pd
+        table = pd.concat([parse_listing(p) for p in paths], ignore_index=True)
+        table = table.drop_duplicates("symbol").sort_values("symbol", kind="stable")
+        directory = cls(table["symbol"].tolist(), table["name"].tolist())
+        try:
+            tmp = cache.with_suffix(".tmp.npz")
+            np.savez(tmp, symbols=np.array(directory.symbols), names=np.array(directory.names),
+                     meta=np.array(json.dumps({"version": CACHE_VERSION, "sources": fingerprint})))
+            tmp.replace(cache)
+        except OSError as e:
+            print(f"Could not write symbol cache: {e}")
+        return directory
+
+    # ----------------- Index -----------------
+    def _build_index(self):
+        lower_symbols = [s.lower() for s in self.symbols]
+        lower_names = [n.lower() for n in self.names]
+        # Symbols are already sorted, so prefix matches are one bisect range
+        self._symbol_keys = lower_symbols
+        # Every word of every name, sorted, for word-prefix lookups
+        words = sorted((word, i) for i, name in enumerate(lower_names) for word in set(re.findall(r"\w+", name)))
+        self._word_keys = [w for w, _ in words]
+        self._word_ids = [i for _, i in words]
+        self._name_order = sorted(range(len(lower_names)), key=lower_names.__getitem__)
+        self._name_keys = [lower_names[i] for i in self._name_order]
+        # One haystack for substring scans; str.find runs in C
+        self._haystack = "\n".join(f"{s}\t{n}" for s, n in zip(lower_symbols, lower_names)) + "\n"
+        self._line_starts = []
+        offset = 0
+        for s, n in zip(lower_symbols, lower_names):
+            self._line_starts.append(offset)
+            offset += len(s) + len(n) + 2
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        return bisect_left(keys, prefix), bisect_right(keys, prefix + "￿")
+
+    def search(self, query, limit=50):
+        """
+        Row ids matching `query`, best first: exact symbol, symbol prefix,
+        name prefix, name word prefix, then substring of symbol or name.
+        Within a rank, symbols come alphabetically and names by the matched
+        word. Stops as soon as `limit` ids are found.
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(range(min(limit, len(self.symbols))))
+
+        found = {}
+
+        def take(ids):
+            for i in ids:
+                if len(found) >= limit:
+                    return
+                found.setdefault(i, None)
+
+        lo, hi = self._prefix_range(self._symbol_keys, query)
+        # The exact ticker, if any, sorts first in its own prefix range
+        take(range(lo, hi))
+        lo, hi = self._prefix_range(self._name_keys, query)
+        take(self._name_order[i] for i in range(lo, hi))
+        lo, hi = self._prefix_range(self._word_keys, query)
+        take(self._word_ids[i] for i in range(lo, hi))
+
+        start = self._haystack.find(query) if len(found) < limit else -1
+        while start != -1 and len(found) < limit:
+            row = bisect_right(self._line_starts, start) - 1
+            take([row])
+            next_line = self._line_starts[row + 1] if row + 1 < len(self._line_starts) else len(self._haystack)
+            start = self._haystack.find(query, next_line)
+        return list(found)
+
+    def row_of(self, symbol):
+        """Row id of an exact ticker, or -1."""
+        key = symbol.strip().lower()
+        row = bisect_left(self._symbol_keys, key)
+        return row if row < len(self._symbol_keys) and self._symbol_keys[row] == key else -1
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def main(argv=None):
+    import sys
+    queries = (argv if argv is not None else sys.argv[1:]) or ["a", "app", "apple", "bank", "corp", "zz"]
+    began = time.perf_counter()
+    directory = SymbolDirectory.load()
+    print(f"loaded {len(directory)} symbols in {(time.perf_counter() - began) * 1000:.1f} ms")
+    for query in queries:
+        began = time.perf_counter()
+        for _ in range(100):
+            rows = directory.search(query, 20)
+        per_search = (time.perf_counter() - began) / 100
+        print(f"{query!r:>10}: {per_search * 1e6:7.0f} us  {[directory.symbols[i] for i in rows[:5]]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+# Rows handed to the view per fetchMore()
+BATCH_SIZE = 500
+
+
+class SymbolListModel(QAbstractListModel):
+    """
+    The whole SymbolDirectory as a list, exposed in batches: the view only
+    sees rows it has scrolled to, so no item exists for the ~10k symbols
+    nobody looks at. DisplayRole is the "SYMBOL – Name" label, UserRole the
+    ticker, matching what QComboBox.currentData() reads.
+    """
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self._loaded = min(BATCH_SIZE, len(directory))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.directory.labels[index.row()]
+        if role == Qt.UserRole:
+            return self.directory.symbols[index.row()]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self.directory)
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.ensure_loaded(self._loaded + BATCH_SIZE - 1)
+
+    def ensure_loaded(self, row):
+        """Expose rows up to and including `row`, e.g. before selecting it."""
+        last = min(row, len(self.directory) - 1)
+        if last >= self._loaded:
+            self.beginInsertRows(QModelIndex(), self._loaded, last)
+            self._loaded = last + 1
+            self.endInsertRows()
+
+
+class SymbolSearchModel(QAbstractListModel):
+    """The ranked hits of the current query, for the search box's completer."""
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.directory.labels[row]
+        if role == Qt.UserRole:
+            return row
+        return None
+
+    def search(self, query, limit=50):
+        """Replace the hits with the best `limit` matches for `query`."""
+        self.beginResetModel()
+        self._rows = self.directory.search(query, limit)
+        self.endResetModel()
+        return len(self._rows)
+
+    def directory_row(self, index):
+        return self._rows[index.row()]
@@ -1,69 +1,59 @@
-from pathlib import Path
-import pandas as pd
 import yfinance as yf
 import requests
 
+from symbol_directory import SymbolDirectory
+
 API_BASE = "http://127.0.0.1:8000"
+# Seconds before a REST call gives up; calls run on worker threads, so this
+# bounds how long an action can stay pending, not how long the UI freezes
+REQUEST_TIMEOUT = 10
+
+# One keep-alive connection pool for every API call
+session = requests.Session()
 
 # ----------------- API HELPERS -----------------
-def fetch_all_watchlist():
+def fetch_all_watchlist(raise_errors=False):
+    """Returns [] on errors unless raise_errors is set, so callers can tell "empty" from "failed"."""
     try:
-        resp = requests.get(f"{API_BASE}/watchlist/all")
-        print(resp)
+        resp = session.get(f"{API_BASE}/watchlist/all", timeout=REQUEST_TIMEOUT)
         resp.raise_for_status()
         return resp.json()["watchlist"]
-    except:
+    except Exception:
+        if raise_errors:
+            raise
         return []
 
 def add_to_watchlist_api(symbol):
     try:
-        resp = requests.post(f"{API_BASE}/watchlist/add", json={"symbol": symbol})
+        resp = session.post(f"{API_BASE}/watchlist/add", json={"symbol": symbol}, timeout=REQUEST_TIMEOUT)
         return resp.status_code == 200
     except:
         return False
 
 def remove_from_watchlist_api(symbol):
     try:
-        resp = requests.post(f"{API_BASE}/watchlist/remove", json={"symbol": symbol})
+        resp = session.post(f"{API_BASE}/watchlist/remove", json={"symbol": symbol}, timeout=REQUEST_TIMEOUT)
         return resp.status_code == 200
     except:
         return False
 
 def toggle_watchlist_status_api(symbol):
     try:
-        resp = requests.post(f"{API_BASE}/watchlist/toggle", json={"symbol": symbol})
+        resp = session.post(f"{API_BASE}/watchlist/toggle", json={"symbol": symbol}, timeout=REQUEST_TIMEOUT)
         return resp.status_code == 200
     except:
         return False
 
 # ----------------- LOCAL CSV COMPANIES -----------------
-from pathlib import Path
-import pandas as pd
-import yfinance as yf
 
 def get_all_companies():
+    """(symbol, name) pairs sorted by name, from the cached symbol directory."""
     try:
-        base_path = Path(__file__).parent / "data"
-        nasdaq_file = base_path / "nasdaqlisted.txt"
-        other_file = base_path / "otherlisted.txt"
-
-        all_companies = []
-
-        for file in [nasdaq_file, other_file]:
-            if not file.exists():
-                raise FileNotFoundError(f"{file} does not exist")
-            
-            df = pd.read_csv(file, sep="|", encoding="utf-8", dtype=str)
-            df.fillna("", inplace=True)
-            for _, row in df.iterrows():
-                symbol = row.get("Symbol", "").strip()
-                name = row.get("Security Name", "").strip()
-                if symbol and name:
-                    all_companies.append((symbol, name))
-
+        directory = SymbolDirectory.load()
+        pairs = list(zip(directory.symbols, directory.names))
         # Sort alphabetically by company name
-        all_companies.sort(key=lambda x: x[1].lower())
-        return all_companies
+        pairs.sort(key=lambda x: x[1].lower())
+        return pairs
 
     except Exception as e:
         print(f"Error loading companies: {e}")
@@ -71,10 +61,26 @@ def get_all_companies():
 
 
 # ----------------- FETCH COMPANY INFO -----------------
+def fetch_company_profile(symbol):
+    """
+    Profile fields for `symbol` from the API's shared cache, falling back to
+    yfinance when the API can't be reached.
+    """
+    try:
+        response = session.get(f"{API_BASE}/company/{symbol}", timeout=REQUEST_TIMEOUT)
+    except requests.RequestException:
+        return yf.Ticker(symbol).info
+    if response.status_code == 404:
+        return {}
+    response.raise_for_status()
+    return response.json()["profile"]
+
+
 def fetch_company_info(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = fetch_company_profile(symbol)
+        if not info:
+            return f"No details found for {symbol}"
         details = (
             f"Name: {info.get('shortName','N/A')}\n"
             f"Symbol: {symbol}\n"
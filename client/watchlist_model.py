@@ -0,0 +1,153 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QRectF, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPainterPath
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+
+SYMBOL, STATUS, TOGGLE, REMOVE = range(4)
+HEADERS = ["Symbol", "Status", "Toggle", "Remove"]
+
+
+class WatchlistModel(QAbstractTableModel):
+    """
+    Watchlist rows as {"symbol", "active"} dicts. apply() diffs a fresh server
+    list against the current rows and emits only row inserts, removals and
+    changes, so the view keeps its scroll position and selection and nothing
+    is rebuilt for rows that didn't change.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._index = {}
+        self._pending = set()
+
+    # ----------------- Qt model API -----------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == SYMBOL:
+                return row["symbol"]
+            if column == STATUS:
+                if row["symbol"] in self._pending:
+                    return "⏳ Updating"
+                return "🟢 Active" if row["active"] else "⚪ Inactive"
+            if column == TOGGLE:
+                return "Toggle"
+            if column == REMOVE:
+                return "Remove"
+        if role == Qt.UserRole:
+            return row["symbol"]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable if index.isValid() else Qt.NoItemFlags
+
+    # ----------------- Updates -----------------
+    def symbol_at(self, row):
+        return self._rows[row]["symbol"]
+
+    def _reindex(self):
+        self._index = {row["symbol"]: i for i, row in enumerate(self._rows)}
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+
+    def apply(self, items):
+        """Bring the rows in line with `items`, emitting row-level changes only."""
+        incoming = {item["symbol"]: bool(item["active"]) for item in items}
+
+        gone = sorted((i for i, row in enumerate(self._rows) if row["symbol"] not in incoming), reverse=True)
+        # Remove contiguous runs bottom-up so earlier row numbers stay valid
+        while gone:
+            last = first = gone.pop(0)
+            while gone and gone[0] == first - 1:
+                first = gone.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        self._reindex()
+
+        for i, row in enumerate(self._rows):
+            active = incoming[row["symbol"]]
+            if row["active"] != active or row["symbol"] in self._pending:
+                row["active"] = active
+                self._pending.discard(row["symbol"])
+                self._row_changed(i)
+
+        new = [{"symbol": s, "active": a} for s, a in incoming.items() if s not in self._index]
+        if new:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(new) - 1)
+            self._rows.extend(new)
+            self.endInsertRows()
+            self._reindex()
+
+    def set_pending(self, symbol, pending=True):
+        """Mark a row as waiting on a server round trip."""
+        row = self._index.get(symbol)
+        if row is None:
+            return
+        if pending:
+            self._pending.add(symbol)
+        else:
+            self._pending.discard(symbol)
+        self._row_changed(row)
+
+    def set_active(self, symbol, active):
+        row = self._index.get(symbol)
+        if row is not None:
+            self._rows[row]["active"] = active
+            self._pending.discard(symbol)
+            self._row_changed(row)
+
+    def remove(self, symbol):
+        row = self._index.get(symbol)
+        if row is not None:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            self.endRemoveRows()
+            self._pending.discard(symbol)
+            self._reindex()
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """
+    Paints a column as buttons and reports clicks by row, instead of one
+    QPushButton widget per cell.
+    """
+
+    clicked = pyqtSignal(int)
+
+    def __init__(self, color, parent=None):
+        super().__init__(parent)
+        self.color = QColor(color)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRectF(option.rect.adjusted(6, 4, -6, -4))
+        path = QPainterPath()
+        path.addRoundedRect(rect, 8, 8)
+        color = self.color.darker(115) if option.state & QStyle.State_MouseOver else self.color
+        painter.fillPath(path, color)
+        painter.setPen(Qt.white)
+        painter.drawText(rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and option.rect.contains(event.pos()):
+            self.clicked.emit(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
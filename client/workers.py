@@ -0,0 +1,81 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _Signals(QObject):
+    # Emitted from pool threads; Qt queues delivery onto the GUI thread
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+
+class _Job(QRunnable):
+    def __init__(self, key, fn, args, signals):
+        super().__init__()
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self.key, str(e))
+        else:
+            self.signals.finished.emit(self.key, result)
+
+
+class RequestPool(QObject):
+    """
+    Runs blocking calls (REST requests, yfinance lookups) on a QThreadPool and
+    hands results back to callbacks on the GUI thread.
+
+    Requests are keyed: submitting a key that is already in flight doesn't
+    start a second call, its callbacks are attached to the running one. With
+    rerun=True the call is repeated once after the running one finishes, for
+    reads that must reflect a mutation made while they were in flight.
+    """
+
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.signals = _Signals()
+        self.signals.finished.connect(self._finished)
+        self.signals.failed.connect(self._failed)
+        self._in_flight = {}
+        self._rerun = {}
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, rerun=False):
+        callbacks = (on_done, on_error)
+        if key in self._in_flight:
+            if rerun:
+                self._rerun[key] = (fn, args)
+            self._in_flight[key].append(callbacks)
+            return False
+        self._in_flight[key] = [callbacks]
+        self.pool.start(_Job(key, fn, args, self.signals))
+        return True
+
+    def in_flight(self, key):
+        return key in self._in_flight
+
+    def _complete(self, key, index, value):
+        callbacks = self._in_flight.pop(key, [])
+        again = self._rerun.pop(key, None)
+        if again is not None:
+            # Callbacks wait for the fresh result
+            self._in_flight[key] = callbacks
+            self.pool.start(_Job(key, again[0], again[1], self.signals))
+            return
+        for callback in (c[index] for c in callbacks):
+            if callback is not None:
+                callback(value)
+
+    def _finished(self, key, result):
+        self._complete(key, 0, result)
+
+    def _failed(self, key, message):
+        self._complete(key, 1, message)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
@@ -0,0 +1,53 @@
+"""
+Compare the per-symbol fetch loop against fetch_stock_data_batch, offline,
+using recorded fixtures.
+
+    # record fixtures once (needs network)
+    python benchmarks/bench_fetch.py --fixtures fixtures/ --record AAPL MSFT GOOG
+
+    # benchmark offline
+    python benchmarks/bench_fetch.py --fixtures fixtures/
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tracker")))
+
+from api_fetcher import FixtureProvider, YFinanceProvider, fetch_stock_data, fetch_stock_data_batch
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", required=True, help="Directory of <SYMBOL>.csv fixtures")
+    parser.add_argument("--record", nargs="*", help="Record these symbols from yfinance first")
+    parser.add_argument("--period", default="1mo")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        FixtureProvider.record(YFinanceProvider(), args.record, args.fixtures, period=args.period)
+
+    provider = FixtureProvider(args.fixtures)
+    symbols = sorted(f[:-4] for f in os.listdir(args.fixtures) if f.endswith(".csv"))
+
+    loop = timed(lambda: [fetch_stock_data(s, provider=provider) for s in symbols], args.repeat)
+    batch = timed(lambda: fetch_stock_data_batch(symbols, provider=provider), args.repeat)
+
+    print(f"symbols: {len(symbols)}")
+    print(f"per-symbol loop: {loop * 1000:.1f} ms")
+    print(f"batch:           {batch * 1000:.1f} ms ({loop / batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Load-test the ingest pipeline offline with the replay provider.
+
+Records --symbols synthetic histories (FakeProvider) as replay CSVs, then
+runs IngestPipeline against them: one full backfill followed by --days
+incremental runs, advancing the replay clock one day per run, exactly like a
+daily cron. Runs are deterministic: same flags, same bars. Rows go to a
+scratch MySQL database (DB_* settings from .env) unless --no-db is given, in
+which case the writer only counts them.
+
+    python benchmarks/bench_replay.py --symbols 500 --days 5
+    python benchmarks/bench_replay.py --replay-dir benchmarks/fixtures --no-db
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "tracker"))
+sys.path.insert(0, ROOT)
+
+import config
+from api_fetcher import FakeProvider, FixtureProvider, ReplayProvider, fetch_stock_data
+from ingest_pipeline import IngestPipeline
+
+
+class CountingDB:
+    """Writer sink for --no-db: counts rows instead of storing them."""
+
+    def __init__(self):
+        self.rows = 0
+        self.last = {}
+
+    def bulk_upsert_stock_data(self, frames):
+        rows = 0
+        for symbol, df in frames.items():
+            rows += len(df)
+            self.last[symbol] = df["date"].max().date()
+        self.rows += rows
+        return [{"batch": 1, "rows": rows, "seconds": 0.0, "ok": True}]
+
+    def query_bars(self, symbols, start_date=None, end_date=None, columns=None, after=None, limit=1000):
+        # Nothing is stored, so change detection sees every first-run bar as new
+        return ["symbol", "date"] + list(columns or []), [], None
+
+    def get_last_dates(self, symbols):
+        return {s: self.last[s] for s in symbols if s in self.last}
+
+    def close(self):
+        pass
+
+
+def scratch_db():
+    import pymysql
+    from db_manager import DBManager
+    from setup import setup_db
+
+    database = f"{config.DB_NAME}_replay_bench"
+    setup_db.config.DB_NAME = database
+    if not setup_db.createDB():
+        sys.exit("could not create the scratch database; see the log")
+    return DBManager(pymysql.connect(host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER,
+                                     password=config.DB_PASSWORD, database=database,
+                                     cursorclass=pymysql.cursors.DictCursor)), database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--period", default="1y", help="Backfill period of the first run")
+    parser.add_argument("--days", type=int, default=5, help="Incremental runs after the backfill")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per replayed request")
+    parser.add_argument("--replay-dir", help="Existing recordings to replay instead of synthetic ones")
+    parser.add_argument("--no-db", action="store_true", help="Count written rows instead of using MySQL")
+    args = parser.parse_args()
+
+    directory = args.replay_dir or tempfile.mkdtemp(prefix="replay_")
+    try:
+        if not args.replay_dir:
+            symbols = [f"S{i:04d}" for i in range(args.symbols)]
+            FixtureProvider.record(FakeProvider(), symbols, directory, period=args.period)
+        symbols = sorted(f[:-4] for f in os.listdir(directory) if f.endswith(".csv"))
+
+        # Hold back the last --days days so the incremental runs have something to land
+        last = max(pd.read_csv(os.path.join(directory, f"{s}.csv"), usecols=["Date"])["Date"].max() for s in symbols)
+        as_of = pd.Timestamp(last) - pd.Timedelta(days=args.days)
+        replay = ReplayProvider(directory, as_of=as_of, latency=args.latency)
+
+        def fetch(symbol, **kwargs):
+            return fetch_stock_data(symbol, provider=replay, raise_errors=True, **kwargs)
+
+        db, database = (CountingDB(), None) if args.no_db else scratch_db()
+        pipeline = IngestPipeline(db, fetch=fetch, publish=False)
+        try:
+            for run in range(args.days + 1):
+                last_dates = db.get_last_dates(symbols) if run else None
+                began = time.perf_counter()
+                summary = pipeline.run(symbols, last_dates=last_dates, period=args.period)
+                seconds = time.perf_counter() - began
+                label = "backfill" if not run else f"day {run}"
+                print(f"{label:<9} as of {replay.as_of:%Y-%m-%d}: {len(summary['written'])} written, "
+                      f"{len(summary['unchanged'])} unchanged, {len(summary['empty'])} empty, "
+                      f"{len(summary['failed'])} failed in {seconds:.2f}s ({len(symbols) / seconds:.0f} symbols/s); "
+                      f"rows {summary['rows']}")
+                replay.advance(1)
+            if args.no_db:
+                print(f"{db.rows} rows written")
+        finally:
+            if database:
+                db.cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+            db.close()
+    finally:
+        if not args.replay_dir:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
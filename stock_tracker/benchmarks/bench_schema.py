@@ -0,0 +1,226 @@
+"""
+Benchmark the v1 stocks layout against schema v2 on a local MySQL/MariaDB
+server, migrating the same data in place in between.
+
+Creates a scratch database (dropped afterwards unless --keep), loads
+synthetic bars into the v1 layout, times appends, upserts and range scans,
+runs setup_db.createDB() to migrate to v2, and repeats the measurements
+through DBManager. Uses the DB_* settings from .env.
+
+    python benchmarks/bench_schema.py --symbols 100 --days 2500
+    STOCKS_PARTITION_START_YEAR=2000 python benchmarks/bench_schema.py
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pymysql
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "tracker"))
+sys.path.insert(0, ROOT)
+
+import config
+from db_manager import DBManager, STOCK_COLUMNS
+from indicator_calculator import INDICATOR_COLUMNS
+from setup import setup_db
+
+# The stocks table as created before schema v2
+V1_STOCKS_DDL = """
+CREATE TABLE stocks (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    symbol VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    open_price FLOAT,
+    high_price FLOAT,
+    low_price FLOAT,
+    close_price FLOAT,
+    volume BIGINT,
+    {indicators}
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_symbol_date (symbol, date),
+    INDEX idx_symbol (symbol),
+    INDEX idx_date (date)
+)
+"""
+
+
+def synthetic_rows(symbols, dates, seed=0):
+    """(symbol, date, open, high, low, close, volume, indicators...) per bar."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        volume = rng.integers(1_000, 1_000_000, len(dates))
+        extra = rng.normal(50, 10, (len(dates), len(INDICATOR_COLUMNS)))
+        for i, date in enumerate(dates):
+            c = float(close[i])
+            rows.append((symbol, date, c, c * 1.01, c * 0.99, c, int(volume[i]), *map(float, extra[i])))
+    return rows
+
+
+def business_days(start, count):
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def v1_write(conn, rows, batch_size):
+    columns = ["symbol"] + STOCK_COLUMNS
+    placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    updates = ", ".join(f"{col} = VALUES({col})" for col in STOCK_COLUMNS if col != "date")
+    with conn.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO stocks ({', '.join(columns)}) VALUES " + ", ".join([placeholder] * len(batch))
+                + f" ON DUPLICATE KEY UPDATE {updates}",
+                [value for row in batch for value in row]
+            )
+            conn.commit()
+
+
+def v1_scan(conn, symbols, start, end):
+    with conn.cursor() as cursor:
+        placeholders = ", ".join(["%s"] * len(symbols))
+        cursor.execute(
+            f"SELECT symbol, {', '.join(STOCK_COLUMNS)} FROM stocks WHERE symbol IN ({placeholders}) "
+            "AND date >= %s AND date <= %s ORDER BY symbol, date",
+            [*symbols, start, end]
+        )
+        return len(cursor.fetchall())
+
+
+def v2_write(db, rows, batch_size):
+    import pandas as pd
+    frames = {}
+    for row in rows:
+        frames.setdefault(row[0], []).append(row[1:])
+    db.bulk_upsert_stock_data(
+        [(symbol, pd.DataFrame(values, columns=STOCK_COLUMNS)) for symbol, values in frames.items()],
+        batch_size=batch_size
+    )
+
+
+def v2_scan(db, symbols, start, end):
+    names, rows, _ = db.query_bars(symbols, start, end, limit=10_000_000)
+    return len(rows)
+
+
+def best_of(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - began)
+    return best, result
+
+
+def table_size(conn, database):
+    with conn.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("ANALYZE TABLE stocks")
+        cursor.fetchall()
+        cursor.execute(
+            "SELECT data_length, index_length FROM information_schema.tables "
+            "WHERE table_schema = %s AND table_name = 'stocks'",
+            (database,)
+        )
+        data, index = cursor.fetchone()
+    return data / 2**20, index / 2**20
+
+
+def measure(label, conn, database, write, scan, symbols, dates, args):
+    """Print write, scan and size figures; returns dates including the appended days."""
+    rng = np.random.default_rng(1)
+    new_dates = business_days(dates[-1] + datetime.timedelta(days=1), args.append_days)
+    append = synthetic_rows(symbols, new_dates, seed=2)
+    upsert = synthetic_rows(symbols, dates[-args.append_days:], seed=3)
+    one = [symbols[int(rng.integers(len(symbols)))]]
+    some = sorted(rng.choice(symbols, size=min(args.scan_symbols, len(symbols)), replace=False).tolist())
+    year_start = dates[-min(len(dates), 252)]
+
+    results = {}
+    began = time.perf_counter()
+    write(append, args.batch_size)
+    results["append rows/s"] = len(append) / (time.perf_counter() - began)
+    began = time.perf_counter()
+    write(upsert, args.batch_size)
+    results["upsert rows/s"] = len(upsert) / (time.perf_counter() - began)
+
+    seconds, rows = best_of(lambda: scan(one, year_start, dates[-1]), args.repeat)
+    results[f"1 symbol x 1y scan ms ({rows} rows)"] = seconds * 1000
+    seconds, rows = best_of(lambda: scan(some, dates[0], dates[-1]), args.repeat)
+    results[f"{len(some)} symbols full scan ms ({rows} rows)"] = seconds * 1000
+
+    data_mb, index_mb = table_size(conn, database)
+    results["data MB"] = data_mb
+    results["secondary index MB"] = index_mb
+
+    print(f"\n{label}")
+    for name, value in results.items():
+        print(f"  {name:<40} {value:12.1f}")
+    return dates + new_dates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--append-days", type=int, default=5)
+    parser.add_argument("--scan-symbols", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=config.DB_BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default=f"{config.DB_NAME}_schema_bench")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    server = pymysql.connect(host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER, password=config.DB_PASSWORD)
+    with server.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {args.database}")
+        cursor.execute(f"CREATE DATABASE {args.database}")
+    conn = pymysql.connect(host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER,
+                           password=config.DB_PASSWORD, database=args.database)
+
+    try:
+        symbols = [f"S{i:04d}" for i in range(args.symbols)]
+        dates = business_days(datetime.date(2000, 1, 3), args.days)
+        with conn.cursor() as cursor:
+            cursor.execute(V1_STOCKS_DDL.format(indicators="".join(f"{col} FLOAT, " for col in INDICATOR_COLUMNS)))
+
+        began = time.perf_counter()
+        v1_write(conn, synthetic_rows(symbols, dates), args.batch_size)
+        print(f"loaded {args.symbols * args.days} rows into v1 in {time.perf_counter() - began:.1f}s")
+        dates = measure("schema v1", conn, args.database, lambda rows, size: v1_write(conn, rows, size),
+                lambda s, start, end: v1_scan(conn, s, start, end), symbols, dates, args)
+
+        # Migrate the same table in place with the production setup code
+        setup_db.config.DB_NAME = args.database
+        began = time.perf_counter()
+        if not setup_db.createDB():
+            sys.exit("migration failed; see the log")
+        print(f"\nmigrated to v2 in {time.perf_counter() - began:.1f}s")
+
+        db = DBManager(pymysql.connect(host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER,
+                                       password=config.DB_PASSWORD, database=args.database,
+                                       cursorclass=pymysql.cursors.DictCursor))
+        label = "schema v2" + (f" (partitioned from {config.STOCKS_PARTITION_START_YEAR})"
+                               if config.STOCKS_PARTITION_START_YEAR else "")
+        measure(label, db.conn, args.database, lambda rows, size: v2_write(db, rows, size),
+                lambda s, start, end: v2_scan(db, s, start, end), symbols, dates, args)
+        db.conn.close()
+    finally:
+        conn.close()
+        if not args.keep:
+            with server.cursor() as cursor:
+                cursor.execute(f"DROP DATABASE IF EXISTS {args.database}")
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare reading daily history from the local columnar store against MySQL.
+
+Writes synthetic bars into a scratch store the way ingest runs do (one
+append per --append-days chunk), times per-symbol reads before and after
+compaction, and with --mysql loads the same bars into a scratch database and
+times DBManager.fetch_stock_data on it (uses the DB_* settings from .env).
+
+    python benchmarks/bench_store.py --symbols 50 --days 2500
+    python benchmarks/bench_store.py --mysql
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "tracker"))
+sys.path.insert(0, ROOT)
+
+import config
+from columnar_store import ColumnarStore
+from db_manager import STOCK_COLUMNS
+
+
+def synthetic_frame(days, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    df = pd.DataFrame({
+        "date": pd.bdate_range("2000-01-03", periods=days),
+        "open_price": close,
+        "high_price": close * 1.01,
+        "low_price": close * 0.99,
+        "close_price": close,
+        "volume": rng.integers(1_000, 1_000_000, days),
+    })
+    for col in STOCK_COLUMNS[6:]:
+        df[col] = rng.normal(50, 10, days)
+    return df
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def report(label, seconds, rows):
+    print(f"  {label:<36} {seconds * 1000:9.1f} ms  {rows / seconds / 1e6:8.2f} M rows/s")
+
+
+def mysql_reads(frames, args):
+    import pymysql
+    from db_manager import DBManager
+    from setup import setup_db
+
+    database = f"{config.DB_NAME}_store_bench"
+    setup_db.config.DB_NAME = database
+    if not setup_db.createDB():
+        sys.exit("could not create the scratch database; see the log")
+    db = DBManager(pymysql.connect(host=config.DB_HOST, port=config.DB_PORT, user=config.DB_USER,
+                                   password=config.DB_PASSWORD, database=database,
+                                   cursorclass=pymysql.cursors.DictCursor))
+    try:
+        db.bulk_upsert_stock_data(frames)
+        rows = sum(len(df) for df in frames.values())
+        seconds = timed(lambda: [db.fetch_stock_data(symbol) for symbol in frames], args.repeat)
+        report("mysql fetch_stock_data", seconds, rows)
+    finally:
+        db.cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+        db.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--append-days", type=int, default=5, help="Bars per append, like one ingest run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mysql", action="store_true", help="Also time the same reads from MySQL")
+    args = parser.parse_args()
+
+    frames = {f"S{i:04d}": synthetic_frame(args.days, i) for i in range(args.symbols)}
+    rows = args.symbols * args.days
+    root = tempfile.mkdtemp(prefix="bar_store_")
+    try:
+        store = ColumnarStore(root)
+        began = time.perf_counter()
+        for symbol, df in frames.items():
+            for start in range(0, len(df), args.append_days):
+                store.append(symbol, df.iloc[start:start + args.append_days])
+        print(f"appended {rows} rows in {store.stats['parts_written']} parts in {time.perf_counter() - began:.1f}s")
+
+        print(f"\nreading {args.symbols} symbols x {args.days} days")
+        report("store read_table (uncompacted)", timed(lambda: [store.read_table(s) for s in frames], args.repeat), rows)
+
+        began = time.perf_counter()
+        summary = store.compact()
+        print(f"  compacted {summary['months']} months in {time.perf_counter() - began:.1f}s")
+
+        report("store read_table (compacted)", timed(lambda: [store.read_table(s) for s in frames], args.repeat), rows)
+        report("store read -> DataFrame", timed(lambda: [store.read(s) for s in frames], args.repeat), rows)
+
+        check = store.read(next(iter(frames)))
+        expected = frames[next(iter(frames))]
+        exact = np.array_equal(check["close_price"].to_numpy(), expected["close_price"].to_numpy())
+        print(f"  round trip exact: {exact}")
+
+        if args.mysql:
+            mysql_reads(frames, args)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
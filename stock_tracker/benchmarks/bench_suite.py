@@ -0,0 +1,502 @@
+"""
+Reproducible benchmark suite for the ingest, indicator and API hot paths.
+
+Every case runs on the same synthetic OHLCV bars (--symbols x --bars random
+walks, fixed --seed):
+
+  indicators  add_indicators per symbol, add_indicators_multi and every
+              registered indicator in one pass over the long frame
+  fetch       fetch_stock_data (cold and warm) and fetch_stock_data_batch
+              against the replay provider
+  db_write    bulk_upsert_stock_data and per-symbol insert_stock_data, into a
+              scratch MySQL/MariaDB database with --mysql, else into a
+              statement sink that builds and escapes every statement the way
+              pymysql does but skips the server round trip
+  main        main.main() end to end with the replay provider as the data
+              source: backfill, one new day, then idle ticks
+  api         request latency percentiles and throughput of the read
+              endpoints through an in-process ASGI client, with and without
+              the read cache (the /stocks reads use the columnar store, plus
+              MySQL with --mysql)
+
+Results are written as JSON to benchmarks/results/ (or --output) together
+with the commit they ran on; --compare prints the change against an earlier
+results file.
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --symbols 500 --bars 1000 --mysql
+    python benchmarks/bench_suite.py --only indicators,api --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CASES = ["indicators", "fetch", "db_write", "main", "api"]
+
+
+# ----------------- Environment -----------------
+def configure(args, workdir):
+    """
+    Point every file the tracker writes at `workdir` and make the replay
+    provider the only data source. Must run before config is imported.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    os.environ.update({
+        "DATA_PROVIDERS": "replay",
+        "SYMBOL_PROVIDERS": "",
+        "REPLAY_DIR": os.path.join(workdir, "replay"),
+        "COLUMNAR_STORE_DIR": "",
+        "COMPANY_CACHE_FILE": os.path.join(workdir, "company_profiles.sqlite3"),
+        "DATA_VERSION_FILE": os.path.join(workdir, "data_version"),
+        "STREAM_PUBLISH_URL": "",
+        "METRICS_FILE": os.path.join(workdir, "ingest_metrics.prom"),
+        "LOG_FILE": os.path.join(workdir, "app.log"),
+        "METRICS_PUSH_URL": "",
+        # Time the code, not the rate limits kept for real upstream APIs
+        "FETCH_RATE": "1000000",
+        "FETCH_BURST": "1000000",
+    })
+    if args.mysql:
+        os.environ["DB_NAME"] = f"{os.getenv('DB_NAME', 'stock_tracker')}_suite_bench"
+    sys.path.insert(0, os.path.join(ROOT, "tracker"))
+    sys.path.insert(0, ROOT)
+    from logger_config import logger
+    # Also quiets httpx's per-request lines from the api case
+    for name in (None, logger.name, "httpx"):
+        logging.getLogger(name).setLevel(getattr(logging, args.log_level))
+
+
+def write_replay(frames, directory):
+    os.makedirs(directory, exist_ok=True)
+    for symbol, df in frames.items():
+        df.rename(columns={"date": "Date", "open_price": "Open", "high_price": "High", "low_price": "Low",
+                           "close_price": "Close", "volume": "Volume"}) \
+          .to_csv(os.path.join(directory, f"{symbol}.csv"), index=False)
+
+
+# ----------------- Measurement -----------------
+def summarize(samples):
+    ordered = sorted(samples)
+    return {"runs": len(ordered), "min": ordered[0], "median": ordered[len(ordered) // 2], "max": ordered[-1]}
+
+def timed(fn, repeat, rows=None):
+    """Seconds per call of fn() over `repeat` calls; rows_per_second from the median."""
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - began)
+    result = {"seconds": summarize(samples)}
+    if rows:
+        result["rows"] = rows
+        result["rows_per_second"] = rows / result["seconds"]["median"]
+    return result
+
+def percentiles_ms(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1] * 1000}
+
+
+# ----------------- Database stand-in -----------------
+class _SinkCursor:
+    def __init__(self, sink):
+        self.sink = sink
+        self._rows = []
+
+    def execute(self, query, params=None):
+        from pymysql.converters import escape_item
+        params = tuple(params or ())
+        # What pymysql does client-side before sending a statement
+        query % tuple(escape_item(value, "utf8mb4") for value in params)
+        self.sink.statements += 1
+        self.sink.params += len(params)
+        if query.startswith("SELECT id, symbol FROM symbols"):
+            self._rows = [{"id": self.sink.ids.setdefault(s, len(self.sink.ids) + 1), "symbol": s} for s in params]
+        else:
+            self._rows = []
+        return len(params)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class StatementSink:
+    """Connection stand-in for DBManager: statements are built and escaped, then dropped."""
+
+    def __init__(self):
+        self.statements = 0
+        self.params = 0
+        self.ids = {}
+
+    def cursor(self, *args):
+        return _SinkCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def sink_db(watchlist):
+    """DBManager writing to a StatementSink, with the watchlist and last dates kept in memory."""
+    from db_manager import DBManager
+
+    class SinkDB(DBManager):
+        def __init__(self):
+            super().__init__(conn=StatementSink())
+            self.last = {}
+
+        def get_active_watchlist(self):
+            return list(watchlist)
+
+        def get_last_dates(self, symbols):
+            return {s: self.last[s] for s in symbols if s in self.last}
+
+        def bulk_upsert_stock_data(self, frames, batch_size=None):
+            frames = dict(frames)
+            stats = super().bulk_upsert_stock_data(frames, batch_size)
+            for symbol, df in frames.items():
+                if df is not None and not df.empty:
+                    self.last[symbol] = pd.to_datetime(df["date"]).max().date()
+            return stats
+
+        def query_bars(self, symbols, start_date=None, end_date=None, columns=None, after=None, limit=1000):
+            return ["symbol", "date"] + list(columns or []), [], None
+
+    return SinkDB()
+
+
+def mysql_db():
+    from db_manager import DBManager
+    return DBManager()
+
+
+def setup_mysql(symbols):
+    from setup.setup_db import ensure_schema
+    if not ensure_schema(force=True):
+        sys.exit("could not create the scratch database; see the log")
+    db = mysql_db()
+    for symbol in symbols:
+        db.add_to_watchlist(symbol)
+    db.close()
+
+
+def drop_mysql():
+    import config
+    db = mysql_db()
+    db.cursor.execute(f"DROP DATABASE IF EXISTS {config.DB_NAME}")
+    db.close()
+
+
+# ----------------- Cases -----------------
+def bench_indicators(args, data):
+    from bench_indicators import ALL_INDICATORS
+    from indicator_calculator import add_indicators, add_indicators_multi, compute_indicators, parse_indicators
+    long, frames = data["long"], data["frames"]
+    rows = len(long)
+    specs = parse_indicators(ALL_INDICATORS)
+    return {
+        "add_indicators_per_symbol": timed(lambda: [add_indicators(df.copy()) for df in frames.values()],
+                                           args.repeat, rows),
+        "add_indicators_multi": timed(lambda: add_indicators_multi(long.copy()), args.repeat, rows),
+        "all_indicators_multi": timed(lambda: compute_indicators(long.copy(), specs, by="symbol"), args.repeat, rows),
+    }
+
+
+def bench_fetch(args, data):
+    from api_fetcher import ReplayProvider, fetch_stock_data, fetch_stock_data_batch
+    symbols, directory, rows = list(data["frames"]), data["replay_dir"], len(data["long"])
+    warm = ReplayProvider(directory)
+
+    def per_symbol(provider):
+        for symbol in symbols:
+            fetch_stock_data(symbol, period="max", provider=provider)
+
+    per_symbol(warm)
+    return {
+        # A fresh provider parses every CSV again, like a first request upstream
+        "fetch_stock_data_cold": timed(lambda: per_symbol(ReplayProvider(directory)), args.repeat, rows),
+        "fetch_stock_data_warm": timed(lambda: per_symbol(warm), args.repeat, rows),
+        "fetch_stock_data_batch": timed(lambda: fetch_stock_data_batch(symbols, period="max", provider=warm),
+                                        args.repeat, rows),
+    }
+
+
+def bench_db_write(args, data):
+    import db_manager
+    enriched, rows = data["enriched"], len(data["long"])
+    db_manager._SYMBOL_IDS.clear()
+    db = mysql_db() if args.mysql else sink_db(list(enriched))
+    try:
+        result = {
+            "target": "mysql" if args.mysql else "statement_sink",
+            "bulk_upsert_stock_data": timed(lambda: db.bulk_upsert_stock_data(enriched), args.repeat, rows),
+            "insert_stock_data_per_symbol": timed(
+                lambda: [db.insert_stock_data(df, symbol) for symbol, df in enriched.items()], args.repeat, rows),
+        }
+    finally:
+        db.close()
+        db_manager._SYMBOL_IDS.clear()
+    return result
+
+
+def bench_main(args, data):
+    import db_manager
+    import main as tracker_main
+    from api_fetcher import get_provider
+    from setup import setup_db
+
+    symbols = list(data["frames"])
+    replay = get_provider("replay")
+    # Hold back the last bar so the second run has one new day to ingest
+    replay.as_of = data["last_date"] - pd.Timedelta(days=1)
+    db_manager._SYMBOL_IDS.clear()
+
+    if not args.mysql:
+        db = sink_db(symbols)
+        db_manager.DBManager = lambda: db
+        setup_db.ensure_schema = lambda force=False: False
+
+    def run(argv):
+        began = time.perf_counter()
+        tracker_main.main(argv)
+        return time.perf_counter() - began
+
+    backfill = run(["--period", "max"])
+    replay.advance(1)
+    new_day = run([])
+    idle = [run([]) for _ in range(args.repeat)]
+    return {
+        "target": "mysql" if args.mysql else "statement_sink",
+        "symbols": len(symbols),
+        "backfill": {"seconds": backfill, "rows": len(data["long"]), "rows_per_second": len(data["long"]) / backfill},
+        "new_day": {"seconds": new_day},
+        "idle_tick": {"seconds": summarize(idle)},
+    }
+
+
+async def drive(client, paths, requests, concurrency):
+    """Issue `requests` GETs cycling through `paths` from `concurrency` concurrent clients."""
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            began = time.perf_counter()
+            response = await client.get(paths[i % len(paths)])
+            latencies.append(time.perf_counter() - began)
+            errors += response.status_code >= 400
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - began
+    return {"requests": requests, "concurrency": concurrency, "errors": errors,
+            "requests_per_second": requests / wall, "latency_ms": percentiles_ms(latencies)}
+
+
+def bench_api(args, data, workdir):
+    import httpx
+    import backend_api
+    from columnar_store import ColumnarStore
+
+    symbols, enriched = list(data["frames"]), data["enriched"]
+    store_dir = os.path.join(workdir, "store")
+    store = ColumnarStore(store_dir)
+    for symbol, df in enriched.items():
+        store.append(symbol, df)
+    store.compact()
+    backend_api.COLUMNAR_STORE_DIR = store_dir
+    backend_api._store = store
+    backend_api.companies._fetch = lambda symbol: {"shortName": f"{symbol} Corp", "sector": "Technology"}
+    if args.mysql:
+        db = mysql_db()
+        db.bulk_upsert_stock_data(enriched)
+        db.close()
+
+    sample = symbols[:50]
+    endpoints = {
+        "stocks_store_rows": [f"/stocks/{s}?source=store&limit={args.bars}" for s in sample],
+        "stocks_store_columnar": [f"/stocks/{s}?source=store&limit={args.bars}&format=columnar" for s in sample],
+        "stocks_store_arrow": [f"/stocks/{s}?source=store&limit={args.bars}&format=arrow" for s in sample],
+        "stocks_multi_store": [f"/stocks?symbols={','.join(sample[i:i + 10])}&source=store&limit=1000"
+                               for i in range(0, len(sample), 10)],
+    }
+    if args.mysql:
+        endpoints["stocks_db_rows"] = [f"/stocks/{s}?limit={args.bars}" for s in sample]
+    uncached_only = {"company": [f"/company/{s}" for s in sample]}
+    if args.mysql:
+        uncached_only["watchlist_all"] = ["/watchlist/all"]
+
+    async def run():
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            ttl = backend_api.cache.ttl
+            for name, paths in endpoints.items():
+                backend_api.cache.ttl = 0
+                results[f"{name}_uncached"] = await drive(client, paths, args.requests, args.concurrency)
+                backend_api.cache.ttl = ttl
+                await drive(client, paths, len(paths), 1)
+                results[f"{name}_cached"] = await drive(client, paths, args.requests, args.concurrency)
+            for name, paths in uncached_only.items():
+                await drive(client, paths, len(paths), 1)
+                results[name] = await drive(client, paths, args.requests, args.concurrency)
+            return results
+
+    return asyncio.run(run())
+
+
+# ----------------- Results -----------------
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def flatten(tree, prefix=""):
+    flat = {}
+    for key, value in tree.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(old, new):
+    """Print every metric present in both result sets with its relative change."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    print(f"\n{old['meta']['commit']} -> {new['meta']['commit']}")
+    for name in sorted(before.keys() & after.keys()):
+        if name.endswith((".runs", ".rows", ".requests", ".concurrency", ".symbols", ".min", ".max")) \
+                or not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name] * 100
+        # Throughput should go up, everything else (seconds, latency, errors) down
+        better = change > 0 if name.endswith("per_second") else change < 0
+        flag = "" if abs(change) < 5 else ("  better" if better else "  WORSE")
+        print(f"  {name:<60} {before[name]:>12.4g} -> {after[name]:>12.4g}  {change:+7.1f}%{flag}")
+
+
+def report(results):
+    for name, value in flatten(results).items():
+        if name.endswith(("median", "rows_per_second", "requests_per_second", "p50", "p99")):
+            print(f"  {name:<60} {value:>14,.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=250, help="Daily bars per symbol")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per API endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent in-process API clients")
+    parser.add_argument("--only", default=",".join(CASES), help=f"Comma-separated cases ({', '.join(CASES)})")
+    parser.add_argument("--mysql", action="store_true",
+                        help="Write to a scratch MySQL/MariaDB database (DB_* settings from .env) instead of the sink")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+    cases = [c.strip() for c in args.only.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    configure(args, workdir)
+    try:
+        # Imported after configure(): both pull in config
+        from bench_indicators import long_frame
+        from indicator_calculator import add_enabled_indicators
+        long = long_frame(args.symbols, args.bars, seed=args.seed)
+        frames = {s: g.drop(columns="symbol").reset_index(drop=True) for s, g in long.groupby("symbol", sort=False)}
+        data = {
+            "long": long,
+            "frames": frames,
+            "enriched": {s: add_enabled_indicators(df.copy()) for s, df in frames.items()},
+            "replay_dir": os.environ["REPLAY_DIR"],
+            "last_date": long["date"].max(),
+        }
+        write_replay(frames, data["replay_dir"])
+        if args.mysql:
+            setup_mysql(list(frames))
+
+        results = {}
+        runners = {
+            "indicators": lambda: bench_indicators(args, data),
+            "fetch": lambda: bench_fetch(args, data),
+            "db_write": lambda: bench_db_write(args, data),
+            "main": lambda: bench_main(args, data),
+            "api": lambda: bench_api(args, data, workdir),
+        }
+        for case in cases:
+            began = time.perf_counter()
+            results[case] = runners[case]()
+            print(f"{case} done in {time.perf_counter() - began:.1f}s")
+            report(results[case])
+    finally:
+        if args.mysql:
+            drop_mysql()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import config
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "indicators": config.INDICATORS,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{output['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(output, f, indent=2, default=str)
+    print(f"results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), output)
+
+
+if __name__ == "__main__":
+    main()
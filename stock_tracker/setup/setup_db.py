@@ -1,9 +1,165 @@
+import datetime
+import time
 import pymysql
 from pymysql.constants import CLIENT
 from tracker import config
 from logger_config import logger
+from indicator_calculator import INDICATOR_COLUMNS
+
+# Bump whenever createDB changes the schema
+SCHEMA_VERSION = 2
+
+PRICE_COLUMNS = ["open_price", "high_price", "low_price", "close_price"]
+
+
+def stock_columns(cursor):
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = 'stocks'",
+        (config.DB_NAME,)
+    )
+    return {row[0].lower() for row in cursor.fetchall()}
+
+def ensure_indicator_columns(cursor, columns):
+    """Add a stocks column for every enabled indicator that doesn't have one yet."""
+    existing = stock_columns(cursor)
+    missing = [col for col in columns if col.lower() not in existing]
+    if missing:
+        cursor.execute(
+            "ALTER TABLE stocks " + ", ".join(f"ADD COLUMN {col} DOUBLE" for col in missing)
+        )
+        logger.info(f"Added indicator columns to 'stocks': {missing}")
+
+def partition_horizon():
+    """Last year that gets its own stocks partition (the next calendar year)."""
+    return datetime.date.today().year + 1
+
+def year_partitions(first, last):
+    return ", ".join(
+        f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in range(first, last + 1)
+    )
+
+def partition_clause():
+    """
+    RANGE COLUMNS(date) partitioning, one partition per year from
+    STOCKS_PARTITION_START_YEAR, or "" when partitioning is disabled.
+    """
+    if not config.STOCKS_PARTITION_START_YEAR:
+        return ""
+    first = config.STOCKS_PARTITION_START_YEAR
+    return (
+        f"PARTITION BY RANGE COLUMNS(date) ("
+        f"PARTITION p_old VALUES LESS THAN ('{first}-01-01'), "
+        f"{year_partitions(first, partition_horizon())}, "
+        f"PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+    )
+
+def ensure_year_partitions(cursor):
+    """Split p_future so every year up to partition_horizon() has its own partition."""
+    cursor.execute(
+        "SELECT partition_name FROM information_schema.partitions "
+        "WHERE table_schema = %s AND table_name = 'stocks' AND partition_name IS NOT NULL",
+        (config.DB_NAME,)
+    )
+    years = [int(name[1:]) for (name,) in cursor.fetchall() if name[1:].isdigit()]
+    if not years or max(years) >= partition_horizon():
+        return
+    cursor.execute(
+        f"ALTER TABLE stocks REORGANIZE PARTITION p_future INTO ("
+        f"{year_partitions(max(years) + 1, partition_horizon())}, "
+        f"PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+    )
+    logger.info(f"Added stocks partitions through {partition_horizon()}")
+
+def create_stocks_table(cursor):
+    """
+    Schema v2: rows are clustered by (symbol_id, date), so one symbol's range
+    is a contiguous primary-key scan and writes maintain no secondary index.
+    Partitioned tables can't carry foreign keys, so symbol_id isn't one.
+    """
+    indicator_defs = "".join(f"{col} DOUBLE,\n            " for col in INDICATOR_COLUMNS)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS stocks (
+            symbol_id INT UNSIGNED NOT NULL,
+            date DATE NOT NULL,
+            open_price DOUBLE,
+            high_price DOUBLE,
+            low_price DOUBLE,
+            close_price DOUBLE,
+            volume BIGINT,
+            {indicator_defs}created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (symbol_id, date)
+        ) {partition_clause()};
+    """)
+
+def stock_indexes(cursor):
+    cursor.execute(
+        "SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = %s AND table_name = 'stocks'",
+        (config.DB_NAME,)
+    )
+    return {row[0].lower() for row in cursor.fetchall()}
+
+def migrate_stocks_v1(cursor):
+    """
+    Convert a v1 stocks table (id primary key, symbol string, FLOAT prices and
+    three secondary indexes) to v2 in place: fill symbols from the stored
+    rows, add and fill symbol_id, then swap keys and column types in one ALTER.
+
+    MySQL commits each DDL statement on its own, so every step checks
+    information_schema for what an interrupted earlier run already did; a
+    failed migration resumes on the next start instead of failing on a
+    duplicate column.
+    """
+    logger.info("Migrating 'stocks' to schema v2...")
+    began = time.perf_counter()
+    cursor.execute("INSERT IGNORE INTO symbols (symbol) SELECT DISTINCT symbol FROM stocks")
+    if "symbol_id" not in stock_columns(cursor):
+        cursor.execute("ALTER TABLE stocks ADD COLUMN symbol_id INT UNSIGNED NOT NULL DEFAULT 0 FIRST")
+    cursor.execute(
+        "UPDATE stocks t JOIN symbols s ON s.symbol = t.symbol SET t.symbol_id = s.id WHERE t.symbol_id <> s.id"
+    )
+
+    # The rest is one statement, so it either fully applies or not at all
+    indexes = stock_indexes(cursor)
+    value_columns = PRICE_COLUMNS + [col for col in INDICATOR_COLUMNS if col in stock_columns(cursor)]
+    cursor.execute(
+        "ALTER TABLE stocks "
+        + "".join(f"DROP INDEX {name}, " for name in ("unique_symbol_date", "idx_symbol", "idx_date")
+                  if name in indexes)
+        + "DROP COLUMN id, DROP COLUMN symbol, "
+        "ALTER COLUMN symbol_id DROP DEFAULT, "
+        + "".join(f"MODIFY COLUMN {col} DOUBLE, " for col in value_columns)
+        + "ADD PRIMARY KEY (symbol_id, date)"
+    )
+    logger.info(f"Migrated 'stocks' to schema v2 in {time.perf_counter() - began:.1f}s")
+
+def ensure_partitioned(cursor):
+    """Partition an unpartitioned stocks table (migrated, or created before partitioning was enabled)."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.partitions "
+        "WHERE table_schema = %s AND table_name = 'stocks' AND partition_name IS NOT NULL",
+        (config.DB_NAME,)
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"ALTER TABLE stocks {partition_clause()}")
+        logger.info("Partitioned 'stocks' by year")
+
+def schema_marker():
+    """Marker value for the current schema version, indicator columns and partitions."""
+    marker = f"{SCHEMA_VERSION}:{','.join(INDICATOR_COLUMNS)}"
+    if config.STOCKS_PARTITION_START_YEAR:
+        marker += f":{config.STOCKS_PARTITION_START_YEAR}-{partition_horizon()}"
+    return marker
 
 def createDB():
+    """
+    Create the database and tables, migrate a v1 stocks table to v2 and add
+    missing indicator columns.
+
+    Returns:
+        bool: True if every statement succeeded.
+    """
+    conn = cursor = None
+    ok = False
     try:
         conn = pymysql.connect(
             host=config.DB_HOST,
@@ -19,28 +175,43 @@ def createDB():
 
         cursor.execute(f"USE {config.DB_NAME};")
 
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS stocks (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            symbol VARCHAR(10) NOT NULL,
-            date DATE NOT NULL,
-            open_price FLOAT,
-            high_price FLOAT,
-            low_price FLOAT,
-            close_price FLOAT,
-            volume BIGINT,
-            sma FLOAT,
-            rsi FLOAT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE KEY unique_symbol_date (symbol, date),
-            INDEX idx_symbol (symbol),
-            INDEX idx_date (date)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS symbols (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            symbol VARCHAR(10) UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
-        """
+        """)
+        logger.info("Table 'symbols' ensured!")
 
-        cursor.execute(create_table_query)
+        existing = stock_columns(cursor)
+        if "id" in existing and "symbol" in existing:
+            migrate_stocks_v1(cursor)
+        else:
+            create_stocks_table(cursor)
         logger.info("Table 'stocks' ensured!")
 
+        ensure_indicator_columns(cursor, INDICATOR_COLUMNS)
+        if config.STOCKS_PARTITION_START_YEAR:
+            ensure_partitioned(cursor)
+            ensure_year_partitions(cursor)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS intraday_bars (
+            symbol_id INT UNSIGNED NOT NULL,
+            resolution INT UNSIGNED NOT NULL,
+            ts DATETIME NOT NULL,
+            open_price DOUBLE,
+            high_price DOUBLE,
+            low_price DOUBLE,
+            close_price DOUBLE,
+            volume BIGINT,
+            bar_count INT UNSIGNED NOT NULL DEFAULT 1,
+            PRIMARY KEY (symbol_id, resolution, ts)
+        );
+        """)
+        logger.info("Table 'intraday_bars' ensured!")
+
         create_watchlist_table = """
         CREATE TABLE IF NOT EXISTS watchlist (
             id INT AUTO_INCREMENT PRIMARY KEY,
@@ -51,8 +222,23 @@ def createDB():
         """
         cursor.execute(create_watchlist_table)
         logger.info("Table 'watchlist' ensured!")
-        
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT NOT NULL PRIMARY KEY,
+            marker VARCHAR(1024),
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+        # Written last: ensure_schema skips setup while this row matches
+        cursor.execute(
+            "INSERT INTO schema_version (version, marker) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE marker = VALUES(marker), applied_at = CURRENT_TIMESTAMP",
+            (SCHEMA_VERSION, schema_marker())
+        )
+
         conn.commit()
+        ok = True
 
     except Exception as e:
         logger.error(f"Error setting up database: {e}")
@@ -62,7 +248,49 @@ def createDB():
         if conn:
             conn.close()
         logger.info("Database setup process finished.")
+    return ok
+
+def stored_schema_marker():
+    """
+    The marker createDB last recorded in the database's schema_version table,
+    or None when the database, table or row doesn't exist (or can't be read).
+    """
+    try:
+        conn = pymysql.connect(
+            host=config.DB_HOST,
+            port=config.DB_PORT,
+            user=config.DB_USER,
+            passwd=config.DB_PASSWORD,
+            database=config.DB_NAME,
+        )
+    except pymysql.MySQLError:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT marker FROM schema_version WHERE version = %s", (SCHEMA_VERSION,))
+            row = cursor.fetchone()
+        return row[0] if row else None
+    except pymysql.MySQLError:
+        return None
+    finally:
+        conn.close()
+
+def ensure_schema(force=False):
+    """
+    Run createDB only when the database's schema_version row is missing or
+    stale.
+
+    Entry points call this on every start; once setup has succeeded for the
+    current SCHEMA_VERSION and indicator set it costs one SELECT instead of a
+    server round trip per DDL statement. The row lives in the database itself,
+    so a dropped, recreated or repointed database is set up again.
 
+    Returns:
+        bool: True if setup ran, False if the schema was current or setup failed.
+    """
+    if not force and stored_schema_marker() == schema_marker():
+        return False
+    return createDB()
 
 if __name__ == "__main__":
     createDB()
@@ -0,0 +1,22 @@
+"""
+Test setup. The tracker modules import each other by bare name, so the
+tracker directory (and stock_tracker, for setup.*) go on sys.path first.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "tracker"))
+sys.path.insert(0, ROOT)
+
+# Keep test runs from writing to the real logs/ directory
+_SCRATCH = tempfile.mkdtemp(prefix="stock_tracker_tests_")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ.setdefault("LOG_FILE", os.path.join(_SCRATCH, "app.log"))
+os.environ.setdefault("METRICS_FILE", "")
+os.environ.setdefault("STREAM_PUBLISH_URL", "")
+os.environ.setdefault("COMPANY_CACHE_FILE", os.path.join(_SCRATCH, "company_profiles.sqlite3"))
+os.environ.setdefault("DATA_VERSION_FILE", os.path.join(_SCRATCH, "data_version"))
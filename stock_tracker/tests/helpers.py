@@ -0,0 +1,55 @@
+"""Price frames and a stand-in database for the tests."""
+import numpy as np
+import pandas as pd
+
+
+def random_walk(bars, seed=0, start="2020-01-01"):
+    """Daily price frame in the shape fetch_stock_data returns."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    # Flat stretches exercise the repeated-value path of the rolling kernel
+    close[bars // 3: bars // 3 + 30] = close[bars // 3]
+    return pd.DataFrame({
+        "date": pd.bdate_range(start, periods=bars),
+        "open_price": close,
+        "high_price": close * 1.01,
+        "low_price": close * 0.99,
+        "close_price": close,
+        "volume": rng.integers(1_000, 100_000, bars),
+    })
+
+
+class MemoryDB:
+    """
+    The DBManager methods IngestPipeline uses, over a dict of stored rows.
+    Symbols in `failing` fail every upsert batch they are part of.
+    """
+
+    def __init__(self, failing=()):
+        self.rows = {}
+        self.failing = set(failing)
+        self.batches = []
+
+    def bulk_upsert_stock_data(self, frames, batch_size=None):
+        frames = dict(frames)
+        self.batches.append(sorted(frames))
+        if self.failing & set(frames):
+            return [{"batch": 1, "rows": sum(len(df) for df in frames.values()), "seconds": 0.0, "ok": False}]
+        for symbol, df in frames.items():
+            stored = self.rows.setdefault(symbol, {})
+            for row in df.to_dict("records"):
+                stored[pd.Timestamp(row["date"]).normalize()] = row
+        return [{"batch": 1, "rows": sum(len(df) for df in frames.values()), "seconds": 0.0, "ok": True}]
+
+    def query_bars(self, symbols, start_date=None, end_date=None, columns=None, after=None, limit=1000):
+        names = ["symbol", "date"] + list(columns)
+        rows = []
+        for symbol in sorted(symbols):
+            for date, row in sorted(self.rows.get(symbol, {}).items()):
+                if start_date is None or date.date() >= start_date:
+                    rows.append((symbol, date) + tuple(row.get(col) for col in columns))
+        return names, rows, None
+
+    def frame(self, symbol):
+        rows = [row for _, row in sorted(self.rows.get(symbol, {}).items())]
+        return pd.DataFrame(rows)
@@ -0,0 +1,53 @@
+import pytest
+
+from api_fetcher import RateLimitError, _yfinance_error
+
+
+@pytest.mark.parametrize("message", [
+    "YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')",
+    "JSONDecodeError('Expecting value: line 1 column 1 (char 0)')",
+    "HTTPError('429 Client Error: Too Many Requests for url')",
+])
+def test_throttling_raises_rate_limit_error(message):
+    assert isinstance(_yfinance_error("AAPL", message), RateLimitError)
+
+
+def test_missing_prices_mean_no_data():
+    assert _yfinance_error("XYZ", "$XYZ: possibly delisted; no price data found  (1d 2024-01-01 -> 2024-02-01)") is None
+    assert _yfinance_error("XYZ", "$XYZ: possibly delisted; No timezone found") is None
+
+
+def test_other_errors_are_not_throttling():
+    error = _yfinance_error("4293.T", "KeyError('chart')")
+    assert isinstance(error, RuntimeError) and not isinstance(error, RateLimitError)
+    # The ticker itself is not read as an HTTP status
+    error = _yfinance_error("429.T", "YFPricesMissingError('$429.T: KeyError(chart)')")
+    assert isinstance(error, RuntimeError) and not isinstance(error, RateLimitError)
+
+
+def test_malformed_symbol_overrides_are_skipped():
+    from api_fetcher import _symbol_overrides
+    overrides = _symbol_overrides("IBM=alphavantage,yfinance; BROKEN ;=replay;MSFT=;RELIANCE.NS=yfinance")
+    assert overrides == {"IBM": ["alphavantage", "yfinance"], "RELIANCE.NS": ["yfinance"]}
+
+
+def test_fallback_without_providers_raises_a_clear_error(monkeypatch):
+    import fetch_scheduler
+    monkeypatch.setattr(fetch_scheduler, "providers_for", lambda symbol: [])
+    with pytest.raises(ValueError, match="No data providers"):
+        fetch_scheduler.fetch_with_fallback("AAPL")
+
+
+def test_empty_data_providers_fall_back_to_the_default(monkeypatch):
+    import importlib
+    import config
+    try:
+        for value in ("", " , ,"):
+            monkeypatch.setenv("DATA_PROVIDERS", value)
+            monkeypatch.setenv("USE_YFINANCE", "true")
+            assert importlib.reload(config).DATA_PROVIDERS == "yfinance"
+        monkeypatch.setenv("USE_YFINANCE", "false")
+        assert importlib.reload(config).DATA_PROVIDERS == "alphavantage"
+    finally:
+        monkeypatch.undo()
+        importlib.reload(config)
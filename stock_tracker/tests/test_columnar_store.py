@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from columnar_store import ColumnarStore
+from helpers import random_walk
+
+
+def test_repeated_appends_are_compacted_automatically(tmp_path):
+    store = ColumnarStore(str(tmp_path), compact_parts=4)
+    df = random_walk(40, start="2024-03-01")
+    store.append("SYN", df)
+    # A forming candle rewritten every tick
+    last = df.iloc[[-1]]
+    for tick in range(25):
+        store.append("SYN", last.assign(close_price=100 + tick))
+
+    month = str(df["date"].iloc[-1])[:7]
+    assert len(store._parts("SYN", month)) <= 4
+    assert store.stats["auto_compactions"] > 0
+    stored = store.read("SYN")
+    assert len(stored) == len(df)
+    assert stored["close_price"].iloc[-1] == 124
+
+
+def test_compaction_can_be_left_to_the_cli(tmp_path):
+    store = ColumnarStore(str(tmp_path), compact_parts=0)
+    df = random_walk(5, start="2024-03-04")
+    for _ in range(10):
+        store.append("SYN", df)
+    assert len(store._parts("SYN", "2024-03")) == 10
+    assert store.compact() == {"months": 1, "parts_removed": 10}
+    assert len(store.read("SYN")) == 5
@@ -0,0 +1,159 @@
+import pandas as pd
+import pytest
+
+import fetch_scheduler
+from api_fetcher import RateLimitError, _yfinance_error
+from fetch_scheduler import CircuitBreaker, CircuitOpenError, FetchScheduler
+
+
+class Clock:
+    """Stands in for the time module so breaker cool-downs pass instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fetch_scheduler, "time", clock)
+    return clock
+
+
+def flaky(errors, result=None):
+    """fetch() that raises each of `errors` in turn, then returns `result`."""
+    calls = []
+
+    def fetch(symbol, **kwargs):
+        calls.append(symbol)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    fetch.calls = calls
+    return fetch
+
+
+def scheduler(fetch, clock, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failures=10, reset_seconds=30))
+    return FetchScheduler(fetch, name="test", rate=1000, burst=1000, backoff_base=1, backoff_max=4,
+                          sleep=clock.sleep, **kwargs)
+
+
+def test_transient_errors_are_retried_until_success(clock):
+    bars = pd.DataFrame({"close_price": [1.0]})
+    fetch = flaky([TimeoutError("read timed out"), ConnectionError("connection reset")], bars)
+    s = scheduler(fetch, clock, max_retries=3)
+    assert s.fetch("AAPL") is bars
+    assert len(fetch.calls) == 3
+    stats = s.metrics()
+    assert stats["retries"] == 2 and stats["transient_errors"] == 2 and stats["succeeded"] == 1
+    assert stats["breaker"] == "closed"
+
+
+def test_gives_up_after_max_retries(clock):
+    fetch = flaky([TimeoutError("timed out")] * 5)
+    s = scheduler(fetch, clock, max_retries=2)
+    with pytest.raises(TimeoutError):
+        s.fetch("AAPL")
+    assert len(fetch.calls) == 3
+
+
+def test_permanent_error_is_not_retried(clock):
+    fetch = flaky([ValueError("unknown symbol")])
+    s = scheduler(fetch, clock, max_retries=3)
+    with pytest.raises(ValueError):
+        s.fetch("NOPE")
+    assert len(fetch.calls) == 1
+    assert s.metrics()["permanent_errors"] == 1
+
+
+def test_retry_after_is_a_lower_bound_on_backoff(clock):
+    fetch = flaky([RateLimitError("429 Too Many Requests", retry_after=20)], pd.DataFrame())
+    s = scheduler(fetch, clock, max_retries=1)
+    began = clock.now
+    s.fetch("AAPL")
+    # backoff_max is 4s; the server asked for 20
+    assert clock.now - began >= 20
+    assert s.metrics()["rate_limited"] == 1
+
+
+def test_rate_limit_drains_the_bucket(clock):
+    fetch = flaky([RateLimitError()], pd.DataFrame())
+    s = FetchScheduler(fetch, name="test", rate=1, burst=5, max_retries=1,
+                       breaker=CircuitBreaker(10, 30), sleep=clock.sleep)
+    s.fetch("AAPL")
+    # The retry waited for a fresh token instead of spending the rest of the burst
+    assert s.metrics()["throttle_wait_seconds"] > 0
+
+
+def test_breaker_opens_then_probes_after_cool_down(clock):
+    breaker = CircuitBreaker(failures=2, reset_seconds=30)
+    fetch = flaky([TimeoutError("timed out")] * 2, pd.DataFrame({"close_price": [1.0]}))
+    s = scheduler(fetch, clock, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            s.fetch("AAPL")
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        s.fetch("AAPL")
+    assert len(fetch.calls) == 2 and s.metrics()["rejected_open"] == 1
+
+    clock.now += 30
+    assert not s.fetch("AAPL").empty
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failures=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    # Only one probe is let through while half-open
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_fallback_moves_to_the_next_provider(monkeypatch):
+    bars = pd.DataFrame({"close_price": [1.0]})
+    providers = {"first": flaky([ValueError("down")] * 5), "second": flaky([], pd.DataFrame()),
+                 "third": flaky([], bars)}
+    monkeypatch.setattr(fetch_scheduler, "providers_for", lambda symbol: list(providers))
+    monkeypatch.setattr(fetch_scheduler, "scheduler_for",
+                        lambda name: FetchScheduler(providers[name], name=name, max_retries=0,
+                                                    breaker=CircuitBreaker(5, 30)))
+    assert fetch_scheduler.fetch_with_fallback("AAPL") is bars
+    assert [len(f.calls) for f in providers.values()] == [1, 1, 1]
+
+
+def test_numeric_ticker_does_not_look_transient(clock):
+    assert not fetch_scheduler.is_transient(_yfinance_error("4293.T", "KeyError('chart')"))
+    assert not fetch_scheduler.is_transient(_yfinance_error("429.T", "KeyError('chart')"), "429.T")
+    assert not fetch_scheduler.is_transient(ValueError("Alpha Vantage: Invalid API call for 503.HK"), "503.HK")
+    assert fetch_scheduler.is_transient(RuntimeError("yfinance failed for 429.T: 503 Service Unavailable"), "429.T")
+
+    breaker = CircuitBreaker(failures=1, reset_seconds=30)
+    fetch = flaky([_yfinance_error("429.T", "KeyError('chart')")] * 5)
+    s = scheduler(fetch, clock, max_retries=3, breaker=breaker)
+    with pytest.raises(RuntimeError):
+        s.fetch("429.T")
+    assert len(fetch.calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_http_status_decides_when_present():
+    class HTTPError(Exception):
+        def __init__(self, status):
+            super().__init__(f"{status} error for url: https://example.com/query?symbol=503.HK")
+            self.response = type("Response", (), {"status_code": status})()
+
+    assert fetch_scheduler.is_transient(HTTPError(503))
+    assert not fetch_scheduler.is_transient(HTTPError(404))
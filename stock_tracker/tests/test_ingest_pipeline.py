@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from helpers import MemoryDB, random_walk
+from api_fetcher import RateLimitError
+from indicator_calculator import add_indicators
+from ingest_pipeline import IngestPipeline
+
+
+def run_in_thread(pipeline, *args, **kwargs):
+    """Run the pipeline, failing the test instead of hanging if it deadlocks."""
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(pipeline.run(*args, **kwargs)), daemon=True)
+    worker.start()
+    worker.join(timeout=20)
+    assert not worker.is_alive(), "pipeline deadlocked"
+    return result
+
+
+def test_post_processing_error_fails_only_that_symbol():
+    frames = {symbol: random_walk(60, seed=i) for i, symbol in enumerate(["AAA", "BAD", "CCC", "DDD", "EEE"])}
+    # String dates get through the indicators but break the last-date filter
+    frames["BAD"] = frames["BAD"].assign(date=frames["BAD"]["date"].dt.strftime("%Y-%m-%d"))
+    db = MemoryDB()
+    pipeline = IngestPipeline(db, fetch=lambda symbol, **kwargs: frames[symbol].copy(),
+                              indicators=lambda df: add_indicators(df, 14, 14),
+                              publish=False, queue_size=1, writer_batch_symbols=1)
+    last_date = frames["AAA"]["date"].iloc[0].date()
+    summary = run_in_thread(pipeline, list(frames), last_dates=dict.fromkeys(frames, last_date))
+    assert summary["failed"] == ["BAD"]
+    assert sorted(summary["written"]) == ["AAA", "CCC", "DDD", "EEE"]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_indicator_stage_crash_does_not_deadlock_fetchers():
+    frames = {f"S{i}": random_walk(40, seed=i) for i in range(6)}
+    db = MemoryDB()
+    pipeline = IngestPipeline(db, fetch=lambda symbol, **kwargs: frames[symbol].copy(), publish=False,
+                              queue_size=1, writer_batch_symbols=1)
+
+    def crash(items):
+        raise RuntimeError("bug in the indicator stage")
+
+    pipeline._compute = crash
+    summary = run_in_thread(pipeline, list(frames))
+    assert summary["written"] == []
+    # The batch in hand when the stage died is lost; every later one is failed
+    assert len(summary["failed"]) >= len(frames) - 1
+
+
+def test_fetch_errors_fail_only_their_symbol():
+    frames = {symbol: random_walk(40, seed=i) for i, symbol in enumerate(["AAA", "BBB", "CCC", "DDD"])}
+
+    def fetch(symbol, **kwargs):
+        if symbol == "BBB":
+            raise ValueError("unknown symbol")
+        if symbol == "CCC":
+            raise RateLimitError()
+        if symbol == "DDD":
+            return frames[symbol].iloc[:0].copy()
+        return frames[symbol].copy()
+
+    pipeline = IngestPipeline(MemoryDB(), fetch=fetch, publish=False)
+    summary = run_in_thread(pipeline, list(frames))
+    assert summary["written"] == ["AAA"]
+    assert summary["failed"] == ["BBB"]
+    assert summary["throttled"] == ["CCC"]
+    assert summary["empty"] == ["DDD"]
+
+
+def test_failed_write_batch_is_retried_per_symbol():
+    frames = {symbol: random_walk(40, seed=i) for i, symbol in enumerate(["AAA", "BAD", "CCC"])}
+    db = MemoryDB(failing=["BAD"])
+    published = []
+    pipeline = IngestPipeline(db, fetch=lambda symbol, **kwargs: frames[symbol].copy(),
+                              publish=published.append, writer_batch_symbols=len(frames))
+    summary = run_in_thread(pipeline, list(frames))
+    assert summary["failed"] == ["BAD"]
+    assert sorted(summary["written"]) == ["AAA", "CCC"]
+    assert sorted(db.rows) == ["AAA", "CCC"]
+    assert sorted(symbol for batch in published for symbol in batch) == ["AAA", "CCC"]
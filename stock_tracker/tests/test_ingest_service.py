@@ -0,0 +1,64 @@
+import threading
+import time
+
+import db_manager
+from ingest_service import IngestService
+
+
+class DeadConnection:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self, reconnect=True):
+        raise ConnectionError("MySQL server has gone away")
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        self.closed = True
+
+
+class LiveConnection(DeadConnection):
+    def ping(self, reconnect=True):
+        pass
+
+
+def test_reconnect_keeps_the_db_manager_and_pipeline(monkeypatch):
+    fresh, dead = LiveConnection(), DeadConnection()
+    monkeypatch.setattr(db_manager, "connect", lambda: dead)
+    db = db_manager.DBManager()
+    monkeypatch.setattr(db_manager, "connect", lambda: fresh)
+
+    service = IngestService(interval=0, jitter=0, port=0)
+    service.db = db
+    service.pipeline = pipeline = object()
+    service._ensure_connection()
+
+    assert dead.closed
+    assert service.db is db and db.conn is fresh
+    assert service.pipeline is pipeline
+
+
+def test_trigger_during_a_tick_wakes_the_next_wait(monkeypatch):
+    service = IngestService(interval=60, jitter=0, port=0)
+    service.db = LiveConnection()
+    service._server = type("Server", (), {"shutdown": lambda self: None})()
+    service.pipeline = type("Pipeline", (), {"publish": None})()
+    service.profiles = LiveConnection()
+    monkeypatch.setattr(service, "start", lambda: None)
+    ticks = []
+
+    def tick():
+        ticks.append(time.monotonic())
+        if len(ticks) == 1:
+            service.trigger()
+        else:
+            service.stop()
+
+    monkeypatch.setattr(service, "tick", tick)
+    worker = threading.Thread(target=service.run_forever, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "the triggered tick waited for the interval"
+    assert len(ticks) == 2
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import intraday
+from db_manager import INTRADAY_COLUMNS
+
+
+class IntradayDB:
+    """The DBManager intraday methods over {(symbol, resolution): {ts: row}}."""
+
+    def __init__(self):
+        self.bars = {}
+
+    def upsert_intraday_bars(self, symbol, resolution, df, batch_size=None):
+        stored = self.bars.setdefault((symbol, resolution), {})
+        for row in df.to_dict("records"):
+            stored[pd.Timestamp(row["ts"])] = row
+        return len(df)
+
+    def fetch_intraday_bars(self, symbol, resolution, start=None, end=None, limit=None):
+        rows = [row for ts, row in sorted(self.bars.get((symbol, resolution), {}).items())
+                if (start is None or ts >= pd.Timestamp(start)) and (end is None or ts < pd.Timestamp(end))]
+        return pd.DataFrame(rows[:limit], columns=INTRADAY_COLUMNS)
+
+    def get_intraday_resolutions(self, symbol):
+        return sorted(resolution for (s, resolution), rows in self.bars.items() if s == symbol and rows)
+
+    def get_last_intraday_ts(self, symbols, resolution):
+        return {s: max(self.bars[(s, resolution)]) for s in symbols if self.bars.get((s, resolution))}
+
+    def prune_intraday_bars(self, symbol, resolution, before):
+        return 0
+
+
+def quarter_hours(bars):
+    ts = pd.date_range(datetime.now(timezone.utc).replace(tzinfo=None).date(), periods=bars, freq="15min")
+    close = [100.0 + i for i in range(bars)]
+    return pd.DataFrame({"date": ts, "open_price": close, "high_price": close, "low_price": close,
+                         "close_price": close, "volume": [10] * bars})
+
+
+def test_reads_use_the_tiers_an_ingest_at_another_interval_stored():
+    db = IntradayDB()
+    # Configured for 1m (INTRADAY_INTERVAL), ingested at 15m
+    assert intraday.tiers()[0] == 60
+    intraday.IntradayIngest(db, fetch=lambda symbol, **kwargs: quarter_hours(8), interval="15m").run(["AAPL"])
+
+    bars, source = intraday.read_bars(db, "AAPL", 900)
+    assert source == 900 and len(bars) == 8
+    hourly, source = intraday.read_bars(db, "AAPL", 3600)
+    assert source == 3600 and hourly["volume"].tolist() == [40, 40]
+
+
+def test_unknown_symbol_resolves_against_the_configured_tiers():
+    bars, source = intraday.read_bars(IntradayDB(), "NEW", 300)
+    assert source == 300 and bars.empty
@@ -0,0 +1,98 @@
+import pytest
+
+from read_cache import ReadCache
+
+
+@pytest.fixture
+def version():
+    """A data version the test can bump, standing in for DATA_VERSION_FILE."""
+    state = {"version": 1}
+    return state
+
+
+@pytest.fixture
+def cache(version):
+    return ReadCache(max_entries=4, ttl=60, version=lambda: version["version"])
+
+
+def test_hit_after_put(cache):
+    cache.put(("stocks", "AAPL"), b"[]", "application/json")
+    assert cache.get(("stocks", "AAPL")).body == b"[]"
+    assert cache.metrics()["hits"] == 1
+
+
+def test_invalidate_drops_only_the_given_namespaces(cache):
+    cache.put(("watchlist", "active"), b"a", "application/json")
+    cache.put(("stocks", "AAPL"), b"s", "application/json")
+    cache.invalidate("watchlist")
+    assert cache.get(("watchlist", "active")) is None
+    assert cache.get(("stocks", "AAPL")) is not None
+
+
+def test_load_overlapping_an_invalidation_is_not_cached(cache):
+    generation = cache.generation()
+    # A mutation commits and invalidates while the load is still reading
+    cache.invalidate("watchlist")
+    entry = cache.put(("watchlist", "active"), b"stale", "application/json", generation=generation)
+    assert entry.body == b"stale"
+    assert cache.get(("watchlist", "active")) is None
+    assert cache.metrics()["stale_loads"] == 1
+
+    generation = cache.generation()
+    cache.put(("watchlist", "active"), b"fresh", "application/json", generation=generation)
+    assert cache.get(("watchlist", "active")).body == b"fresh"
+
+
+def test_data_version_change_during_load_is_not_cached(cache, version):
+    generation = cache.generation()
+    version["version"] += 1
+    cache.put(("stocks", "AAPL"), b"old", "application/json", generation=generation)
+    assert cache.get(("stocks", "AAPL")) is None
+
+
+def test_failed_read_is_not_cached(monkeypatch):
+    pytest.importorskip("fastapi")
+    import backend_api
+    from fastapi import HTTPException
+    from starlette.requests import Request
+
+    cache = ReadCache(ttl=60, version=lambda: 0)
+    monkeypatch.setattr(backend_api, "cache", cache)
+    request = Request({"type": "http", "method": "GET", "path": "/watchlist/active", "headers": []})
+
+    def outage():
+        raise HTTPException(status_code=500, detail="database is down")
+
+    with pytest.raises(HTTPException):
+        backend_api.cached_response(request, ("watchlist", "active"), outage)
+    assert cache.metrics()["entries"] == 0
+    response = backend_api.cached_response(request, ("watchlist", "active"),
+                                           lambda: backend_api.json_response({"watchlist": ["AAPL"]}))
+    assert response.body == b'{"watchlist": ["AAPL"]}'
+    assert cache.metrics()["entries"] == 1
+
+
+def test_data_version_change_drops_cached_reads(cache, version):
+    cache.put(("stocks", "AAPL"), b"old", "application/json")
+    cache.put(("watchlist", "active"), b"w", "application/json")
+    version["version"] += 1
+    assert cache.get(("stocks", "AAPL")) is None
+    assert cache.get(("watchlist", "active")) is None
+
+
+def test_removing_a_symbol_invalidates_its_reads(monkeypatch):
+    pytest.importorskip("fastapi")
+    import backend_api
+
+    class DB:
+        def remove_from_watchlist(self, symbol):
+            return True
+
+    cache = ReadCache(ttl=60, version=lambda: 0)
+    monkeypatch.setattr(backend_api, "cache", cache)
+    monkeypatch.setattr(backend_api, "trigger_scheduler", lambda reason=None: None)
+    for key in [("watchlist", "active"), ("stocks", "AAPL"), ("bars", "AAPL"), ("company", "AAPL")]:
+        cache.put(key, b"x", "application/json")
+    backend_api.remove_from_watchlist(backend_api.SymbolRequest(symbol="aapl"), db=DB())
+    assert cache.metrics()["entries"] == 1
+    assert cache.get(("company", "AAPL")) is not None
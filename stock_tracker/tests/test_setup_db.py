@@ -0,0 +1,73 @@
+from setup import setup_db
+
+
+def test_schema_setup_is_skipped_while_the_database_marker_is_current(monkeypatch):
+    calls = []
+    monkeypatch.setattr(setup_db, "createDB", lambda: calls.append("createDB") or True)
+
+    monkeypatch.setattr(setup_db, "stored_schema_marker", setup_db.schema_marker)
+    assert setup_db.ensure_schema() is False
+    assert setup_db.ensure_schema(force=True) is True
+    assert calls == ["createDB"]
+
+
+def test_missing_or_stale_database_marker_runs_setup(monkeypatch):
+    calls = []
+    monkeypatch.setattr(setup_db, "createDB", lambda: calls.append("createDB") or True)
+    # A dropped or repointed database has no schema_version row
+    for stored in (None, "1:sma,rsi"):
+        monkeypatch.setattr(setup_db, "stored_schema_marker", lambda: stored)
+        assert setup_db.ensure_schema() is True
+    assert calls == ["createDB", "createDB"]
+
+
+def test_unreachable_database_has_no_marker(monkeypatch):
+    monkeypatch.setattr(setup_db.config, "DB_HOST", "127.0.0.1")
+    monkeypatch.setattr(setup_db.config, "DB_PORT", 1)
+    assert setup_db.stored_schema_marker() is None
+
+
+class SchemaCursor:
+    """Answers the information_schema queries of setup_db from a described table; records DDL."""
+
+    def __init__(self, columns, indexes):
+        self.columns = set(columns)
+        self.indexes = set(indexes)
+        self.statements = []
+        self._rows = []
+
+    def execute(self, query, params=None):
+        if "information_schema.columns" in query:
+            self._rows = [(col,) for col in self.columns]
+        elif "information_schema.statistics" in query:
+            self._rows = [(name,) for name in self.indexes]
+        else:
+            self.statements.append(query)
+            self._rows = []
+            if query.startswith("ALTER TABLE stocks ADD COLUMN symbol_id"):
+                self.columns.add("symbol_id")
+
+    def fetchall(self):
+        return self._rows
+
+
+V1_COLUMNS = ["id", "symbol", "date", "open_price", "high_price", "low_price", "close_price", "volume", "sma", "rsi"]
+V1_INDEXES = ["PRIMARY", "unique_symbol_date", "idx_symbol", "idx_date"]
+
+
+def test_v1_migration_runs_every_step():
+    cursor = SchemaCursor(V1_COLUMNS, V1_INDEXES)
+    setup_db.migrate_stocks_v1(cursor)
+    assert any(q.startswith("ALTER TABLE stocks ADD COLUMN symbol_id") for q in cursor.statements)
+    assert "DROP INDEX idx_date" in cursor.statements[-1]
+
+
+def test_interrupted_v1_migration_resumes():
+    # An earlier run added symbol_id and then failed on the big ALTER; one
+    # index had also been dropped by hand
+    cursor = SchemaCursor(V1_COLUMNS + ["symbol_id"], ["PRIMARY", "unique_symbol_date", "idx_symbol"])
+    setup_db.migrate_stocks_v1(cursor)
+    assert not any("ADD COLUMN symbol_id" in q for q in cursor.statements)
+    final = cursor.statements[-1]
+    assert "DROP INDEX idx_date" not in final and "DROP INDEX idx_symbol" in final
+    assert final.endswith("ADD PRIMARY KEY (symbol_id, date)")
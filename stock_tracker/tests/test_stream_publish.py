@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import backend_api
+import stream_publisher
+
+
+def publish_request(token=None, host="127.0.0.1"):
+    headers = [(b"x-publish-token", token.encode())] if token is not None else []
+    return Request({"type": "http", "method": "POST", "path": "/stream/publish",
+                    "headers": headers, "client": (host, 50000)})
+
+
+def bars():
+    return backend_api.PublishRequest(bars=[{"symbol": "aapl", "close": 1.0}])
+
+
+def test_publish_is_refused_from_loopback_without_a_token(monkeypatch):
+    monkeypatch.setattr(backend_api, "STREAM_PUBLISH_TOKEN", "")
+    with pytest.raises(HTTPException) as e:
+        backend_api.publish_bars(bars(), publish_request())
+    assert e.value.status_code == 403
+
+
+def test_publish_requires_the_matching_token(monkeypatch):
+    monkeypatch.setattr(backend_api, "STREAM_PUBLISH_TOKEN", "secret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as e:
+            backend_api.publish_bars(bars(), publish_request(token))
+        assert e.value.status_code == 403
+    assert backend_api.publish_bars(bars(), publish_request("secret", host="10.0.0.5"))["published"] == 1
+
+
+def test_publisher_stays_off_without_a_token(monkeypatch):
+    monkeypatch.setattr(stream_publisher, "STREAM_PUBLISH_URL", "http://127.0.0.1:8000/stream/publish")
+    monkeypatch.setattr(stream_publisher, "STREAM_PUBLISH_TOKEN", "")
+    monkeypatch.setattr(stream_publisher, "_publisher", None)
+    assert stream_publisher.default_publisher() is None
@@ -1,35 +1,517 @@
-import yfinance as yf
+import io
+import os
+import random
+import threading
+import time
+import re
+import zlib
+from datetime import date, timedelta
+import numpy as np
 import pandas as pd
-from config import USE_YFINANACE, ALPHA_VANTAGE_KEY
+from config import (
+    ALPHA_VANTAGE_KEY, ALPHA_VANTAGE_RATE, FETCH_GROUP_SIZE, FETCH_CONCURRENCY, HTTP_TIMEOUT,
+    DATA_PROVIDERS, SYMBOL_PROVIDERS, REPLAY_DIR
+)
 from logger_config import logger
+from metrics import stage, count_rows
 
-def fetch_stock_data(symbol, period="1mo", interval="1d"):
-    try:
-        if USE_YFINANACE:
-            logger.info(f"Fetching data for {symbol} using yfinance...")
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(period=period, interval=interval)
-
-            if df.empty:
-                logger.warning(f"No data fetched for {symbol}")
-                return pd.DataFrame()
-
-            df = df.reset_index()
-            df = df.rename(columns={
-                "Date": "date",
-                "Open": "open_price",
-                "High": "high_price",
-                "Low": "low_price",
-                "Close": "close_price",
-                "Volume": "volume"
-            })
-            df = df[["date", "open_price", "high_price", "low_price", "close_price", "volume"]]
+COLUMN_MAP = {
+    "Date": "date",
+    "Datetime": "date",
+    "Open": "open_price",
+    "High": "high_price",
+    "Low": "low_price",
+    "Close": "close_price",
+    "Volume": "volume"
+}
+PRICE_COLUMNS = ["date", "open_price", "high_price", "low_price", "close_price", "volume"]
+RAW_COLUMNS = ["symbol", "Date", "Open", "High", "Low", "Close", "Volume"]
+
+
+_PERIOD = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+def period_start(period, today=None):
+    """First date covered by a yfinance-style period ("5d", "1mo", "2y"); None for "max"."""
+    today = today or date.today()
+    match = _PERIOD.match(period or "")
+    if not match:
+        return None
+    count, unit = int(match.group(1)), match.group(2)
+    return today - timedelta(days={"d": 1, "wk": 7, "mo": 31, "y": 366}[unit] * count)
+
+
+class RateLimitError(Exception):
+    """Upstream throttled the request (HTTP 429). retry_after is in seconds, if given."""
+
+    def __init__(self, message="Too Many Requests", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ----------------- Providers -----------------
+# Every provider has a `name` and history(symbols, period, interval, start)
+# returning a long frame with RAW_COLUMNS. Providers may set `rate` (requests
+# per second) to override FETCH_RATE in their FetchScheduler.
+
+_session = None
+_session_lock = threading.Lock()
+
+def http_session():
+    """Process-wide requests.Session with a connection pool sized for the fetch workers."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=FETCH_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = "RealTimeStockTracker"
+            _session = session
+        return _session
+
+# Upstream error text that means "throttled". yfinance 0.2.x has no rate-limit
+# exception; a throttled chart request comes back as a plain-text "Too Many
+# Requests" body, which it reports as a JSON decode error.
+_THROTTLE = re.compile(r"too many requests|rate limit|\b429\b|expecting value", re.IGNORECASE)
+# yfinance's way of saying the symbol has no bars for the window
+_NO_DATA_MARKERS = ("possibly delisted", "no price data found", "no data found", "no timezone found")
+
+def _yfinance_error(symbol, error):
+    """
+    Map a yfinance per-symbol error (exception or the repr yf.download records)
+    to RateLimitError for throttling, None when it only means "no bars", or
+    RuntimeError for anything else.
+    """
+    message = str(error)
+    if any(marker in message.lower() for marker in _NO_DATA_MARKERS):
+        return None
+    # yfinance often repeats the ticker, which may itself contain "429"
+    if _THROTTLE.search(re.sub(re.escape(symbol), "", message, flags=re.IGNORECASE)):
+        return RateLimitError(f"yfinance throttled {symbol}: {message}")
+    return RuntimeError(f"yfinance failed for {symbol}: {message}")
+
+
+class YFinanceProvider:
+    """
+    Single symbols go through Ticker.history(raise_errors=True); groups use
+    yfinance's multi-ticker download, whose per-symbol errors are read back
+    from yfinance.shared._ERRORS. Either way throttling raises RateLimitError
+    instead of looking like a symbol with no data.
+    """
+
+    name = "yfinance"
+
+    def history(self, symbols, period="1mo", interval="1d", start=None):
+        """
+        Returns a long frame with RAW_COLUMNS (one row per symbol and bar).
+        When start is given it takes precedence over period.
+        """
+        import yfinance as yf
+        window = {"start": start} if start is not None else {"period": period}
+        if len(symbols) == 1:
+            return self._history_one(yf, symbols[0], interval, window)
+
+        raw = yf.download(
+            symbols,
+            interval=interval,
+            **window,
+            group_by="ticker",
+            auto_adjust=True,
+            actions=False,
+            threads=True,
+            progress=False,
+        )
+        errors = {symbol: _yfinance_error(symbol, yf.shared._ERRORS[symbol.upper()])
+                  for symbol in symbols if symbol.upper() in yf.shared._ERRORS}
+        throttled = [symbol for symbol, error in errors.items() if isinstance(error, RateLimitError)]
+        failed = [symbol for symbol, error in errors.items() if isinstance(error, RuntimeError)]
+        if raw.empty:
+            if throttled:
+                raise errors[throttled[0]]
+            if failed:
+                raise errors[failed[0]]
+            return pd.DataFrame(columns=RAW_COLUMNS)
+        if throttled or failed:
+            logger.warning(f"yfinance returned no bars for throttled {throttled} and failed {failed}")
 
-            logger.info(f"Fetched {len(df)} rows for {symbol}")
-            return df
+        if not isinstance(raw.columns, pd.MultiIndex):
+            raw.columns = pd.MultiIndex.from_product([symbols[:1], raw.columns])
+
+        long = raw.stack(level=0, future_stack=True)
+        long.index = long.index.set_names(["Date", "symbol"])
+        long = long.reset_index().dropna(subset=["Close"])
+        return long.reindex(columns=RAW_COLUMNS)
+
+    def _history_one(self, yf, symbol, interval, window):
+        try:
+            raw = yf.Ticker(symbol).history(interval=interval, **window, auto_adjust=True, actions=False,
+                                            raise_errors=True)
+        except Exception as e:
+            error = _yfinance_error(symbol, e)
+            if error is None:
+                return pd.DataFrame(columns=RAW_COLUMNS)
+            raise error from e
+        if raw.empty:
+            return pd.DataFrame(columns=RAW_COLUMNS)
+        if interval[-1] not in "mh":
+            # Daily and longer bars without a timezone, as yf.download gives them
+            raw.index = raw.index.tz_localize(None)
+        raw = raw.rename_axis("Date").reset_index().dropna(subset=["Close"])
+        return raw.assign(symbol=symbol).reindex(columns=RAW_COLUMNS)
+
+
+class AlphaVantageProvider:
+    """
+    Alpha Vantage TIME_SERIES_DAILY / TIME_SERIES_INTRADAY in CSV form, one
+    request per symbol (the API has no multi-symbol history endpoint). Uses
+    outputsize=compact (latest 100 bars) whenever that covers the requested
+    window, else full. Requests go through the shared http_session().
+    """
+
+    name = "alphavantage"
+    URL = "https://www.alphavantage.co/query"
+    INTERVALS = {"1m": "1min", "5m": "5min", "15m": "15min", "30m": "30min", "1h": "60min"}
+    COMPACT_BARS = 100
+
+    def __init__(self, api_key=None, session=None, timeout=None):
+        self.api_key = api_key or ALPHA_VANTAGE_KEY
+        self.session = session
+        self.timeout = timeout or HTTP_TIMEOUT
+        self.rate = ALPHA_VANTAGE_RATE
+
+    def _outputsize(self, begin, interval):
+        if begin is None:
+            return "full"
+        if interval == "1d":
+            bars = len(pd.bdate_range(begin, date.today()))
         else:
-            raise NotImplementedError("Alpha Vantage API integration coming soon.")
+            # Regular session only: 390 one-minute bars per trading day
+            per_day = 390 * 60 // int(self.INTERVALS[interval][:-3]) // 60
+            bars = len(pd.bdate_range(begin, date.today())) * per_day
+        return "compact" if bars <= self.COMPACT_BARS else "full"
+
+    def _query(self, params):
+        session = self.session or http_session()
+        response = session.get(self.URL, params=dict(params, apikey=self.api_key, datatype="csv"), timeout=self.timeout)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitError(retry_after=float(retry_after) if retry_after else None)
+        response.raise_for_status()
+
+        text = response.text
+        if text.lstrip().startswith("{"):
+            # Errors and throttling come back as JSON even when CSV was requested
+            body = response.json()
+            message = body.get("Note") or body.get("Information") or body.get("Error Message") or str(body)
+            if "Error Message" not in body and ("frequency" in message or "rate limit" in message.lower()):
+                raise RateLimitError(message)
+            raise ValueError(f"Alpha Vantage: {message}")
+        return pd.read_csv(io.StringIO(text))
+
+    def history(self, symbols, period="1mo", interval="1d", start=None):
+        if interval != "1d" and interval not in self.INTERVALS:
+            raise ValueError(f"Alpha Vantage does not serve {interval} bars")
+        begin = start if start is not None else period_start(period)
+        frames = []
+        for symbol in symbols:
+            params = {"symbol": symbol, "outputsize": self._outputsize(begin, interval)}
+            if interval == "1d":
+                params["function"] = "TIME_SERIES_DAILY"
+            else:
+                params.update(function="TIME_SERIES_INTRADAY", interval=self.INTERVALS[interval])
+            df = self._query(params).rename(columns={
+                "timestamp": "Date", "open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"
+            })
+            df["Date"] = pd.to_datetime(df["Date"])
+            if interval != "1d":
+                df["Date"] = df["Date"].dt.tz_localize("America/New_York")
+            if begin is not None:
+                df = df[df["Date"].dt.date >= pd.Timestamp(begin).date()]
+            df.insert(0, "symbol", symbol)
+            frames.append(df.sort_values("Date"))
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=RAW_COLUMNS)
+        return pd.concat(frames, ignore_index=True).reindex(columns=RAW_COLUMNS)
+
+
+class FixtureProvider:
+    """
+    Serves recorded history from <directory>/<SYMBOL>.csv files so the fetch
+    path can run and be benchmarked offline. Each file has the yfinance
+    columns Date, Open, High, Low, Close, Volume.
+    """
+
+    name = "fixture"
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def history(self, symbols, period="1mo", interval="1d", start=None):
+        frames = []
+        for symbol in symbols:
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, parse_dates=["Date"])
+            if start is not None:
+                df = df[df["Date"].dt.date >= pd.Timestamp(start).date()]
+            df.insert(0, "symbol", symbol)
+            frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=RAW_COLUMNS)
+        return pd.concat(frames, ignore_index=True).reindex(columns=RAW_COLUMNS)
+
+    @staticmethod
+    def record(provider, symbols, directory, period="1mo", interval="1d"):
+        """
+        Save one CSV fixture per symbol from another provider's response.
+        Intraday intervals go to <directory>/<interval>/ for ReplayProvider.
+        """
+        if interval != "1d":
+            directory = os.path.join(directory, interval)
+        os.makedirs(directory, exist_ok=True)
+        raw = provider.history(list(symbols), period=period, interval=interval)
+        for symbol, group in raw.groupby("symbol"):
+            group.drop(columns="symbol").to_csv(os.path.join(directory, f"{symbol}.csv"), index=False)
+        logger.info(f"Recorded fixtures for {raw['symbol'].nunique()} symbols to {directory}")
+
+
+class FakeProvider:
+    """
+    Local stand-in for an upstream API: synthesizes deterministic daily bars
+    per symbol, sleeps `latency` (+/- `jitter`) seconds per request and
+    answers with RateLimitError (429) when callers exceed `server_rate`
+    requests per second (bursts up to `server_burst`) or at random with
+    probability `error_rate`.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.05, jitter=0.02, server_rate=5.0, server_burst=5, error_rate=0.0,
+                 retry_after=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.server_rate = server_rate
+        self.server_burst = server_burst
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._tokens = float(server_burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.calls = {"requests": 0, "rate_limited": 0}
+
+    def _admit(self):
+        with self._lock:
+            self.calls["requests"] += 1
+            now = time.monotonic()
+            self._tokens = min(self.server_burst, self._tokens + (now - self._updated) * self.server_rate)
+            self._updated = now
+            if self._tokens < 1 or self._random.random() < self.error_rate:
+                self.calls["rate_limited"] += 1
+                return False
+            self._tokens -= 1
+            return True
+
+    def history(self, symbols, period="1mo", interval="1d", start=None):
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if not self._admit():
+            raise RateLimitError(retry_after=self.retry_after)
+
+        begin = start if start is not None else period_start(period)
+        dates = pd.bdate_range("2000-01-03", date.today())
+        keep = dates >= pd.Timestamp(begin) if begin is not None else slice(None)
+        frames = []
+        for symbol in symbols:
+            # Seeded by symbol so repeated requests see the same history
+            rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+            close = (20 + zlib.crc32(symbol.encode()) % 200) * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+            frames.append(pd.DataFrame({
+                "symbol": symbol, "Date": dates, "Open": close, "High": close * 1.01,
+                "Low": close * 0.99, "Close": close, "Volume": 1_000_000,
+            })[keep])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RAW_COLUMNS)
+
+
+class ReplayProvider(FixtureProvider):
+    """
+    Deterministic, network-free provider for load-testing the whole pipeline.
+
+    Replays recorded CSVs (see FixtureProvider.record) from
+    <directory>/<SYMBOL>.csv for daily bars and <directory>/<interval>/<SYMBOL>.csv
+    for intraday ones. Files are parsed once and kept in memory. Bars after the
+    replay clock `as_of` are hidden; advance() moves the clock so successive
+    runs see new bars arrive exactly as they did live. `latency` adds a fixed
+    per-request delay.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory=None, as_of=None, latency=0.0):
+        super().__init__(directory or REPLAY_DIR)
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else None
+        self.latency = latency
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def advance(self, days=1):
+        if self.as_of is not None:
+            self.as_of += pd.Timedelta(days=days)
+
+    def _load(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._frames:
+                folder = self.directory if interval == "1d" else os.path.join(self.directory, interval)
+                path = os.path.join(folder, f"{symbol}.csv")
+                df = None
+                if os.path.exists(path):
+                    df = pd.read_csv(path)
+                    # Intraday files carry UTC offsets that change with DST
+                    df["Date"] = pd.to_datetime(df["Date"], utc=interval != "1d")
+                self._frames[key] = df
+            return self._frames[key]
+
+    def history(self, symbols, period="1mo", interval="1d", start=None):
+        if self.latency:
+            time.sleep(self.latency)
+        frames = []
+        for symbol in symbols:
+            df = self._load(symbol, interval)
+            if df is None or df.empty:
+                continue
+            # Compare on wall-clock dates so tz-aware intraday files work too
+            days = df["Date"].dt.date
+            end = self.as_of.date() if self.as_of is not None else days.iloc[-1]
+            begin = start if start is not None else period_start(period, today=end)
+            mask = days <= end
+            if begin is not None:
+                mask &= days >= pd.Timestamp(begin).date()
+            frames.append(df[mask].assign(symbol=symbol))
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=RAW_COLUMNS)
+        return pd.concat(frames, ignore_index=True).reindex(columns=RAW_COLUMNS)
+
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "alphavantage": AlphaVantageProvider,
+    "replay": ReplayProvider,
+    "fake": FakeProvider,
+}
+_instances = {}
+
+def get_provider(name):
+    """Shared provider instance by name."""
+    with _session_lock:
+        if name not in _instances:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown provider '{name}'. Available: {', '.join(PROVIDERS)}")
+            _instances[name] = PROVIDERS[name]()
+        return _instances[name]
+
+def _provider_order(text):
+    return [name.strip() for name in text.split(",") if name.strip()]
+
+def _symbol_overrides(text):
+    """"IBM=alphavantage,yfinance;RELIANCE.NS=yfinance" -> {symbol: [provider, ...]}"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in text.split(";"))):
+        symbol, _, order = item.partition("=")
+        symbol, order = symbol.strip().upper(), _provider_order(order)
+        if not symbol or not order:
+            logger.warning(f"Ignoring malformed SYMBOL_PROVIDERS entry '{item}'")
+            continue
+        overrides[symbol] = order
+    return overrides
+
+PROVIDER_ORDER = _provider_order(DATA_PROVIDERS)
+SYMBOL_PROVIDER_ORDER = _symbol_overrides(SYMBOL_PROVIDERS)
+
+def providers_for(symbol):
+    """Provider names to try for a symbol, in fallback order."""
+    return SYMBOL_PROVIDER_ORDER.get(symbol.upper(), PROVIDER_ORDER)
+
+
+def _normalize(raw):
+    df = raw.rename(columns=COLUMN_MAP)
+    return df[PRICE_COLUMNS] if "symbol" not in df.columns else df[["symbol"] + PRICE_COLUMNS]
+
+
+# ----------------- Fetch API -----------------
+def fetch_stock_data(symbol, period="1mo", interval="1d", provider=None, start=None, raise_errors=False):
+    """
+    Fetch one symbol's bars from `provider`, or from the first provider in the
+    symbol's fallback order (use fetch_scheduler.fetch_with_fallback to try the
+    rest). Errors are logged and give an empty frame unless raise_errors is
+    set (used by FetchScheduler to tell throttling apart from a symbol with
+    no data).
+    """
+    try:
+        provider = provider or get_provider(providers_for(symbol)[0])
+        logger.info(f"Fetching data for {symbol} using {provider.name}...")
+        with stage("fetch", symbol=symbol, provider=provider.name):
+            df = provider.history([symbol], period=period, interval=interval, start=start)
+        count_rows("fetch", df, symbol)
+        if df.empty:
+            logger.warning(f"No data fetched for {symbol}")
+            return pd.DataFrame()
+
+        df = _normalize(df.drop(columns="symbol"))
+        logger.info(f"Fetched {len(df)} rows for {symbol}")
+        return df.reset_index(drop=True)
 
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error fetching data for {symbol}: {e}")
         return pd.DataFrame()
+
+
+def fetch_stock_data_batch(symbols, period="1mo", interval="1d", provider=None, group_size=None):
+    """
+    Fetch many symbols in grouped requests.
+
+    Args:
+        symbols (list): Symbols to fetch.
+        provider: Object with history(symbols, period, interval); defaults to the
+            first provider in DATA_PROVIDERS.
+        group_size (int): Symbols per upstream request.
+
+    Returns:
+        Long-format DataFrame with a symbol column and the stocks price columns,
+        sorted by (symbol, date). Symbols with no data are simply absent.
+    """
+    provider = provider or get_provider(PROVIDER_ORDER[0])
+    group_size = group_size or FETCH_GROUP_SIZE
+    symbols = list(symbols)
+
+    frames = []
+    for start in range(0, len(symbols), group_size):
+        group = symbols[start:start + group_size]
+        try:
+            logger.info(f"Fetching {len(group)} symbols using {provider.name}...")
+            frames.append(provider.history(group, period=period, interval=interval))
+        except Exception as e:
+            logger.error(f"Error fetching group {group[0]}..{group[-1]}: {e}")
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["symbol"] + PRICE_COLUMNS)
+
+    df = _normalize(pd.concat(frames, ignore_index=True))
+    df = df.sort_values(["symbol", "date"], kind="stable").reset_index(drop=True)
+
+    missing = set(symbols) - set(df["symbol"].unique())
+    if missing:
+        logger.warning(f"No data fetched for {sorted(missing)}")
+    logger.info(f"Fetched {len(df)} rows for {len(symbols) - len(missing)} symbols")
+    return df
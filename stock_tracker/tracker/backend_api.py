@@ -1,9 +1,25 @@
 # backend_api.py
-from fastapi import FastAPI, HTTPException
+import base64
+import hmac
+import json
+from datetime import date, datetime
+from contextlib import contextmanager
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from db_manager import DBManager
-import pandas as pd
+from config import (
+    API_MAX_PAGE_SIZE, COLUMNAR_STORE_DIR, STREAM_PUBLISH_TOKEN, STREAM_HEARTBEAT
+)
+from company_cache import CompanyCache
+from db_manager import DBManager, STOCK_COLUMNS
+from db_pool import ConnectionPool, PoolTimeout
+from logger_config import logger
+from metrics import REGISTRY, MetricsMiddleware, merge, read_exported
+from read_cache import ReadCache
+from stream_broker import StreamBroker, TooManySubscribers, sse_event
+from trigger_dispatcher import TriggerDispatcher
 
 app = FastAPI(title="Stock Watchlist API")
 
@@ -16,18 +32,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db = DBManager()
+pool = ConnectionPool()
+cache = ReadCache()
+broker = StreamBroker()
+triggers = TriggerDispatcher()
+companies = CompanyCache()
+
+app.add_middleware(MetricsMiddleware)
+for name, source in [("pool", pool), ("cache", cache), ("stream", broker), ("trigger", triggers),
+                     ("company", companies)]:
+    REGISTRY.add_collector(f"tracker_api_{name}", source.metrics)
+
+@contextmanager
+def db_session():
+    """DBManager on a connection checked out from the pool for the block's duration."""
+    with pool.connection() as conn:
+        db = DBManager(conn=conn)
+        try:
+            yield db
+        finally:
+            db.close()
+
+def get_db():
+    """Per-request DBManager dependency."""
+    with db_session() as db:
+        yield db
+
+def cached_response(request, key, loader):
+    """
+    Serve a GET from the read cache, loading it with loader() -> Response on a
+    miss. Clients sending a matching If-None-Match get a 304; when the entry
+    is cached that happens without touching the database.
+
+    A load that overlaps an invalidation is served but not cached, and a
+    loader that raises (e.g. the database is down) caches nothing.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        generation = cache.generation()
+        response = loader()
+        headers = {k: v for k, v in response.headers.items() if k.lower().startswith("x-")}
+        entry = cache.put(key, response.body, response.media_type, headers, generation=generation)
+
+    headers = dict(entry.headers, ETag=entry.etag)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
 
-import requests
+def json_response(body):
+    return Response(content=json.dumps(body), media_type="application/json")
 
-def trigger_scheduler():
+@app.exception_handler(PoolTimeout)
+def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.on_event("startup")
+def prefetch_profiles():
+    """Warm the company profile cache for the watchlist in the background."""
     try:
-        resp = requests.post("http://localhost:8081/api/scheduler/trigger-python-job")
+        with db_session() as db:
+            symbols = db.get_active_watchlist()
+        companies.prefetch(symbols)
     except Exception as e:
-        print("Failed to trigger scheduler:", e)
+        logger.warning(f"Skipping company profile prefetch: {e}")
 
-# Call this after your stock data is inserted/updated
+@app.on_event("shutdown")
+def close_pool():
+    triggers.close()
+    companies.close()
+    pool.close()
 
+def trigger_scheduler(reason=None):
+    """
+    Ask for an ingest run without waiting for it: the ingest service, else the
+    Java scheduler, is notified in the background once mutations settle.
+    """
+    triggers.request(reason)
 
 
 # ----------------- Pydantic models -----------------
@@ -36,48 +118,323 @@ class SymbolRequest(BaseModel):
 
 # ----------------- Watchlist Endpoints -----------------
 @app.get("/watchlist/active")
-def get_active_watchlist():
-    try:
-        symbols = db.get_active_watchlist()
-        return {"watchlist": symbols}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_active_watchlist(request: Request):
+    def load():
+        try:
+            with db_session() as db:
+                symbols = db.get_active_watchlist(raise_errors=True)
+            return json_response({"watchlist": symbols})
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return cached_response(request, ("watchlist", "active"), load)
 
 @app.get("/watchlist/all")
-def get_all_watchlist():
-    try:
-        items = db.fetch_watchlist()  # returns [(symbol, active), ...]
-        return {"watchlist": [{"symbol": s, "active": a} for s, a in items]}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_all_watchlist(request: Request):
+    def load():
+        try:
+            with db_session() as db:
+                items = db.fetch_watchlist(raise_errors=True)  # returns [(symbol, active), ...]
+            return json_response({"watchlist": [{"symbol": s, "active": a} for s, a in items]})
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return cached_response(request, ("watchlist", "all"), load)
 
 
 @app.post("/watchlist/add")
-def add_to_watchlist(req: SymbolRequest):
+def add_to_watchlist(req: SymbolRequest, db: DBManager = Depends(get_db)):
     success = db.add_to_watchlist(req.symbol.upper())
     if success["status"]:
-        trigger_scheduler()
+        cache.invalidate("watchlist")
+        trigger_scheduler(f"add {req.symbol.upper()}")
+        companies.prefetch([req.symbol])
         return {"message": f"{req.symbol.upper()} added in watchlist"}
 
     else:
         raise HTTPException(status_code=500, detail=f"Failed to add {req.symbol.upper()}")
 
 @app.post("/watchlist/remove")
-def remove_from_watchlist(req: SymbolRequest):
+def remove_from_watchlist(req: SymbolRequest, db: DBManager = Depends(get_db)):
     success = db.remove_from_watchlist(req.symbol.upper())
     if success:
-        trigger_scheduler()
+        cache.invalidate("watchlist", "stocks", "bars")
+        trigger_scheduler(f"remove {req.symbol.upper()}")
         return {"message": f"{req.symbol.upper()} removed from watchlist"}
     else:
         raise HTTPException(status_code=500, detail=f"Failed to remove {req.symbol.upper()}")
 
 @app.post("/watchlist/toggle")
-def toggle_watchlist_status(req: SymbolRequest):
+def toggle_watchlist_status(req: SymbolRequest, db: DBManager = Depends(get_db)):
     success = db.toggle_watchlist_status(req.symbol.upper())
     if success:
-        trigger_scheduler()
+        cache.invalidate("watchlist")
+        trigger_scheduler(f"toggle {req.symbol.upper()}")
         return {"message": f"{req.symbol.upper()} active status toggled"}
     else:
         raise HTTPException(status_code=500, detail=f"Failed to toggle status for {req.symbol.upper()}")
 
 
+# ----------------- Historical Data Endpoints -----------------
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+def encode_cursor(after):
+    if after is None:
+        return None
+    symbol, day = after
+    return base64.urlsafe_b64encode(f"{symbol}|{day.isoformat()}".encode()).decode()
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        symbol, day = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return symbol, date.fromisoformat(day)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_columns(columns):
+    if not columns:
+        return None
+    requested = [c.strip() for c in columns.split(",") if c.strip()]
+    unknown = [c for c in requested if c not in STOCK_COLUMNS and c != "symbol"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {unknown}. Available: {STOCK_COLUMNS}")
+    return requested
+
+def bars_response(names, rows, next_after, fmt):
+    """Serialize a page of bars as row JSON, column-oriented JSON or Arrow IPC."""
+    next_cursor = encode_cursor(next_after)
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    date_index = names.index("date")
+    dates = [d.isoformat() for d in columns[date_index]]
+
+    if fmt == "arrow":
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Arrow format requires pyarrow on the server")
+        table = pa.table({
+            name: pa.array(col, type=pa.date32()) if name == "date" else pa.array(col)
+            for name, col in zip(names, columns)
+        })
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+    if fmt == "columnar":
+        data = {name: (dates if i == date_index else list(col)) for i, (name, col) in enumerate(zip(names, columns))}
+        body = {"columns": data, "count": len(rows), "next_cursor": next_cursor}
+    else:
+        data = [dict(zip(names, row)) for row in rows]
+        for item, day in zip(data, dates):
+            item["date"] = day
+        body = {"data": data, "count": len(rows), "next_cursor": next_cursor}
+
+    # Values are plain str/int/float/None, so skip FastAPI's per-value encoder
+    return json_response(body)
+
+_store = None
+
+def columnar_store():
+    global _store
+    if not COLUMNAR_STORE_DIR:
+        raise HTTPException(status_code=400, detail="The columnar store is not configured (COLUMNAR_STORE_DIR)")
+    if _store is None:
+        try:
+            from columnar_store import ColumnarStore
+        except ImportError:
+            raise HTTPException(status_code=406, detail="The columnar store requires pyarrow on the server")
+        _store = ColumnarStore()
+    return _store
+
+def read_bars(request, symbols, start, end, columns, cursor, limit, fmt, source="db"):
+    projection, after = parse_columns(columns), decode_cursor(cursor)
+    store = columnar_store() if source == "store" else None
+
+    def load():
+        try:
+            if store is not None:
+                names, rows, next_after = store.query_bars(symbols, start, end, projection, after, limit)
+            else:
+                with db_session() as db:
+                    names, rows, next_after = db.query_bars(symbols, start, end, projection, after, limit)
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return bars_response(names, rows, next_after, fmt)
+
+    key = ("stocks", tuple(symbols), start, end, columns, cursor, limit, fmt, source)
+    return cached_response(request, key, load)
+
+FORMAT_PATTERN = "^(rows|columnar|arrow)$"
+SOURCE_PATTERN = "^(db|store)$"
+
+@app.get("/stocks/{symbol}")
+def get_stock_history(
+    request: Request,
+    symbol: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Optional[str] = Query(None, description="Comma-separated value columns"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(1000, ge=1, le=API_MAX_PAGE_SIZE),
+    format: str = Query("rows", pattern=FORMAT_PATTERN),
+    source: str = Query("db", pattern=SOURCE_PATTERN, description="db (MySQL) or store (local columnar files)"),
+):
+    return read_bars(request, [symbol.upper()], start, end, columns, cursor, limit, format, source)
+
+@app.get("/stocks")
+def get_stocks(
+    request: Request,
+    symbols: str = Query(..., description="Comma-separated symbols"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    columns: Optional[str] = Query(None, description="Comma-separated value columns"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(1000, ge=1, le=API_MAX_PAGE_SIZE),
+    format: str = Query("rows", pattern=FORMAT_PATTERN),
+    source: str = Query("db", pattern=SOURCE_PATTERN, description="db (MySQL) or store (local columnar files)"),
+):
+    symbol_list = sorted({s.strip().upper() for s in symbols.split(",") if s.strip()})
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    return read_bars(request, symbol_list, start, end, columns, cursor, limit, format, source)
+
+
+# ----------------- Intraday Endpoints -----------------
+@app.get("/bars/{symbol}")
+def get_intraday_bars(
+    request: Request,
+    symbol: str,
+    resolution: str = Query("5m", description="1m, 5m, 15m, 30m, 1h or 1d"),
+    start: Optional[datetime] = Query(None, description="UTC, inclusive"),
+    end: Optional[datetime] = Query(None, description="UTC, exclusive"),
+    limit: int = Query(1000, ge=1, le=API_MAX_PAGE_SIZE),
+):
+    import intraday
+    try:
+        seconds = intraday.parse_resolution(resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    symbol = symbol.upper()
+
+    def load():
+        try:
+            with db_session() as db:
+                bars, source = intraday.read_bars(db, symbol, seconds, start, end, limit + 1)
+        except PoolTimeout:
+            raise
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        next_start = bars["ts"].iloc[limit].isoformat() if len(bars) > limit else None
+        bars = bars.iloc[:limit].astype(object)
+        bars["ts"] = [ts.isoformat() for ts in bars["ts"]]
+        data = bars.where(bars.notnull(), None).to_dict(orient="records")
+        return json_response({
+            "symbol": symbol,
+            "resolution": resolution,
+            "source_resolution": intraday.resolution_name(source),
+            "data": data,
+            "count": len(data),
+            "next_start": next_start,
+        })
+
+    key = ("bars", symbol, resolution, start, end, limit)
+    return cached_response(request, key, load)
+
+
+# ----------------- Live Stream -----------------
+class PublishRequest(BaseModel):
+    bars: List[dict]
+
+@app.get("/stream")
+async def stream_bars(
+    request: Request,
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols; all symbols when omitted"),
+    fields: Optional[str] = Query(None, description="Comma-separated bar fields; all when omitted"),
+):
+    """
+    Server-Sent Events stream of bar and indicator updates as the ingest
+    process writes them. Each `bars` event is a JSON list with the newest bar
+    of every updated symbol; a slow client gets the latest bar per symbol
+    rather than a backlog. The latest known bars are sent on connect.
+    """
+    symbol_set = {s.strip().upper() for s in symbols.split(",") if s.strip()} if symbols else None
+    projection = parse_columns(fields)
+    try:
+        subscription = broker.subscribe(symbol_set, projection)
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def events():
+        try:
+            yield f"retry: {int(STREAM_HEARTBEAT * 1000)}\n\n"
+            while not await request.is_disconnected():
+                bars = await subscription.next(timeout=STREAM_HEARTBEAT)
+                yield sse_event(bars) if bars else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/stream/publish")
+def publish_bars(req: PublishRequest, request: Request):
+    """Called by the ingest process (stream_publisher.py) after each written batch."""
+    if not STREAM_PUBLISH_TOKEN:
+        raise HTTPException(status_code=403, detail="Publishing is disabled; set STREAM_PUBLISH_TOKEN")
+    if not hmac.compare_digest(request.headers.get("x-publish-token", ""), STREAM_PUBLISH_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid publish token")
+    bars = [dict(bar, symbol=str(bar["symbol"]).upper()) for bar in req.bars if bar.get("symbol")]
+    return {"published": len(bars), "offered": broker.publish(bars)}
+
+
+# ----------------- Company Profiles -----------------
+@app.get("/company/{symbol}")
+def get_company_profile(symbol: str, refresh: bool = False):
+    """Company profile from the shared cache; upstream is only asked on a miss or expiry."""
+    try:
+        result = companies.get(symbol, refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Could not fetch profile for {symbol.upper()}: {e}")
+    if not result["profile"]:
+        raise HTTPException(status_code=404, detail=f"No company profile for {symbol.upper()}")
+    return result
+
+
+# ----------------- Metrics -----------------
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Prometheus text format: this API process's request metrics and component
+    counters, followed by the metrics the last ingest run exported.
+    """
+    return Response(content=merge(REGISTRY.render(), read_exported()), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/pool")
+def pool_metrics():
+    return pool.metrics()
+
+@app.get("/metrics/cache")
+def cache_metrics():
+    return cache.metrics()
+
+@app.get("/metrics/trigger")
+def trigger_metrics():
+    return triggers.metrics()
+
+@app.get("/metrics/stream")
+def stream_metrics():
+    return broker.metrics()
+
+@app.get("/metrics/company")
+def company_metrics():
+    return companies.metrics()
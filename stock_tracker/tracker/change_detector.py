@@ -0,0 +1,130 @@
+"""
+Change detection for daily bars.
+
+ChangeDetector keeps an in-memory snapshot of the most recent stored bars per
+symbol and compares incoming bars against it, so the writer only upserts
+bars that are new or were revised upstream (typically today's still-forming
+candle). Symbols are primed from the database the first time their bars
+are seen, and the snapshot is refreshed from every successful write.
+
+The snapshot assumes this process is the only writer for its symbols while
+it is alive; a fresh process (or forget()) re-reads from the database.
+"""
+import numpy as np
+import pandas as pd
+
+from config import CHANGE_SNAPSHOT_BARS
+from logger_config import logger
+from db_manager import STOCK_COLUMNS
+
+VALUE_COLUMNS = STOCK_COLUMNS[1:]
+
+# Indicators recomputed over a different warm-up window can differ in the
+# last few bits; those are not revisions
+_RTOL = 1e-9
+
+
+def _dates(df):
+    dates = pd.to_datetime(df["date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates.dt.normalize()
+
+def _values(df):
+    return df.reindex(columns=VALUE_COLUMNS).astype("float64").to_numpy()
+
+
+class ChangeDetector:
+    """
+    Args:
+        keep_bars (int): Most recent bars kept per symbol after each write.
+    """
+
+    def __init__(self, keep_bars=None):
+        self.keep_bars = keep_bars or CHANGE_SNAPSHOT_BARS
+        # symbol -> DataFrame of VALUE_COLUMNS indexed by normalized date
+        self._snapshot = {}
+        # symbol -> first date from which the snapshot matches the database
+        self._since = {}
+
+    def forget(self, symbol):
+        self._snapshot.pop(symbol, None)
+        self._since.pop(symbol, None)
+
+    def prime(self, db, frames):
+        """
+        Load stored bars for symbols whose incoming dates aren't covered by the
+        snapshot yet, in one paged range query for the whole batch.
+        """
+        starts = {}
+        for symbol, df in frames.items():
+            first = _dates(df).min()
+            if symbol not in self._since or first < self._since[symbol]:
+                starts[symbol] = first
+        if not starts:
+            return
+
+        start = min(starts.values())
+        rows, after = [], None
+        while True:
+            names, page, after = db.query_bars(list(starts), start_date=start.date(), columns=VALUE_COLUMNS,
+                                               after=after, limit=10000)
+            rows.extend(page)
+            if after is None:
+                break
+
+        stored = pd.DataFrame.from_records(rows, columns=names)
+        groups = dict(tuple(stored.groupby("symbol"))) if not stored.empty else {}
+        for symbol, first in starts.items():
+            group = groups.get(symbol)
+            loaded = pd.DataFrame(columns=VALUE_COLUMNS, dtype="float64")
+            if group is not None:
+                loaded = pd.DataFrame(_values(group), index=_dates(group), columns=VALUE_COLUMNS)
+            previous = self._snapshot.get(symbol)
+            if previous is not None and not previous.empty:
+                # Rows already in the snapshot are at least as fresh as the database
+                older = loaded[~loaded.index.isin(previous.index)]
+                loaded = pd.concat([older, previous]).sort_index() if not older.empty else previous
+            self._snapshot[symbol] = loaded
+            self._since[symbol] = min(start, self._since.get(symbol, start))
+        logger.info(f"Change detection primed {len(starts)} symbols with {len(stored)} stored bars")
+
+    def diff(self, symbol, df):
+        """
+        Split incoming bars into what needs writing.
+
+        Returns:
+            (DataFrame of new or revised rows, {"inserted", "updated", "skipped"} row counts)
+        """
+        stored = self._snapshot.get(symbol)
+        if stored is None or stored.empty:
+            return df, {"inserted": len(df), "updated": 0, "skipped": 0}
+
+        dates = _dates(df)
+        exists = dates.isin(stored.index).to_numpy()
+        same = np.zeros(len(df), dtype=bool)
+        if exists.any():
+            old = stored.loc[dates[exists]].to_numpy()
+            new = _values(df)[exists]
+            same[exists] = np.isclose(new, old, rtol=_RTOL, atol=0, equal_nan=True).all(axis=1)
+
+        counts = {
+            "inserted": int((~exists).sum()),
+            "updated": int((exists & ~same).sum()),
+            "skipped": int(same.sum()),
+        }
+        return df[~same], counts
+
+    def commit(self, symbol, df):
+        """Record rows that were just written, keeping the newest keep_bars."""
+        if df is None or df.empty:
+            return
+        written = pd.DataFrame(_values(df), index=_dates(df), columns=VALUE_COLUMNS)
+        stored = self._snapshot.get(symbol)
+        if stored is not None and not stored.empty:
+            written = pd.concat([stored[~stored.index.isin(written.index)], written]).sort_index()
+        if len(written) > self.keep_bars:
+            written = written.iloc[-self.keep_bars:]
+            self._since[symbol] = max(self._since.get(symbol, written.index[0]), written.index[0])
+        self._since.setdefault(symbol, written.index[0])
+        self._snapshot[symbol] = written
@@ -0,0 +1,285 @@
+"""
+Local columnar store for daily bars.
+
+Append-only Arrow IPC files partitioned by symbol and month:
+
+    <COLUMNAR_STORE_DIR>/<SYMBOL>/<YYYY-MM>/part-<ns>.arrow
+
+Each append writes one new uncompressed part per month it touches. Later
+parts override earlier ones for the same date. Reads memory-map the parts,
+so a compacted month is sliced without copying. A month that collects more
+than COLUMNAR_COMPACT_PARTS parts (e.g. a forming candle rewritten every
+tick) is compacted by the append itself; `compact` rewrites every month as
+a single sorted, de-duplicated part.
+
+    python columnar_store.py stats [SYMBOL ...]
+    python columnar_store.py compact [SYMBOL ...]
+
+Requires pyarrow.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from config import COLUMNAR_STORE_DIR, COLUMNAR_COMPACT_PARTS
+from logger_config import logger
+from db_manager import STOCK_COLUMNS
+from api_fetcher import PRICE_COLUMNS, period_start
+
+
+class ColumnarStore:
+    """
+    Args:
+        root (str): Store directory; defaults to COLUMNAR_STORE_DIR.
+        compact_parts (int): Parts per month that trigger compaction on append;
+            defaults to COLUMNAR_COMPACT_PARTS, 0 leaves it to `compact`.
+    """
+
+    def __init__(self, root=None, compact_parts=None):
+        self.root = root or COLUMNAR_STORE_DIR
+        self.compact_parts = COLUMNAR_COMPACT_PARTS if compact_parts is None else compact_parts
+        self.stats = {"appends": 0, "parts_written": 0, "rows_written": 0, "reads": 0, "auto_compactions": 0}
+
+    # ----------------- Layout -----------------
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol.upper())
+
+    def _months(self, symbol, start=None, end=None):
+        path = self._symbol_dir(symbol)
+        if not os.path.isdir(path):
+            return []
+        months = sorted(m for m in os.listdir(path) if len(m) == 7 and m[4] == "-")
+        if start is not None:
+            months = [m for m in months if m >= f"{start:%Y-%m}"]
+        if end is not None:
+            months = [m for m in months if m <= f"{end:%Y-%m}"]
+        return months
+
+    def _parts(self, symbol, month):
+        path = os.path.join(self._symbol_dir(symbol), month)
+        return [os.path.join(path, p) for p in sorted(os.listdir(path)) if p.endswith(".arrow")]
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(s for s in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, s)))
+
+    # ----------------- Writes -----------------
+    @staticmethod
+    def _to_table(df):
+        import pandas as pd
+        columns = [col for col in STOCK_COLUMNS if col in df.columns]
+        dates = pd.to_datetime(df["date"])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        arrays = {"date": pa.array(dates.dt.date, type=pa.date32())}
+        for col in columns[1:]:
+            arrays[col] = pa.array(df[col].to_numpy(), type=pa.int64() if col == "volume" else pa.float64(),
+                                   from_pandas=True)
+        return pa.table(arrays)
+
+    def _write_part(self, symbol, month, table):
+        path = os.path.join(self._symbol_dir(symbol), month)
+        os.makedirs(path, exist_ok=True)
+        final = os.path.join(path, f"part-{time.time_ns()}.arrow")
+        tmp = final + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, final)
+        self.stats["parts_written"] += 1
+
+    def append(self, symbol, df):
+        """
+        Append a frame with a date column and any STOCK_COLUMNS; one new part
+        is written per month the frame spans, and a month left with more than
+        compact_parts parts is compacted.
+
+        Returns:
+            Rows written.
+        """
+        if df is None or df.empty:
+            return 0
+        table = self._to_table(df)
+        months = np.asarray(table.column("date").to_numpy(), dtype="datetime64[M]")
+        for month in np.unique(months):
+            part = table.filter(pa.array(months == month))
+            self._write_part(symbol, str(month), part)
+            if self.compact_parts and len(self._parts(symbol, str(month))) > self.compact_parts:
+                self._compact_month(symbol, str(month))
+                self.stats["auto_compactions"] += 1
+        self.stats["appends"] += 1
+        self.stats["rows_written"] += table.num_rows
+        return table.num_rows
+
+    # ----------------- Reads -----------------
+    @staticmethod
+    def _read_part(path, columns):
+        # Memory-mapped: column buffers point into the page cache, no copy
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if columns is not None:
+            table = table.select([c for c in ["date"] + columns if c in table.column_names])
+        return table
+
+    @staticmethod
+    def _latest_per_date(table):
+        """Sort by date and keep the last-appended row for every date."""
+        dates = table.column("date").to_numpy()
+        _, first_in_reversed = np.unique(dates[::-1], return_index=True)
+        return table.take(pa.array(len(dates) - 1 - first_in_reversed))
+
+    def _read_month(self, symbol, month, columns):
+        try:
+            tables = [self._read_part(path, columns) for path in self._parts(symbol, month)]
+        except FileNotFoundError:
+            # A compaction replaced the parts after they were listed
+            tables = [self._read_part(path, columns) for path in self._parts(symbol, month)]
+        if not tables:
+            return None
+        if len(tables) == 1:
+            return tables[0]
+        return self._latest_per_date(pa.concat_tables(tables, promote_options="default"))
+
+    def read_table(self, symbol, start=None, end=None, columns=None):
+        """
+        Arrow table of a symbol's bars with start <= date <= end, sorted by date.
+        Compacted months are returned as zero-copy slices of the mapped files.
+
+        Args:
+            columns (list): Value columns to include; date is always included.
+        """
+        self.stats["reads"] += 1
+        tables = [t for t in (self._read_month(symbol, m, columns) for m in self._months(symbol, start, end))
+                  if t is not None and t.num_rows]
+        if not tables:
+            return None
+        table = pa.concat_tables(tables, promote_options="default")
+        if start is None and end is None:
+            return table
+        dates = table.column("date").to_numpy()
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+        return table.slice(lo, hi - lo)
+
+    def read(self, symbol, start=None, end=None, columns=None):
+        """Like read_table, as a DataFrame with a datetime64 date column."""
+        import pandas as pd
+        table = self.read_table(symbol, start, end, columns)
+        if table is None:
+            return pd.DataFrame(columns=["date"] + (columns or []))
+        df = table.to_pandas(date_as_object=False)
+        df["date"] = df["date"].astype("datetime64[ns]")
+        return df
+
+    def fetch(self, symbol, period="1mo", interval="1d", start=None):
+        """
+        fetch_stock_data-compatible reader so backfills and indicator
+        recomputation can run from the store instead of the network.
+        """
+        if interval != "1d":
+            raise ValueError("The columnar store only holds daily bars")
+        start = start if start is not None else period_start(period)
+        df = self.read(symbol, start=start, columns=PRICE_COLUMNS[1:])
+        logger.info(f"Read {len(df)} rows for {symbol} from the columnar store")
+        return df.reindex(columns=PRICE_COLUMNS)
+
+    def query_bars(self, symbols, start_date=None, end_date=None, columns=None, after=None, limit=1000):
+        """Same contract as DBManager.query_bars, served from the store."""
+        columns = [col for col in (STOCK_COLUMNS if columns is None else columns) if col in STOCK_COLUMNS and col != "date"]
+        names = ["symbol", "date"] + columns
+        rows = []
+        for symbol in sorted(symbols):
+            if after and symbol < after[0]:
+                continue
+            table = self.read_table(symbol, start_date, end_date, columns)
+            if table is None:
+                continue
+            if after and symbol == after[0]:
+                skip = int(np.searchsorted(table.column("date").to_numpy(), np.datetime64(after[1], "D"), side="right"))
+                table = table.slice(skip)
+            table = table.slice(0, limit + 1 - len(rows))
+            values = [table.column(col).to_pylist() if col in table.column_names else [None] * table.num_rows
+                      for col in names[1:]]
+            rows.extend((symbol, *row) for row in zip(*values))
+            if len(rows) > limit:
+                break
+
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1][0], rows[-1][1])
+        return names, rows, next_after
+
+    # ----------------- Maintenance -----------------
+    def compact(self, symbols=None):
+        """
+        Rewrite every month that has more than one part as a single sorted,
+        de-duplicated part.
+
+        Returns:
+            {"months": months compacted, "parts_removed": parts replaced}
+        """
+        summary = {"months": 0, "parts_removed": 0}
+        for symbol in symbols or self.symbols():
+            for month in self._months(symbol):
+                removed = self._compact_month(symbol, month)
+                if removed:
+                    summary["months"] += 1
+                    summary["parts_removed"] += removed
+        logger.info(f"Compacted {summary['months']} months, replacing {summary['parts_removed']} parts")
+        return summary
+
+    def _compact_month(self, symbol, month):
+        """Replace a month's parts with one; returns the parts removed (0 if it had one)."""
+        parts = self._parts(symbol, month)
+        if len(parts) < 2:
+            return 0
+        table = self._latest_per_date(pa.concat_tables([self._read_part(path, None) for path in parts],
+                                                       promote_options="default"))
+        # Detach from the mapped files before they are deleted
+        table = pa.concat_tables([table]).combine_chunks()
+        self._write_part(symbol, month, table)
+        for path in parts:
+            os.remove(path)
+        return len(parts)
+
+    def describe(self, symbols=None):
+        """{symbol: {"months", "parts", "bytes", "first", "last"}}"""
+        out = {}
+        for symbol in symbols or self.symbols():
+            months = self._months(symbol)
+            parts = [p for m in months for p in self._parts(symbol, m)]
+            table = self.read_table(symbol, columns=[]) if months else None
+            out[symbol] = {
+                "months": len(months),
+                "parts": len(parts),
+                "bytes": sum(os.path.getsize(p) for p in parts),
+                "first": table.column("date")[0].as_py() if table is not None and table.num_rows else None,
+                "last": table.column("date")[-1].as_py() if table is not None and table.num_rows else None,
+            }
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or compact the local columnar bar store.")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("symbols", nargs="*", help="Symbols to process (default: all)")
+    parser.add_argument("--root", default=None, help=f"Store directory (default: {COLUMNAR_STORE_DIR or 'unset'})")
+    args = parser.parse_args(argv)
+
+    store = ColumnarStore(args.root)
+    if not store.root:
+        parser.error("Set COLUMNAR_STORE_DIR or pass --root")
+    symbols = [s.upper() for s in args.symbols] or None
+    if args.command == "compact":
+        print(store.compact(symbols))
+    else:
+        for symbol, info in store.describe(symbols).items():
+            print(f"{symbol:<8} {info['months']:4d} months {info['parts']:5d} parts "
+                  f"{info['bytes'] / 2**20:8.2f} MB  {info['first']} .. {info['last']}")
+
+
+if __name__ == "__main__":
+    main()
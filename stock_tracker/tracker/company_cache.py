@@ -0,0 +1,241 @@
+"""
+On-disk cache of company profiles (name, sector, market cap, ...).
+
+yfinance's Ticker.info is one of its slowest calls and the answer changes at
+most daily, so profiles are kept in a SQLite file (COMPANY_CACHE_FILE) for
+COMPANY_CACHE_TTL seconds, bounded to COMPANY_CACHE_MAX_ENTRIES by least
+recent use. The API serves GET /company/{symbol} from it, and any process
+that opens the same file (the API, the ingest service) shares the entries.
+prefetch() fills missing or expired entries on a background thread.
+
+    python company_cache.py AAPL MSFT    # fetch through the cache, print timings
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from config import COMPANY_CACHE_FILE, COMPANY_CACHE_TTL, COMPANY_CACHE_MAX_ENTRIES
+from logger_config import logger
+
+# Ticker.info keys kept; the full dict is ~150 keys, most of them unused
+PROFILE_FIELDS = (
+    "shortName", "longName", "sector", "industry", "marketCap", "currency", "exchange",
+    "previousClose", "open", "dayHigh", "dayLow", "fiftyTwoWeekHigh", "fiftyTwoWeekLow",
+    "website", "longBusinessSummary",
+)
+# Symbols yfinance knows nothing about are retried sooner than real profiles expire
+EMPTY_TTL = 3600
+
+
+def yfinance_profile(symbol):
+    """Profile fields from yfinance's Ticker.info; {} when the symbol is unknown."""
+    import yfinance as yf
+    info = yf.Ticker(symbol).info or {}
+    return {key: info[key] for key in PROFILE_FIELDS if info.get(key) is not None}
+
+
+class CompanyCache:
+    """
+    Args:
+        fetch (callable): fetch(symbol) -> profile dict; defaults to yfinance_profile.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None, fetch=None):
+        self.path = path or COMPANY_CACHE_FILE
+        self.ttl = COMPANY_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or COMPANY_CACHE_MAX_ENTRIES
+        self._fetch = fetch or yfinance_profile
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS company_profiles (
+                symbol TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_company_profiles_used ON company_profiles (used_at)")
+        self._lock = threading.Lock()
+        # Symbols being fetched upstream; other callers wait on the event
+        self._in_flight = {}
+        self._queue = deque()
+        self._queued = set()
+        self._worker = None
+        self.stats = {"hits": 0, "misses": 0, "upstream_calls": 0, "upstream_avoided": 0,
+                      "upstream_errors": 0, "stale_served": 0, "evictions": 0, "prefetched": 0}
+
+    # ----------------- Storage -----------------
+    def _row(self, symbol):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT profile, fetched_at FROM company_profiles WHERE symbol = ?", (symbol,)
+            ).fetchone()
+
+    def _fresh(self, profile, fetched_at, now):
+        ttl = self.ttl if profile != "{}" else min(self.ttl, EMPTY_TTL)
+        return now - fetched_at < ttl
+
+    def _store(self, symbol, profile, now):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO company_profiles (symbol, profile, fetched_at, used_at) VALUES (?, ?, ?, ?)",
+                (symbol, json.dumps(profile), now, now),
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM company_profiles").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM company_profiles WHERE symbol IN "
+                    "(SELECT symbol FROM company_profiles ORDER BY used_at LIMIT ?)", (excess,)
+                )
+                self.stats["evictions"] += excess
+
+    def _touch(self, symbol, now):
+        with self._lock:
+            self._conn.execute("UPDATE company_profiles SET used_at = ? WHERE symbol = ?", (now, symbol))
+
+    # ----------------- Lookups -----------------
+    def get(self, symbol, refresh=False):
+        """
+        Profile for `symbol`, from the cache when fresh, else from upstream.
+
+        Returns:
+            {"symbol", "profile", "fetched_at", "cached"}; "profile" is {} for
+            symbols upstream doesn't know. When upstream fails, an expired
+            entry is returned with "stale": True.
+
+        Raises:
+            The upstream error, when nothing is stored for the symbol.
+        """
+        symbol = symbol.strip().upper()
+        row = None if refresh else self._row(symbol)
+        now = time.time()
+        if row is not None and self._fresh(row[0], row[1], now):
+            self._touch(symbol, now)
+            with self._lock:
+                self.stats["hits"] += 1
+                self.stats["upstream_avoided"] += 1
+            return {"symbol": symbol, "profile": json.loads(row[0]), "fetched_at": row[1], "cached": True}
+
+        with self._lock:
+            self.stats["misses"] += 1
+            waiting = self._in_flight.get(symbol)
+            if waiting is None:
+                self._in_flight[symbol] = threading.Event()
+        if waiting is not None:
+            # Someone else is already asking upstream for this symbol
+            waiting.wait()
+            with self._lock:
+                self.stats["upstream_avoided"] += 1
+            row = self._row(symbol)
+            if row is None:
+                raise LookupError(f"No company profile for {symbol}")
+            return {"symbol": symbol, "profile": json.loads(row[0]), "fetched_at": row[1], "cached": True}
+
+        try:
+            return self._load(symbol, row)
+        finally:
+            with self._lock:
+                self._in_flight.pop(symbol).set()
+
+    def _load(self, symbol, stale):
+        with self._lock:
+            self.stats["upstream_calls"] += 1
+        try:
+            profile = self._fetch(symbol)
+        except Exception as e:
+            with self._lock:
+                self.stats["upstream_errors"] += 1
+            stale = stale or self._row(symbol)
+            if stale is None:
+                raise
+            logger.warning(f"Serving stale company profile for {symbol}: {e}")
+            with self._lock:
+                self.stats["stale_served"] += 1
+            return {"symbol": symbol, "profile": json.loads(stale[0]), "fetched_at": stale[1],
+                    "cached": True, "stale": True}
+        now = time.time()
+        self._store(symbol, profile, now)
+        return {"symbol": symbol, "profile": profile, "fetched_at": now, "cached": False}
+
+    # ----------------- Prefetch -----------------
+    def prefetch(self, symbols):
+        """
+        Queue symbols whose profile is missing or expired for a background
+        fetch, one at a time. Returns how many were queued.
+        """
+        symbols = {s.strip().upper() for s in symbols}
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute("SELECT symbol, profile, fetched_at FROM company_profiles").fetchall()
+            stored = {symbol: (profile, fetched_at) for symbol, profile, fetched_at in rows if symbol in symbols}
+            todo = [s for s in sorted(symbols) if s not in self._queued
+                    and not (s in stored and self._fresh(*stored[s], now))]
+            self._queue.extend(todo)
+            self._queued.update(todo)
+            if todo and (self._worker is None or not self._worker.is_alive()):
+                self._worker = threading.Thread(target=self._drain, name="company-prefetch", daemon=True)
+                self._worker.start()
+        if todo:
+            logger.info(f"Prefetching {len(todo)} company profiles")
+        return len(todo)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._worker = None
+                    return
+                symbol = self._queue.popleft()
+            try:
+                self.get(symbol)
+                with self._lock:
+                    self.stats["prefetched"] += 1
+            except Exception as e:
+                logger.warning(f"Company profile prefetch failed for {symbol}: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(symbol)
+
+    # ----------------- Metrics -----------------
+    def metrics(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM company_profiles").fetchone()[0]
+            return dict(self.stats, entries=entries, queued=len(self._queue),
+                        max_entries=self.max_entries, ttl_seconds=self.ttl)
+
+    def close(self):
+        """Drop queued prefetches, wait for the one in progress and close the file."""
+        with self._lock:
+            self._queue.clear()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    import sys
+    cache = CompanyCache()
+    for symbol in (argv if argv is not None else sys.argv[1:]) or ["AAPL"]:
+        began = time.perf_counter()
+        try:
+            result = cache.get(symbol)
+        except Exception as e:
+            print(f"{symbol}: failed: {e}")
+            continue
+        source = "cache" if result["cached"] else "upstream"
+        print(f"{symbol}: {(time.perf_counter() - began) * 1000:.1f} ms from {source}: "
+              f"{result['profile'].get('shortName', 'N/A')}")
+    print(cache.metrics())
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,132 @@ DB_USER = os.getenv("DB_USER","root")
 DB_PASSWORD = os.getenv("DB_PASSWORD","admin")
 DB_NAME = os.getenv("DB_NAME","stock_tracker")
 
+# backend_api connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE",10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT",5))
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL",30))
+
+# Largest page the /stocks endpoints will return
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE",10000))
+
+# backend_api read cache; DATA_VERSION_FILE is touched after every ingest run to invalidate it
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES",1024))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL",30))
+DATA_VERSION_FILE = os.getenv(
+    "DATA_VERSION_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "data_version")
+)
+
 USE_YFINANACE = os.getenv("USE_YFINANCE","true").lower() in ("true",1,"yes")
 ALPHA_VANTAGE_KEY = os.getenv("ALPHA_VANTAGE_KEY","GQ5DS63MNI7EZ9UD")
+# Free-tier Alpha Vantage keys allow 5 requests per minute
+ALPHA_VANTAGE_RATE = float(os.getenv("ALPHA_VANTAGE_RATE",5 / 60))
+
+# Data providers (api_fetcher.PROVIDERS: yfinance, alphavantage, replay, fake)
+# in fallback order, with per-symbol overrides such as
+# "IBM=alphavantage,yfinance;RELIANCE.NS=yfinance". USE_YFINANCE=false picks
+# Alpha Vantage when DATA_PROVIDERS is unset or names no provider
+DATA_PROVIDERS = os.getenv("DATA_PROVIDERS","").strip(" ,") or ("yfinance" if USE_YFINANACE else "alphavantage")
+SYMBOL_PROVIDERS = os.getenv("SYMBOL_PROVIDERS","")
+# Recorded CSVs served by the replay provider (see FixtureProvider.record)
+REPLAY_DIR = os.getenv("REPLAY_DIR","") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+# Timeout in seconds for provider HTTP requests
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT",10))
+
+# Symbols per grouped upstream request in fetch_stock_data_batch
+FETCH_GROUP_SIZE = int(os.getenv("FETCH_GROUP_SIZE",50))
+
+# Fetch scheduler: upstream requests per second and burst, retries with
+# exponential backoff (capped, full jitter) on transient errors, and a circuit
+# breaker that pauses a provider after consecutive failures
+FETCH_RATE = float(os.getenv("FETCH_RATE",2))
+FETCH_BURST = int(os.getenv("FETCH_BURST",5))
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES",4))
+FETCH_BACKOFF_BASE = float(os.getenv("FETCH_BACKOFF_BASE",1))
+FETCH_BACKOFF_MAX = float(os.getenv("FETCH_BACKOFF_MAX",30))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES",5))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS",60))
+
+# Incremental mode only fetches bars newer than each symbol's last stored date
+# (plus indicator warm-up); symbols with no history get BACKFILL_PERIOD
+INCREMENTAL_FETCH = os.getenv("INCREMENTAL_FETCH","true").lower() in ("true","1","yes")
+BACKFILL_PERIOD = os.getenv("BACKFILL_PERIOD","1mo")
 
 SMA_WINDOW = int(os.getenv("SMA_WINDOW",20))
 RSI_PERIOD = int(os.getenv("RSI_PERIOD",14))
 
+# Enabled indicators as name[:param...] items, e.g. "sma:20,rsi:14,ema:20,macd:12:26:9,bbands:20:2,atr:14,vwap:20,rsi_wilder:14"
+INDICATORS = os.getenv("INDICATORS",f"sma:{SMA_WINDOW},rsi:{RSI_PERIOD}")
+
+# Intraday mode (main.py --intraday): base bar interval, coarser tiers rolled up
+# from it as bars land, per-tier retention in days (tiers not listed are kept
+# forever) and the history fetched for symbols with no intraday bars yet
+INTRADAY_INTERVAL = os.getenv("INTRADAY_INTERVAL","1m")
+INTRADAY_ROLLUPS = os.getenv("INTRADAY_ROLLUPS","5m,1h,1d")
+INTRADAY_RETENTION = os.getenv("INTRADAY_RETENTION","1m:7,5m:60,15m:60,1h:730")
+INTRADAY_PERIOD = os.getenv("INTRADAY_PERIOD","5d")
+
+# Local Arrow store of daily bars (columnar_store.py); empty disables it. When
+# set, every bar written to MySQL is also appended here
+COLUMNAR_STORE_DIR = os.getenv("COLUMNAR_STORE_DIR","")
+# A month is compacted into one part as soon as an append leaves it with more parts than this
+COLUMNAR_COMPACT_PARTS = int(os.getenv("COLUMNAR_COMPACT_PARTS",8))
+
+# Partition stocks by year (RANGE COLUMNS on date) starting at this year; 0 disables partitioning
+STOCKS_PARTITION_START_YEAR = int(os.getenv("STOCKS_PARTITION_START_YEAR",0))
+
+# Most recent bars per symbol kept in memory to skip rewriting unchanged bars
+CHANGE_SNAPSHOT_BARS = int(os.getenv("CHANGE_SNAPSHOT_BARS",64))
+
+# Live bar stream (GET /stream): the ingest process posts written bars to the
+# API's publish endpoint with a shared token; publishing is off unless both are
+# set, and the API rejects every publish while no token is configured. The API
+# caps subscribers and sends a keep-alive comment every STREAM_HEARTBEAT seconds
+STREAM_PUBLISH_URL = os.getenv("STREAM_PUBLISH_URL","")
+STREAM_PUBLISH_TOKEN = os.getenv("STREAM_PUBLISH_TOKEN","")
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS",5000))
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT",15))
+
+# Company profiles (GET /company/{symbol}) cached on disk, shared by every
+# process that opens the file; entries expire after COMPANY_CACHE_TTL seconds
+# and the least recently used are evicted beyond COMPANY_CACHE_MAX_ENTRIES
+COMPANY_CACHE_FILE = os.getenv("COMPANY_CACHE_FILE","") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "company_profiles.sqlite3")
+COMPANY_CACHE_TTL = float(os.getenv("COMPANY_CACHE_TTL",86400))
+COMPANY_CACHE_MAX_ENTRIES = int(os.getenv("COMPANY_CACHE_MAX_ENTRIES",5000))
+
+# Rows per multi-row INSERT ... ON DUPLICATE KEY UPDATE statement (one commit per batch)
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE",1000))
+
+# Ingestion pipeline: parallel fetchers, bounded queue depth between stages,
+# and how many symbols the writer groups into one bulk upsert
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY",8))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE",32))
+WRITER_BATCH_SYMBOLS = int(os.getenv("WRITER_BATCH_SYMBOLS",50))
+
+# Resident ingest service (ingest_service.py)
+INGEST_INTERVAL = float(os.getenv("INGEST_INTERVAL",10))
+INGEST_JITTER = float(os.getenv("INGEST_JITTER",1))
+INGEST_TRIGGER_HOST = os.getenv("INGEST_TRIGGER_HOST","127.0.0.1")
+INGEST_TRIGGER_PORT = int(os.getenv("INGEST_TRIGGER_PORT",8765))
+WATCHLIST_REFRESH_SECONDS = float(os.getenv("WATCHLIST_REFRESH_SECONDS",60))
+
+# Ingest triggers sent by watchlist mutations: mutations within TRIGGER_DEBOUNCE
+# seconds of each other (capped at TRIGGER_MAX_DELAY) share one trigger, sent in
+# the background to the ingest service, else the Java scheduler
+SCHEDULER_TRIGGER_URL = os.getenv("SCHEDULER_TRIGGER_URL","http://localhost:8081/api/scheduler/trigger-python-job")
+TRIGGER_DEBOUNCE = float(os.getenv("TRIGGER_DEBOUNCE",0.5))
+TRIGGER_MAX_DELAY = float(os.getenv("TRIGGER_MAX_DELAY",5))
+TRIGGER_TIMEOUT = float(os.getenv("TRIGGER_TIMEOUT",2))
+TRIGGER_RETRIES = int(os.getenv("TRIGGER_RETRIES",2))
+
+# Metrics (metrics.py): each ingest run writes its metrics to METRICS_FILE
+# (empty disables), which the API appends to GET /metrics, and PUTs them to a
+# Prometheus Pushgateway at METRICS_PUSH_URL under job METRICS_JOB when set
+METRICS_FILE = os.getenv("METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "ingest_metrics.prom"))
+METRICS_PUSH_URL = os.getenv("METRICS_PUSH_URL","")
+METRICS_JOB = os.getenv("METRICS_JOB","stock_tracker_ingest")
+
 LOG_FILE = os.getenv("LOG_FILE","logs/app.log")
\ No newline at end of file
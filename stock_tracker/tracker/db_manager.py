@@ -1,26 +1,60 @@
+import time
 import pymysql  # type: ignore
-import pandas as pd
-from config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME
+from config import DB_BATCH_SIZE
 from logger_config import logger
+from indicator_calculator import INDICATOR_COLUMNS
+from db_pool import connect
+from metrics import stage, DB_BATCHES, DB_COMMIT_SECONDS, ROWS
+
+STOCK_COLUMNS = ["date", "open_price", "high_price", "low_price", "close_price", "volume"] + INDICATOR_COLUMNS
+INTRADAY_COLUMNS = ["ts", "open_price", "high_price", "low_price", "close_price", "volume", "bar_count"]
+
+# symbols rows are never deleted, so ids can be cached for the life of the process
+_SYMBOL_IDS = {}
 
 class DBManager:
 
-    def __init__(self):
+    def __init__(self, conn=None):
+        """
+        Args:
+            conn: Optional connection borrowed from a ConnectionPool. The caller
+                keeps ownership of it and close() will leave it open.
+        """
+        self.owns_connection = conn is None
         try:
-            self.conn = pymysql.connect(
-                host=DB_HOST,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                database=DB_NAME,
-                cursorclass=pymysql.cursors.DictCursor  
-            )
+            self.conn = conn if conn is not None else connect()
             self.cursor = self.conn.cursor()
-            logger.info("DBManager connected to database")
+            if self.owns_connection:
+                logger.info("DBManager connected to database")
         except Exception as e:
             logger.error(f"DBManager connection failed: {e}")
 
+    def symbol_ids(self, symbols, create=False):
+        """
+        Map symbols to their integer ids in the symbols table.
+
+        Args:
+            symbols (list): Symbols to look up.
+            create (bool): Register symbols that don't have an id yet.
+
+        Returns:
+            {symbol: id}; unknown symbols are absent unless create is set.
+        """
+        missing = [s for s in dict.fromkeys(symbols) if s not in _SYMBOL_IDS]
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            if create:
+                self.cursor.execute(f"INSERT IGNORE INTO symbols (symbol) VALUES {', '.join(['(%s)'] * len(missing))}", missing)
+                self.conn.commit()
+            self.cursor.execute(f"SELECT id, symbol FROM symbols WHERE symbol IN ({placeholders})", missing)
+            _SYMBOL_IDS.update((row["symbol"], row["id"]) for row in self.cursor.fetchall())
+        return {s: _SYMBOL_IDS[s] for s in symbols if s in _SYMBOL_IDS}
+
     def record_exists(self, symbol, date):
-        query = "SELECT COUNT(*) as count FROM stocks WHERE symbol = %s AND date = %s"
+        query = (
+            "SELECT COUNT(*) as count FROM stocks t JOIN symbols s ON s.id = t.symbol_id "
+            "WHERE s.symbol = %s AND t.date = %s"
+        )
         self.cursor.execute(query, (symbol, date))
         result = self.cursor.fetchone()
         return result["count"] > 0
@@ -36,7 +70,12 @@ class DBManager:
             True if deletion was successful, False otherwise.
         """
         try:
-            self.cursor.execute("DELETE FROM stocks WHERE symbol = %s", (symbol,))
+            self.cursor.execute(
+                "DELETE t FROM stocks t JOIN symbols s ON s.id = t.symbol_id WHERE s.symbol = %s", (symbol,)
+            )
+            self.cursor.execute(
+                "DELETE t FROM intraday_bars t JOIN symbols s ON s.id = t.symbol_id WHERE s.symbol = %s", (symbol,)
+            )
             self.conn.commit()
             logger.info(f"All stock data for {symbol} removed from stocks table.")
             return True
@@ -47,24 +86,17 @@ class DBManager:
 
 
     def insert_stock_row(self, row, symbol):
+        import pandas as pd
         try:
+            row = row.reindex(STOCK_COLUMNS)
             row = row.where(pd.notnull(row), None)  
 
-            query = """
-            INSERT INTO stocks (symbol, date, open_price, high_price, low_price, close_price, volume, sma, rsi)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            symbol_id = self.symbol_ids([symbol], create=True)[symbol]
+            query = f"""
+            INSERT INTO stocks (symbol_id, {', '.join(STOCK_COLUMNS)})
+            VALUES ({', '.join(['%s'] * (len(STOCK_COLUMNS) + 1))})
             """
-            self.cursor.execute(query, (
-                symbol,
-                row['date'],
-                row['open_price'],
-                row['high_price'],
-                row['low_price'],
-                row['close_price'],
-                row['volume'],
-                row['sma'],
-                row['rsi']
-            ))
+            self.cursor.execute(query, (symbol_id, *row.tolist()))
 
             self.conn.commit()
             logger.info(f"Inserted row for {symbol} on {row['date']}")
@@ -73,28 +105,19 @@ class DBManager:
             logger.error(f"Insert failed for {symbol} on {row['date']}: {e}")
 
     def update_stock_row(self, row, symbol):
+        import pandas as pd
+        row = row.reindex(STOCK_COLUMNS)
         row = row.where(pd.notnull(row), None)
-        query = """
+        value_columns = [col for col in STOCK_COLUMNS if col != "date"]
+        query = f"""
         UPDATE stocks
-        SET open_price = %s,
-            high_price = %s,
-            low_price = %s,
-            close_price = %s,
-            volume = %s,
-            sma = %s,
-            rsi = %s
-        WHERE symbol = %s AND date = %s
+        SET {', '.join(f'{col} = %s' for col in value_columns)}
+        WHERE symbol_id = %s AND date = %s
         """
         try:
             self.cursor.execute(query, (
-                row['open_price'],
-                row['high_price'],
-                row['low_price'],
-                row['close_price'],
-                row['volume'],
-                row['sma'],
-                row['rsi'],
-                symbol,
+                *[row[col] for col in value_columns],
+                self.symbol_ids([symbol])[symbol],
                 row['date']
             ))
             self.conn.commit()
@@ -102,7 +125,11 @@ class DBManager:
         except Exception as e:
             logger.error(f"Update failed for {symbol} on {row['date']}: {e}")
 
-    def insert_stock_data(self, df, symbol):
+    def insert_stock_data(self, df, symbol, bulk=True):
+        if bulk:
+            self.bulk_upsert_stock_data({symbol: df})
+            return
+
         for _, row in df.iterrows():
             if self.record_exists(symbol, row['date']):
                 self.update_stock_row(row, symbol)
@@ -110,30 +137,280 @@ class DBManager:
                 self.insert_stock_row(row, symbol)
         logger.info(f"Data for {symbol} inserted/updated successfully.")
 
+    def bulk_upsert_stock_data(self, frames, batch_size=None):
+        """
+        Upsert one or many symbols' frames using chunked multi-row
+        INSERT ... ON DUPLICATE KEY UPDATE statements against the (symbol_id, date) key.
+
+        Args:
+            frames (dict | iterable): {symbol: df} or an iterable of (symbol, df) pairs.
+            batch_size (int): Rows per statement; each batch is its own transaction.
+
+        Returns:
+            List of per-batch stats dicts: {"batch", "rows", "seconds", "ok"}.
+        """
+        import pandas as pd
+        batch_size = batch_size or DB_BATCH_SIZE
+        items = [(symbol, df) for symbol, df in (frames.items() if isinstance(frames, dict) else frames)
+                 if df is not None and not df.empty]
+        try:
+            ids = self.symbol_ids([symbol for symbol, _ in items], create=True)
+        except Exception as e:
+            logger.error(f"Could not resolve symbol ids: {e}")
+            self.conn.rollback()
+            return [{"batch": 1, "rows": sum(len(df) for _, df in items), "seconds": 0.0, "ok": False}]
+
+        rows = []
+        # Row ranges [start, end) of each symbol, for per-symbol row metrics
+        spans = []
+        for symbol, df in items:
+            values = df.reindex(columns=STOCK_COLUMNS).astype(object)
+            values = values.where(pd.notnull(values), None)
+            spans.append((symbol, len(rows), len(rows) + len(values)))
+            rows.extend((ids[symbol], *row) for row in values.itertuples(index=False, name=None))
+
+        columns = ["symbol_id"] + STOCK_COLUMNS
+        placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        updates = ", ".join(f"{col} = VALUES({col})" for col in STOCK_COLUMNS if col != "date")
+
+        stats = []
+        with stage("db_write", rows=len(rows), symbols=len(items)):
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                query = (
+                    f"INSERT INTO stocks ({', '.join(columns)}) VALUES "
+                    + ", ".join([placeholder] * len(batch))
+                    + f" ON DUPLICATE KEY UPDATE {updates}"
+                )
+                params = [value for row in batch for value in row]
+
+                began = time.perf_counter()
+                try:
+                    self.cursor.execute(query, params)
+                    self.conn.commit()
+                    ok = True
+                except Exception as e:
+                    logger.error(f"Bulk upsert batch {len(stats) + 1} ({len(batch)} rows) failed: {e}")
+                    self.conn.rollback()
+                    ok = False
+                elapsed = time.perf_counter() - began
+
+                DB_COMMIT_SECONDS.observe(elapsed)
+                DB_BATCHES.inc(status="ok" if ok else "failed")
+                if ok:
+                    end = start + len(batch)
+                    for symbol, first, last in spans:
+                        if first < end and last > start:
+                            ROWS.inc(min(last, end) - max(first, start), stage="db_write", symbol=symbol)
+                stats.append({"batch": len(stats) + 1, "rows": len(batch), "seconds": elapsed, "ok": ok})
+                logger.info(f"Upsert batch {len(stats)}: {len(batch)} rows in {elapsed:.3f}s")
+
+        total = sum(s["rows"] for s in stats if s["ok"])
+        logger.info(f"Bulk upsert finished: {total}/{len(rows)} rows in {len(stats)} batches.")
+        return stats
+
     def fetch_stock_data(self, symbol, start_date=None, end_date=None):
-        query = "SELECT * FROM stocks WHERE symbol = %s"
+        query = (
+            f"SELECT s.symbol, {', '.join(f't.{col}' for col in STOCK_COLUMNS)}, t.created_at "
+            "FROM stocks t JOIN symbols s ON s.id = t.symbol_id WHERE s.symbol = %s"
+        )
         params = [symbol]
 
         if start_date:
-            query += " AND date >= %s"
+            query += " AND t.date >= %s"
+            params.append(start_date)
+        if end_date:
+            query += " AND t.date <= %s"
+            params.append(end_date)
+
+        import pandas as pd
+        query += " ORDER BY t.date ASC"
+        columns, rows = self._fetch_tuples(query, params)
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def _fetch_tuples(self, query, params):
+        """Run a query on a tuple cursor; avoids building one dict per row."""
+        cursor = self.conn.cursor(pymysql.cursors.Cursor)
+        try:
+            cursor.execute(query, params)
+            columns = [d[0] for d in cursor.description]
+            return columns, cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def query_bars(self, symbols, start_date=None, end_date=None, columns=None, after=None, limit=1000):
+        """
+        Page through stored bars for one or more symbols, ordered by (symbol, date).
+
+        Args:
+            symbols (list): Symbols to read.
+            columns (list): Value columns to return; symbol and date are always included.
+            after (tuple): (symbol, date) keyset cursor; rows strictly after it are returned.
+            limit (int): Maximum rows in the page.
+
+        Returns:
+            (column_names, rows as tuples, next cursor or None)
+        """
+        columns = [col for col in (STOCK_COLUMNS if columns is None else columns) if col in STOCK_COLUMNS and col != "date"]
+        placeholders = ", ".join(["%s"] * len(symbols))
+        query = (
+            f"SELECT {', '.join(['s.symbol', 't.date'] + [f't.{col}' for col in columns])} "
+            f"FROM symbols s JOIN stocks t ON t.symbol_id = s.id WHERE s.symbol IN ({placeholders})"
+        )
+        params = list(symbols)
+
+        if start_date:
+            query += " AND t.date >= %s"
             params.append(start_date)
         if end_date:
-            query += " AND date <= %s"
+            query += " AND t.date <= %s"
             params.append(end_date)
+        if after:
+            query += " AND (s.symbol > %s OR (s.symbol = %s AND t.date > %s))"
+            params.extend([after[0], after[0], after[1]])
+
+        query += " ORDER BY s.symbol, t.date LIMIT %s"
+        params.append(limit + 1)
 
-        query += " ORDER BY date ASC"
-        self.cursor.execute(query, params)
-        result = self.cursor.fetchall()
+        names, rows = self._fetch_tuples(query, params)
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1][0], rows[-1][1])
+        return names, rows, next_after
 
-        return pd.DataFrame(result)
+    def get_last_dates(self, symbols):
+        """
+        High-water mark per symbol in a single grouped query.
 
-    def fetch_watchlist(self):
+        Returns:
+            {symbol: last stored date}; symbols with no rows are absent.
+        """
+        if not symbols:
+            return {}
+        try:
+            placeholders = ", ".join(["%s"] * len(symbols))
+            self.cursor.execute(
+                "SELECT s.symbol, MAX(t.date) AS last_date FROM symbols s JOIN stocks t ON t.symbol_id = s.id "
+                f"WHERE s.symbol IN ({placeholders}) GROUP BY s.symbol",
+                list(symbols)
+            )
+            return {row["symbol"]: row["last_date"] for row in self.cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Error fetching last stored dates: {e}")
+            return {}
+
+    # ----------------- Intraday bars -----------------
+    def upsert_intraday_bars(self, symbol, resolution, df, batch_size=None):
+        """
+        Upsert bars of one resolution (in seconds) for a symbol.
+
+        Args:
+            df (DataFrame): INTRADAY_COLUMNS with ts as naive UTC timestamps.
+
+        Returns:
+            Rows written, or 0 if the write failed.
+        """
+        if df is None or df.empty:
+            return 0
+        batch_size = batch_size or DB_BATCH_SIZE
+        columns = ["symbol_id", "resolution"] + INTRADAY_COLUMNS
+        placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        updates = ", ".join(f"{col} = VALUES({col})" for col in INTRADAY_COLUMNS if col != "ts")
+        try:
+            symbol_id = self.symbol_ids([symbol], create=True)[symbol]
+            values = df[INTRADAY_COLUMNS].astype(object)
+            values = values.where(values.notnull(), None)
+            rows = [(symbol_id, resolution, ts.to_pydatetime(), *rest)
+                    for ts, *rest in values.itertuples(index=False, name=None)]
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                self.cursor.execute(
+                    f"INSERT INTO intraday_bars ({', '.join(columns)}) VALUES "
+                    + ", ".join([placeholder] * len(batch))
+                    + f" ON DUPLICATE KEY UPDATE {updates}",
+                    [value for row in batch for value in row]
+                )
+            self.conn.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Intraday upsert failed for {symbol} ({resolution}s): {e}")
+            self.conn.rollback()
+            return 0
+
+    def fetch_intraday_bars(self, symbol, resolution, start=None, end=None, limit=None):
+        """Bars of one resolution with start <= ts < end, ordered by ts."""
+        import pandas as pd
+        query = (
+            f"SELECT {', '.join(f't.{col}' for col in INTRADAY_COLUMNS)} "
+            "FROM intraday_bars t JOIN symbols s ON s.id = t.symbol_id "
+            "WHERE s.symbol = %s AND t.resolution = %s"
+        )
+        params = [symbol, resolution]
+        if start is not None:
+            query += " AND t.ts >= %s"
+            params.append(start)
+        if end is not None:
+            query += " AND t.ts < %s"
+            params.append(end)
+        query += " ORDER BY t.ts"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        columns, rows = self._fetch_tuples(query, params)
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        df["ts"] = pd.to_datetime(df["ts"])
+        return df
+
+    def get_intraday_resolutions(self, symbol):
+        """Resolutions (seconds) with stored bars for symbol, finest first."""
+        _, rows = self._fetch_tuples(
+            "SELECT DISTINCT t.resolution FROM intraday_bars t JOIN symbols s ON s.id = t.symbol_id "
+            "WHERE s.symbol = %s ORDER BY t.resolution",
+            [symbol]
+        )
+        return [int(row[0]) for row in rows]
+
+    def get_last_intraday_ts(self, symbols, resolution):
+        """{symbol: latest bar timestamp} for one resolution; symbols with no bars are absent."""
+        if not symbols:
+            return {}
+        try:
+            placeholders = ", ".join(["%s"] * len(symbols))
+            self.cursor.execute(
+                "SELECT s.symbol, MAX(t.ts) AS last_ts FROM symbols s JOIN intraday_bars t ON t.symbol_id = s.id "
+                f"WHERE s.symbol IN ({placeholders}) AND t.resolution = %s GROUP BY s.symbol",
+                [*symbols, resolution]
+            )
+            return {row["symbol"]: row["last_ts"] for row in self.cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Error fetching last intraday timestamps: {e}")
+            return {}
+
+    def prune_intraday_bars(self, symbol, resolution, before):
+        """Delete a symbol's bars of one resolution older than before; returns rows deleted."""
+        try:
+            deleted = self.cursor.execute(
+                "DELETE t FROM intraday_bars t JOIN symbols s ON s.id = t.symbol_id "
+                "WHERE s.symbol = %s AND t.resolution = %s AND t.ts < %s",
+                (symbol, resolution, before)
+            )
+            self.conn.commit()
+            return deleted
+        except Exception as e:
+            logger.error(f"Failed to prune {resolution}s bars for {symbol}: {e}")
+            self.conn.rollback()
+            return 0
+
+    def fetch_watchlist(self, raise_errors=False):
         try:
             self.cursor.execute("SELECT symbol, active FROM watchlist")
             rows = self.cursor.fetchall()
             # Only return the values for symbol and active
             return [(row["symbol"], row["active"]) for row in rows]
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error fetching watchlist: {e}")
             return []
     
@@ -180,15 +457,18 @@ class DBManager:
             return False
 
 
-    def get_active_watchlist(self):
+    def get_active_watchlist(self, raise_errors=False):
         """
         Fetches only active companies from the watchlist.
-        Returns a list of symbols that have active=TRUE.
+        Returns a list of symbols that have active=TRUE; on errors an empty
+        list, unless raise_errors is set (the API must not cache a failed read).
         """
         try:
             self.cursor.execute("SELECT symbol FROM watchlist WHERE active = TRUE")
             return [row["symbol"] for row in self.cursor.fetchall()]
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error fetching active watchlist: {e}")
             return []
 
@@ -223,10 +503,28 @@ class DBManager:
             return False
 
 
+    def reconnect(self):
+        """
+        Replace an owned connection that has gone away, keeping this instance
+        (and everything holding it) in place. Raises if connecting fails.
+        """
+        if not self.owns_connection:
+            raise RuntimeError("DBManager doesn't own its connection; return it to the pool instead")
+        for resource in (getattr(self, "cursor", None), getattr(self, "conn", None)):
+            try:
+                if resource is not None:
+                    resource.close()
+            except Exception:
+                pass
+        self.conn = connect()
+        self.cursor = self.conn.cursor()
+        logger.info("DBManager reconnected to database")
+
     def close(self):
         self.cursor.close()
-        self.conn.close()
-        logger.info("DBManager connection closed")
+        if self.owns_connection:
+            self.conn.close()
+            logger.info("DBManager connection closed")
 
 
 
@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql  # type: ignore
+from config import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL
+from logger_config import logger
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+def connect():
+    return pymysql.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        cursorclass=pymysql.cursors.DictCursor
+    )
+
+
+class ConnectionPool:
+    """
+    Bounded pool of pymysql connections.
+
+    At most `size` connections are checked out at once; callers wait up to
+    `timeout` seconds for one. Connections idle for longer than
+    `ping_interval` are pinged (reconnecting if needed) before reuse, and a
+    connection that fails its health check or is released as broken is
+    replaced with a fresh one.
+    """
+
+    def __init__(self, size=None, timeout=None, ping_interval=None, connect=connect):
+        self.size = size or DB_POOL_SIZE
+        self.timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+        self.ping_interval = DB_POOL_PING_INTERVAL if ping_interval is None else ping_interval
+        self._connect = connect
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "in_use": 0,
+        }
+        self._wait_times = deque(maxlen=1000)
+        self._checkout_times = deque(maxlen=1000)
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def _healthy(self, conn, idle_since):
+        if time.monotonic() - idle_since < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=True)
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            return False
+
+    def acquire(self):
+        began = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            raise PoolTimeout(f"No database connection available within {self.timeout}s")
+        waited = time.perf_counter() - began
+
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    candidate, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    self._count("created")
+                    break
+                if self._healthy(candidate, idle_since):
+                    conn = candidate
+                else:
+                    self._close(candidate)
+                    self._count("reconnects")
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._wait_times.append(waited)
+            self._checkout_times.append(time.perf_counter() - began)
+        return conn
+
+    def release(self, conn, broken=False):
+        try:
+            if broken:
+                self._close(conn)
+                self._count("discarded")
+            else:
+                try:
+                    conn.rollback()  # never hand out a connection mid-transaction
+                    self._idle.put((conn, time.monotonic()))
+                except Exception:
+                    self._close(conn)
+                    self._count("discarded")
+        finally:
+            self._count("in_use", -1)
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self.release(conn, broken=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn)
+        logger.info("Connection pool closed")
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            waits = sorted(self._wait_times)
+            checkouts = sorted(self._checkout_times)
+        stats.update({
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "wait_seconds": _summary(waits),
+            "checkout_seconds": _summary(checkouts),
+        })
+        return stats
+
+
+def _summary(samples):
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "count": len(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
@@ -0,0 +1,277 @@
+"""
+Rate-limit-aware fetching.
+
+FetchScheduler wraps a raising fetch function (e.g. fetch_stock_data with
+raise_errors=True) with:
+
+- a token bucket capping upstream requests per second,
+- retries with exponential backoff and full jitter on transient errors
+  (429s, timeouts, connection resets), honouring Retry-After hints,
+- a circuit breaker that stops calling a provider after repeated transient
+  failures and probes it again after a cool-down.
+
+Permanent errors are raised immediately; an open breaker raises
+CircuitOpenError without calling upstream.
+
+Each provider gets its own scheduler (scheduler_for), so one provider being
+throttled or down doesn't hold back the others; fetch_with_fallback walks a
+symbol's provider order until one returns bars.
+"""
+import random
+import re
+import socket
+import threading
+import time
+
+from config import (
+    FETCH_RATE, FETCH_BURST, FETCH_MAX_RETRIES, FETCH_BACKOFF_BASE, FETCH_BACKOFF_MAX,
+    BREAKER_FAILURES, BREAKER_RESET_SECONDS
+)
+from logger_config import logger
+from api_fetcher import RateLimitError, fetch_stock_data, get_provider, providers_for
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+# Matched on the error text with the ticker removed, so a symbol like 4293.T
+# or 503.HK can't make a permanent error look like throttling or an outage
+_TRANSIENT = re.compile(
+    r"too many requests|rate limit|timed out|timeout|temporarily unavailable|connection reset"
+    r"|\b(?:429|502|503|504)\b",
+    re.IGNORECASE
+)
+_TRANSIENT_STATUS = (429, 502, 503, 504)
+
+def without_symbol(message, symbol):
+    """message with every occurrence of symbol removed (case-insensitively)."""
+    if not symbol:
+        return message
+    return re.sub(re.escape(symbol), "", message, flags=re.IGNORECASE)
+
+def is_transient(exc, symbol=None):
+    """
+    True for errors worth retrying: throttling, timeouts and dropped connections.
+    `symbol` is left out of the error text before it is matched.
+    """
+    if isinstance(exc, (RateLimitError, TimeoutError, ConnectionError, socket.timeout)):
+        return True
+    # requests errors, matched without importing it
+    if type(exc).__name__ in ("ConnectTimeout", "ReadTimeout", "ConnectionError"):
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status in _TRANSIENT_STATUS
+    return bool(_TRANSIENT.search(without_symbol(str(exc), symbol)))
+
+def prioritize(symbols, last_dates=None):
+    """
+    Fetch order: symbols with no stored history first (in watchlist order),
+    then the rest from the stalest last stored date to the freshest.
+    """
+    last_dates = last_dates or {}
+    new = [s for s in symbols if last_dates.get(s) is None]
+    stale = sorted((s for s in symbols if last_dates.get(s) is not None), key=lambda s: last_dates[s])
+    return new + stale
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Empty the bucket, e.g. after upstream signals throttling."""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive transient failures; open ->
+    half-open after `reset_seconds`, letting one probe through; the probe's
+    outcome closes or re-opens it.
+    """
+
+    def __init__(self, failures, reset_seconds):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._consecutive = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == "half_open" or self._consecutive >= self.failures:
+                if self.state != "open":
+                    logger.warning(f"Circuit breaker opened after {self._consecutive} consecutive failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class FetchScheduler:
+    """
+    Args:
+        fetch (callable): fetch(symbol, **kwargs) that raises on errors.
+        name (str): Provider name for logs and metrics.
+        rate (float): Upstream requests per second.
+        burst (int): Token bucket size.
+        max_retries (int): Retries per symbol after the first attempt.
+        backoff_base, backoff_max (float): Backoff cap is min(backoff_max, backoff_base * 2**attempt).
+        sleep (callable): Injectable for tests.
+    """
+
+    def __init__(self, fetch, name="yfinance", rate=None, burst=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, breaker=None, sleep=time.sleep):
+        self._fetch = fetch
+        self.name = name
+        self.bucket = TokenBucket(rate or FETCH_RATE, burst or FETCH_BURST)
+        self.max_retries = FETCH_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = FETCH_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = FETCH_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.breaker = breaker or CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "succeeded": 0, "retries": 0, "rate_limited": 0,
+                      "transient_errors": 0, "permanent_errors": 0, "rejected_open": 0,
+                      "throttle_wait_seconds": 0.0, "backoff_seconds": 0.0}
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter delay for a retry; a server Retry-After is a lower bound."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0)
+
+    def fetch(self, symbol, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._count("rejected_open")
+                raise CircuitOpenError(f"{self.name} circuit open; skipped {symbol}")
+
+            self._count("throttle_wait_seconds", self.bucket.acquire())
+            self._count("requests")
+            try:
+                df = self._fetch(symbol, **kwargs)
+            except Exception as e:
+                if not is_transient(e, symbol):
+                    # The provider answered; the request itself is bad
+                    self.breaker.record_success()
+                    self._count("permanent_errors")
+                    raise
+                self.breaker.record_failure()
+                retry_after = getattr(e, "retry_after", None)
+                if isinstance(e, RateLimitError):
+                    self._count("rate_limited")
+                    self.bucket.drain()
+                else:
+                    self._count("transient_errors")
+                if attempt == self.max_retries:
+                    logger.error(f"Giving up on {symbol} after {attempt + 1} attempts: {e}")
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                logger.warning(f"Transient error fetching {symbol} from {self.name} ({e}); retrying in {delay:.1f}s")
+                self._count("retries")
+                self._count("backoff_seconds", delay)
+                self._sleep(delay)
+            else:
+                self.breaker.record_success()
+                self._count("succeeded")
+                return df
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, provider=self.name, breaker=self.breaker.state)
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def scheduler_for(name):
+    """
+    Process-wide scheduler for one provider, so its limits and breaker state
+    are shared by every caller. Uses the provider's own `rate` when it has one.
+    """
+    with _schedulers_lock:
+        if name not in _schedulers:
+            provider = get_provider(name)
+            _schedulers[name] = FetchScheduler(
+                lambda symbol, **kwargs: fetch_stock_data(symbol, provider=provider, raise_errors=True, **kwargs),
+                name=name,
+                rate=getattr(provider, "rate", None),
+            )
+        return _schedulers[name]
+
+def fetch_with_fallback(symbol, **kwargs):
+    """
+    Fetch from the symbol's providers in order (providers_for), moving on when
+    one errors or has no bars. Raises the last error if every provider failed.
+    """
+    names = providers_for(symbol)
+    if not names:
+        raise ValueError(f"No data providers configured for {symbol} (see DATA_PROVIDERS)")
+    error, df = None, None
+    for name in names:
+        try:
+            df = scheduler_for(name).fetch(symbol, **kwargs)
+        except Exception as e:
+            error = e
+            logger.warning(f"{name} failed for {symbol}: {e}")
+            continue
+        if df is not None and not df.empty:
+            return df
+    if error is not None:
+        raise error
+    return df
+
+def metrics():
+    """Per-provider scheduler metrics."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return [scheduler.metrics() for scheduler in schedulers]
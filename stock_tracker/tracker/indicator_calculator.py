@@ -1,4 +1,5 @@
-import pandas as pd
+from config import INDICATORS
+from metrics import stage, count_rows
 
 def calculate_sma(df,window=14):
 
@@ -19,7 +20,219 @@ def calculate_rsi(df,window=14):
 
     return rsi
 
+
+# ----------------- Series planner -----------------
+class SeriesPlan:
+    """
+    Memoized base series for one frame.
+
+    Indicators ask for series by key, e.g. ("diff", "close_price") or
+    ("rolling", "close_price", 20, "mean", None); each key is computed once
+    per frame and shared by every indicator that needs it. With `by`, every
+    operation runs per group (symbol) so windows reset at group boundaries.
+    """
+
+    def __init__(self, df, by=None):
+        self.df = df
+        self.by = df[by] if by else None
+        self._cache = {}
+        self.stats = {"computed": 0, "reused": 0}
+
+    def get(self, key):
+        if key in self._cache:
+            self.stats["reused"] += 1
+            return self._cache[key]
+        if isinstance(key, str):
+            value = self.df[key]
+        else:
+            op, *args = key
+            value = getattr(self, f"_{op}")(*args)
+            self.stats["computed"] += 1
+        self._cache[key] = value
+        return value
+
+    def _grouped(self, series):
+        return series.groupby(self.by, sort=False) if self.by is not None else series
+
+    def _ungroup(self, series):
+        return series.droplevel(0) if self.by is not None else series
+
+    def _diff(self, src):
+        return self._grouped(self.get(src)).diff()
+
+    def _shift(self, src):
+        return self._grouped(self.get(src)).shift()
+
+    def _gain(self, src):
+        delta = self.get(("diff", src))
+        return delta.where(delta > 0, 0)
+
+    def _loss(self, src):
+        delta = self.get(("diff", src))
+        return -delta.where(delta < 0, 0)
+
+    def _rolling(self, src, window, stat, min_periods):
+        rolling = self._grouped(self.get(src)).rolling(window=window, min_periods=min_periods)
+        if stat == "pstd":
+            return self._ungroup(rolling.std(ddof=0))
+        return self._ungroup(getattr(rolling, stat)())
+
+    def _ewm(self, src, alpha, min_periods):
+        ewm = self._grouped(self.get(src)).ewm(alpha=alpha, adjust=False, min_periods=min_periods)
+        return self._ungroup(ewm.mean())
+
+    def _sub(self, a, b):
+        return self.get(a) - self.get(b)
+
+    def _mul(self, a, b):
+        return self.get(a) * self.get(b)
+
+    def _typical(self):
+        return (self.get("high_price") + self.get("low_price") + self.get("close_price")) / 3
+
+    def _true_range(self):
+        import pandas as pd
+        prev_close = self.get(("shift", "close_price"))
+        high, low = self.get("high_price"), self.get("low_price")
+        return pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+
+
+def _rs_to_rsi(avg_gain, avg_loss):
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def _ema_key(src, span):
+    return ("ewm", src, 2 / (span + 1), 0)
+
+
+# ----------------- Indicator registry -----------------
+REGISTRY = {}
+
+def indicator(name, columns, defaults, warmup):
+    """
+    Register an indicator.
+
+    Args:
+        name (str): Name used in the INDICATORS config (e.g. "ema:20").
+        columns (list): stocks columns the indicator writes.
+        defaults (tuple): Default parameters.
+        warmup (callable): Bars of history needed before values settle, from params.
+    """
+    def register(fn):
+        REGISTRY[name] = {"fn": fn, "columns": columns, "defaults": defaults, "warmup": warmup}
+        return fn
+    return register
+
+@indicator("sma", ["sma"], (14,), lambda w: w)
+def _sma(plan, window):
+    return {"sma": plan.get(("rolling", "close_price", window, "mean", None))}
+
+@indicator("rsi", ["rsi"], (14,), lambda w: w + 1)
+def _rsi(plan, window):
+    avg_gain = plan.get(("rolling", ("gain", "close_price"), window, "mean", 1))
+    avg_loss = plan.get(("rolling", ("loss", "close_price"), window, "mean", 1))
+    return {"rsi": _rs_to_rsi(avg_gain, avg_loss)}
+
+@indicator("rsi_wilder", ["rsi_wilder"], (14,), lambda w: 5 * w)
+def _rsi_wilder(plan, window):
+    avg_gain = plan.get(("ewm", ("gain", "close_price"), 1 / window, window))
+    avg_loss = plan.get(("ewm", ("loss", "close_price"), 1 / window, window))
+    return {"rsi_wilder": _rs_to_rsi(avg_gain, avg_loss)}
+
+@indicator("ema", ["ema"], (20,), lambda span: 3 * span)
+def _ema(plan, span):
+    return {"ema": plan.get(_ema_key("close_price", span))}
+
+@indicator("macd", ["macd", "macd_signal", "macd_hist"], (12, 26, 9), lambda fast, slow, signal: 3 * (slow + signal))
+def _macd(plan, fast, slow, signal):
+    macd_key = ("sub", _ema_key("close_price", fast), _ema_key("close_price", slow))
+    macd = plan.get(macd_key)
+    macd_signal = plan.get(_ema_key(macd_key, signal))
+    return {"macd": macd, "macd_signal": macd_signal, "macd_hist": macd - macd_signal}
+
+@indicator("bbands", ["bb_upper", "bb_middle", "bb_lower"], (20, 2), lambda window, k: window)
+def _bbands(plan, window, k):
+    middle = plan.get(("rolling", "close_price", window, "mean", None))
+    std = plan.get(("rolling", "close_price", window, "pstd", None))
+    return {"bb_upper": middle + k * std, "bb_middle": middle, "bb_lower": middle - k * std}
+
+@indicator("atr", ["atr"], (14,), lambda w: 5 * w)
+def _atr(plan, window):
+    return {"atr": plan.get(("ewm", ("true_range",), 1 / window, window))}
+
+@indicator("vwap", ["vwap"], (20,), lambda w: w)
+def _vwap(plan, window):
+    price_volume = plan.get(("rolling", ("mul", ("typical",), "volume"), window, "sum", None))
+    volume = plan.get(("rolling", "volume", window, "sum", None))
+    return {"vwap": price_volume / volume}
+
+
+def parse_indicators(text):
+    """
+    Parse a declarative spec such as "sma:20,rsi:14,macd:12:26:9,bbands"
+    into [(name, params), ...]; omitted params take the registry defaults.
+    """
+    specs = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, *params = item.split(":")
+        if name not in REGISTRY:
+            raise ValueError(f"Unknown indicator '{name}'. Available: {', '.join(sorted(REGISTRY))}")
+        defaults = REGISTRY[name]["defaults"]
+        params = tuple(type(d)(p) for d, p in zip(defaults, params)) + defaults[len(params):]
+        specs.append((name, params))
+    return specs
+
+def indicator_columns(specs):
+    return [col for name, _ in specs for col in REGISTRY[name]["columns"]]
+
+def warmup_bars(specs):
+    return max((REGISTRY[name]["warmup"](*params) for name, params in specs), default=0)
+
+
+ENABLED_INDICATORS = parse_indicators(INDICATORS)
+INDICATOR_COLUMNS = indicator_columns(ENABLED_INDICATORS)
+
+
+def compute_indicators(df, specs=None, by=None):
+    """
+    Add the columns of every indicator in specs (default: ENABLED_INDICATORS)
+    to df, sharing intermediate series between them.
+
+    Args:
+        df (DataFrame): Price frame with a unique index; with `by`, sorted by (by, date).
+        by (str): Group column (e.g. "symbol") to compute many symbols in one pass.
+    """
+    specs = ENABLED_INDICATORS if specs is None else specs
+    with stage("indicators", rows=len(df)):
+        plan = SeriesPlan(df, by=by)
+        for name, params in specs:
+            for col, series in REGISTRY[name]["fn"](plan, *params).items():
+                df[col] = series
+    count_rows("indicators", df)
+    return df
+
+def add_enabled_indicators(df):
+    return compute_indicators(df)
+
+def add_enabled_indicators_multi(df):
+    return compute_indicators(df, by="symbol")
+
+
 def add_indicators(df,sma_window=14,rsi_window=14):
-    df['sma'] = calculate_sma(df, sma_window)
-    df['rsi'] = calculate_rsi(df, rsi_window)
-    return df
\ No newline at end of file
+    return compute_indicators(df, [("sma", (sma_window,)), ("rsi", (rsi_window,))])
+
+
+def add_indicators_multi(df,sma_window=14,rsi_window=14):
+    """
+    Compute SMA and RSI for every symbol of a long frame in one pass.
+
+    Args:
+        df (DataFrame): Rows for many symbols with a `symbol` column, sorted by
+            (symbol, date) and with a unique index.
+
+    Returns:
+        df with sma and rsi columns; values are identical to calling
+        add_indicators on each symbol's rows separately.
+    """
+    return compute_indicators(df, [("sma", (sma_window,)), ("rsi", (rsi_window,))], by="symbol")
@@ -0,0 +1,397 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+
+from config import FETCH_CONCURRENCY, PIPELINE_QUEUE_SIZE, WRITER_BATCH_SYMBOLS, BACKFILL_PERIOD
+from logger_config import logger
+from api_fetcher import PRICE_COLUMNS, RateLimitError
+from fetch_scheduler import CircuitOpenError, fetch_with_fallback, prioritize
+from change_detector import ChangeDetector
+from metrics import stage
+from stream_publisher import default_publisher
+from indicator_calculator import (
+    ENABLED_INDICATORS, add_enabled_indicators, add_enabled_indicators_multi, warmup_bars
+)
+
+_DONE = object()
+
+
+def warmup_days(bars=None):
+    """
+    Calendar days to re-fetch before a symbol's last stored date so the
+    enabled indicators' windows are fully populated for the new bars.
+    """
+    bars = bars or warmup_bars(ENABLED_INDICATORS) + 1
+    # ~5 trading days per 7 calendar days, plus slack for holidays
+    return int(bars * 7 / 5) + 7
+
+
+class IngestPipeline:
+    """
+    Fetch -> indicators -> DB write pipeline for a list of symbols.
+
+    Fetches run on a thread pool, indicators on one worker thread (computed
+    over whatever symbols are queued in a single vectorized pass) and all
+    writes on a single writer thread that owns the DB connection. Stages are
+    joined by bounded queues, so slow writes back-pressure the fetchers.
+    A failure for one symbol is logged and never stops the others.
+
+    The writer diffs each batch against a ChangeDetector snapshot and only
+    upserts new or revised bars. The snapshot lives as long as the pipeline,
+    so a long-running caller should reuse one instance.
+    """
+
+    def __init__(self, db, fetch=None, indicators=add_enabled_indicators,
+                 multi_indicators=add_enabled_indicators_multi,
+                 fetch_workers=None, queue_size=None, writer_batch_symbols=None, store=None,
+                 publish=None, engine=None):
+        """
+        Args:
+            fetch (callable): fetch(symbol, period=/start=) returning a price frame;
+                defaults to fetch_with_fallback (rate-limited, per-provider fallback).
+            store: Optional ColumnarStore; every successfully written frame is
+                appended to it as well.
+            publish (callable): publish({symbol: df}) called once per written batch;
+                defaults to the /stream publisher (see STREAM_PUBLISH_URL). Pass
+                False to disable.
+            engine: Optional streaming_indicators.IndicatorEngine for the enabled
+                indicators (see IndicatorEngine.for_specs). Symbols whose engine
+                state ends at their last stored bar are advanced by it, constant
+                time per new bar; the rest are computed in full and then seed it.
+        """
+        self.db = db
+        self.store = store
+        self.fetch = fetch or fetch_with_fallback
+        self.indicators = indicators
+        self.multi_indicators = multi_indicators
+        self.fetch_workers = fetch_workers or FETCH_CONCURRENCY
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.writer_batch_symbols = writer_batch_symbols or WRITER_BATCH_SYMBOLS
+        self.changes = ChangeDetector()
+        self.publish = default_publisher() if publish is None else publish
+        self.engine = engine
+
+    def run(self, symbols, last_dates=None, period=None, history=None):
+        """
+        Process every symbol and block until all stages have drained.
+
+        Args:
+            symbols (list): Symbols to ingest.
+            last_dates (dict): {symbol: last stored date}. Symbols listed here are
+                fetched incrementally and only bars on/after that date are written;
+                others (or every symbol when None) get a full `period` backfill.
+            period (str): Backfill period, defaults to BACKFILL_PERIOD.
+            history (dict): Optional {symbol: recent price rows} kept by a long-running
+                caller. Symbols found here are fetched from their last cached bar
+                only, the cached rows serve as indicator warm-up, and the dict is
+                updated with each successfully written symbol's new tail.
+
+        Symbols are fetched new-first, then stalest-first (see prioritize).
+
+        Returns:
+            Dict with "written", "unchanged" (every fetched bar already stored),
+            "empty", "failed" and "throttled" (rate limited or circuit open)
+            symbol lists, "rows" ({"inserted", "updated", "skipped"} counts)
+            and "seconds".
+        """
+        self._last_dates = last_dates or {}
+        self._period = period or BACKFILL_PERIOD
+        self._history = history
+        self._fetched = queue.Queue(maxsize=self.queue_size)
+        self._computed = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._summary = {"written": [], "unchanged": [], "empty": [], "failed": [], "throttled": [],
+                         "rows": {"inserted": 0, "updated": 0, "skipped": 0}}
+        self._row_counts = {}
+
+        began = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._fetch_stage, args=(prioritize(list(symbols), self._fetch_order_dates()),),
+                             name="ingest-fetch"),
+            threading.Thread(target=self._indicator_stage, name="ingest-indicators"),
+            threading.Thread(target=self._writer_stage, name="ingest-writer"),
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self._summary["seconds"] = time.perf_counter() - began
+        logger.info(
+            f"Pipeline finished in {self._summary['seconds']:.2f}s: "
+            f"{len(self._summary['written'])} written, {len(self._summary['unchanged'])} unchanged, "
+            f"{len(self._summary['empty'])} empty, {len(self._summary['failed'])} failed, "
+            f"{len(self._summary['throttled'])} throttled; rows {self._summary['rows']}"
+        )
+        return self._summary
+
+    def _record(self, outcome, symbol):
+        with self._lock:
+            self._summary[outcome].append(symbol)
+
+    def _count_rows(self, counts, keys):
+        with self._lock:
+            for key in keys:
+                self._summary["rows"][key] += counts[key]
+
+    # ----------------- Stages -----------------
+    def _fetch_one(self, symbol):
+        logger.info(f"Processing {symbol}")
+        last_date = self._last_dates.get(symbol)
+        try:
+            cached = self._cached_history(symbol)
+            if cached is not None:
+                df = self.fetch(symbol, start=cached["date"].iloc[-1].date())
+            elif last_date is not None:
+                start = last_date - timedelta(days=warmup_days())
+                df = self.fetch(symbol, start=start)
+            else:
+                df = self.fetch(symbol, period=self._period)
+            if df.empty:
+                logger.warning(f"No data fetched for {symbol}")
+                self._record("empty", symbol)
+                return
+            self._fetched.put((symbol, df))
+        except (RateLimitError, CircuitOpenError) as e:
+            logger.error(f"Skipped {symbol}, upstream is throttling: {e}")
+            self._record("throttled", symbol)
+        except Exception as e:
+            self._failed(symbol, e)
+
+    def _fetch_order_dates(self):
+        dates = dict(self._last_dates)
+        for symbol in self._history or {}:
+            cached = self._cached_history(symbol)
+            if cached is not None:
+                dates[symbol] = cached["date"].iloc[-1].date()
+        return dates
+
+    def _fetch_stage(self, symbols):
+        try:
+            with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="fetch") as pool:
+                for symbol in symbols:
+                    pool.submit(self._fetch_one, symbol)
+        finally:
+            self._fetched.put(_DONE)
+
+    def _indicator_stage(self):
+        done = False
+        try:
+            while not done:
+                batch = [self._fetched.get()]
+                while len(batch) < self.writer_batch_symbols:
+                    try:
+                        batch.append(self._fetched.get_nowait())
+                    except queue.Empty:
+                        break
+                done = _DONE in batch
+                items = []
+                for item in batch:
+                    if item is _DONE:
+                        continue
+                    try:
+                        items.append(self._with_history(*item))
+                    except Exception as e:
+                        self._failed(item[0], e)
+                if items:
+                    self._compute(items)
+        finally:
+            if not done:
+                # This stage died: keep taking fetched frames so fetch workers
+                # blocked on the bounded queue can finish
+                logger.error("Indicator stage stopped early; failing the remaining fetched symbols")
+                while True:
+                    item = self._fetched.get()
+                    if item is _DONE:
+                        break
+                    self._record("failed", item[0])
+            self._computed.put(_DONE)
+
+    def _failed(self, symbol, error):
+        logger.error(f"Failed to process {symbol}: {error}")
+        self._record("failed", symbol)
+
+    def _compute(self, items):
+        streamed, items = self._streamed(items)
+        try:
+            frames = self._compute_multi(items) if len(items) > 1 else None
+        except Exception as e:
+            logger.warning(f"Vectorized indicators failed for {len(items)} symbols, retrying per symbol: {e}")
+            frames = None
+        if frames is None:
+            frames = []
+            for symbol, df in items:
+                try:
+                    frames.append((symbol, self.indicators(df)))
+                except Exception as e:
+                    self._failed(symbol, e)
+        if self.engine is not None:
+            for symbol, df in frames:
+                self._seed(symbol, df)
+
+        for symbol, df in streamed + frames:
+            try:
+                tail = df[PRICE_COLUMNS].tail(warmup_bars(ENABLED_INDICATORS) + 1) if self._history is not None else None
+                last_date = self._last_dates.get(symbol)
+                if last_date is not None:
+                    # Warm-up rows are already stored; the last stored bar is
+                    # kept because it may have been a still-forming candle.
+                    df = df[df["date"].dt.date >= last_date]
+            except Exception as e:
+                self._failed(symbol, e)
+                continue
+            self._computed.put((symbol, df, tail))
+
+    def _seed(self, symbol, df):
+        try:
+            self.engine.seed(symbol, df)
+        except Exception as e:
+            # The symbol just takes the batch path again next time
+            logger.warning(f"Could not seed streaming indicators for {symbol}: {e}")
+            self.engine.forget(symbol)
+
+    def _streamed(self, items):
+        """Split off symbols the streaming engine can advance; returns (frames, rest)."""
+        if self.engine is None:
+            return [], items
+        streamed, rest = [], []
+        for symbol, df in items:
+            try:
+                if self.engine.in_step(symbol, self._last_dates.get(symbol), df):
+                    with stage("indicators_streaming", symbol=symbol):
+                        streamed.append((symbol, self.engine.apply(df, symbol)))
+                    continue
+            except Exception as e:
+                logger.warning(f"Streaming indicators failed for {symbol}, computing in full: {e}")
+                self.engine.forget(symbol)
+            rest.append((symbol, df))
+        return streamed, rest
+
+    def _cached_history(self, symbol):
+        if self._history is None:
+            return None
+        cached = self._history.get(symbol)
+        return cached if cached is not None and not cached.empty else None
+
+    def _with_history(self, symbol, df):
+        """Prepend cached warm-up rows older than the first fetched bar."""
+        cached = self._cached_history(symbol)
+        if cached is None:
+            return symbol, df
+        first = df["date"].iloc[0].date()
+        older = cached[cached["date"].dt.date < first]
+        return symbol, pd.concat([older, df], ignore_index=True)
+
+    def _compute_multi(self, items):
+        # Dates are left out of the combined frame: symbols from different
+        # exchanges carry different timezones and would not concatenate cleanly.
+        combined = pd.concat(
+            [df.drop(columns="date").assign(symbol=symbol) for symbol, df in items],
+            ignore_index=True
+        )
+        combined = self.multi_indicators(combined)
+
+        frames, offset = [], 0
+        for symbol, df in items:
+            part = combined.iloc[offset:offset + len(df)]
+            offset += len(df)
+            added = {col: part[col].to_numpy() for col in part.columns if col not in df.columns and col != "symbol"}
+            frames.append((symbol, df.assign(**added)))
+        return frames
+
+    def _writer_stage(self):
+        pending = {}
+        while True:
+            try:
+                item = self._computed.get(timeout=0.5 if pending else None)
+            except queue.Empty:
+                item = None
+
+            if item is None or item is _DONE or len(pending) >= self.writer_batch_symbols:
+                self._flush(pending)
+                pending = {}
+            if item is _DONE:
+                break
+            if item is not None:
+                symbol, df, tail = item
+                pending[symbol] = (df, tail)
+
+    def _changed(self, pending):
+        """Drop bars identical to what is stored; symbols left with none are done."""
+        try:
+            self.changes.prime(self.db, {symbol: df for symbol, (df, _) in pending.items()})
+        except Exception as e:
+            logger.warning(f"Change detection could not read stored bars, writing every fetched bar: {e}")
+
+        changed = {}
+        for symbol, (df, tail) in pending.items():
+            df, counts = self.changes.diff(symbol, df)
+            self._count_rows(counts, ["skipped"])
+            if df.empty:
+                self._record("unchanged", symbol)
+                if self._history is not None:
+                    self._history[symbol] = tail
+                continue
+            self._row_counts[symbol] = counts
+            changed[symbol] = (df, tail)
+        return changed
+
+    def _flush(self, pending):
+        pending = self._changed(pending) if pending else pending
+        if not pending:
+            return
+        stats = self._write({symbol: df for symbol, (df, _) in pending.items()})
+        if stats is not None and all(batch["ok"] for batch in stats):
+            for symbol, (df, tail) in pending.items():
+                self._written(symbol, df, tail)
+            self._publish({symbol: df for symbol, (df, _) in pending.items()})
+            return
+
+        # A failed batch rolls back rows from several symbols; retry them one by one
+        # so a single bad symbol only fails itself.
+        written = {}
+        for symbol, (df, tail) in pending.items():
+            stats = self._write({symbol: df})
+            if stats is not None and all(batch["ok"] for batch in stats):
+                self._written(symbol, df, tail)
+                written[symbol] = df
+            else:
+                logger.error(f"Failed to process {symbol}: database write failed")
+                self._record("failed", symbol)
+                if self._history is not None:
+                    # Fall back to the stored high-water mark next time
+                    self._history.pop(symbol, None)
+        self._publish(written)
+
+    def _publish(self, frames):
+        if not self.publish or not frames:
+            return
+        try:
+            self.publish(frames)
+        except Exception as e:
+            logger.error(f"Publishing {len(frames)} symbols to the stream failed: {e}")
+
+    def _written(self, symbol, df, tail):
+        counts = self._row_counts.pop(symbol)
+        logger.info(f"Data processed for {symbol}: {counts['inserted']} inserted, {counts['updated']} updated")
+        self._record("written", symbol)
+        self._count_rows(counts, ["inserted", "updated"])
+        self.changes.commit(symbol, df)
+        if self.store is not None:
+            try:
+                self.store.append(symbol, df)
+            except Exception as e:
+                logger.error(f"Columnar store append failed for {symbol}: {e}")
+        if self._history is not None:
+            self._history[symbol] = tail
+
+    def _write(self, frames):
+        try:
+            return self.db.bulk_upsert_stock_data(frames)
+        except Exception as e:
+            logger.error(f"Writer batch of {len(frames)} symbols failed: {e}")
+            return None
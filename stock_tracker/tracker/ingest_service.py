@@ -0,0 +1,218 @@
+"""
+Resident ingestion service.
+
+Replaces the spawn-per-tick model (a fresh `python main.py` every 10 s) with
+one long-running process that keeps its DB connection, the watchlist, each
+symbol's high-water mark and indicator warm-up rows in memory between ticks.
+
+    python ingest_service.py
+
+Ticks never overlap: they run on a single thread, every INGEST_INTERVAL
+seconds plus up to INGEST_JITTER seconds of random jitter. POST /trigger on
+the local trigger port wakes the service for an immediate tick (used by the
+watchlist endpoints); GET /status returns tick latency statistics.
+"""
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Taken before the heavy imports below so cold-start cost includes them
+_PROCESS_STARTED = time.perf_counter()
+
+import os
+import sys
+from config import (
+    INGEST_INTERVAL, INGEST_JITTER, INGEST_TRIGGER_HOST, INGEST_TRIGGER_PORT, WATCHLIST_REFRESH_SECONDS
+)
+from logger_config import logger
+from company_cache import CompanyCache
+from db_manager import DBManager
+from ingest_pipeline import IngestPipeline
+from indicator_calculator import ENABLED_INDICATORS
+from streaming_indicators import IndicatorEngine
+from read_cache import bump_data_version
+import metrics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from setup.setup_db import ensure_schema
+
+
+class IngestService:
+
+    def __init__(self, interval=None, jitter=None, host=None, port=None):
+        self.interval = INGEST_INTERVAL if interval is None else interval
+        self.jitter = INGEST_JITTER if jitter is None else jitter
+        self.host = host or INGEST_TRIGGER_HOST
+        self.port = INGEST_TRIGGER_PORT if port is None else port
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._watchlist_stale = True
+        self._watchlist = []
+        self._watchlist_loaded_at = 0.0
+        self._last_dates = {}
+        self._history = {}
+        self._tick_seconds = deque(maxlen=500)
+        self._ticks = 0
+        self._triggers = 0
+        self.db = None
+        self.cold_start_seconds = None
+
+    # ----------------- Lifecycle -----------------
+    def start(self):
+        ensure_schema()
+        self.db = DBManager()
+        # SMA/RSI advance per new bar when those are the only enabled indicators
+        self.pipeline = IngestPipeline(self.db, engine=IndicatorEngine.for_specs(ENABLED_INDICATORS))
+        self.profiles = CompanyCache()
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler_for(self))
+        threading.Thread(target=self._server.serve_forever, name="ingest-trigger", daemon=True).start()
+
+        # Cost a spawn-per-tick run pays before doing any work: interpreter and
+        # imports up to this module, then schema setup and connecting.
+        self.cold_start_seconds = time.perf_counter() - _PROCESS_STARTED
+        logger.info(
+            f"Ingest service ready in {self.cold_start_seconds:.2f}s "
+            f"(trigger on http://{self.host}:{self.port}/trigger, interval {self.interval}s)"
+        )
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """Request an immediate tick; triggers during a running tick coalesce into one."""
+        self._triggers += 1
+        self._watchlist_stale = True
+        self._wake.set()
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                # Cleared before the tick, so a trigger arriving at any point
+                # after this still cuts the following wait short
+                self._wake.clear()
+                self.tick()
+                if self._stop.is_set():
+                    break
+                self._wake.wait(timeout=self.interval + random.uniform(0, self.jitter))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.shutdown()
+            if self.pipeline.publish:
+                self.pipeline.publish.close()
+            self.profiles.close()
+            self.db.close()
+            logger.info("Ingest service stopped")
+
+    # ----------------- Ticks -----------------
+    def _ensure_connection(self):
+        # Reconnects in place: the pipeline holds the same DBManager, and its
+        # change snapshot and indicator state stay valid across reconnects
+        try:
+            self.db.conn.ping(reconnect=True)
+        except Exception as e:
+            logger.warning(f"Reconnecting ingest DB connection: {e}")
+            self.db.reconnect()
+
+    def _refresh_watchlist(self):
+        expired = time.monotonic() - self._watchlist_loaded_at > WATCHLIST_REFRESH_SECONDS
+        if not (self._watchlist_stale or expired):
+            return
+        # A failed read fails the tick instead of looking like an empty
+        # watchlist, which would drop every symbol's cached state
+        watchlist = self.db.get_active_watchlist(raise_errors=True)
+        new = [s for s in watchlist if s not in self._last_dates and s not in self._history]
+        if new:
+            self._last_dates.update(self.db.get_last_dates(new))
+        for symbol in (set(self._history) | set(self._last_dates)) - set(watchlist):
+            self._history.pop(symbol, None)
+            self._last_dates.pop(symbol, None)
+            self.pipeline.changes.forget(symbol)
+            if self.pipeline.engine is not None:
+                self.pipeline.engine.forget(symbol)
+        # Keeps /company profiles warm for the watchlist; fresh entries are skipped
+        self.profiles.prefetch(watchlist)
+        self._watchlist = watchlist
+        self._watchlist_loaded_at = time.monotonic()
+        self._watchlist_stale = False
+
+    def tick(self):
+        began = time.perf_counter()
+        try:
+            self._ensure_connection()
+            self._refresh_watchlist()
+            if not self._watchlist:
+                logger.info("No active symbols in watchlist.")
+                return
+
+            # Cached warm-up rows are the freshest high-water mark
+            for symbol, tail in self._history.items():
+                if tail is not None and not tail.empty:
+                    self._last_dates[symbol] = tail["date"].iloc[-1].date()
+
+            summary = self.pipeline.run(self._watchlist, last_dates=self._last_dates, history=self._history)
+            if summary["written"]:
+                bump_data_version()
+            metrics.record_run(summary)
+            metrics.export()
+        except Exception as e:
+            logger.error(f"Ingest tick failed: {e}")
+        finally:
+            elapsed = time.perf_counter() - began
+            self._ticks += 1
+            self._tick_seconds.append(elapsed)
+            logger.info(
+                f"Tick {self._ticks} took {elapsed:.2f}s "
+                f"(cold start overhead avoided: {self.cold_start_seconds:.2f}s)"
+            )
+
+    def status(self):
+        samples = sorted(self._tick_seconds)
+        return {
+            "ticks": self._ticks,
+            "triggers": self._triggers,
+            "watchlist_size": len(self._watchlist),
+            "cold_start_seconds": self.cold_start_seconds,
+            "last_tick_seconds": self._tick_seconds[-1] if self._tick_seconds else None,
+            "p50_tick_seconds": samples[len(samples) // 2] if samples else None,
+            "p95_tick_seconds": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else None,
+        }
+
+
+def _handler_for(service):
+    class TriggerHandler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            payload = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path == "/trigger":
+                service.trigger()
+                self._reply(202, {"triggered": True})
+            else:
+                self._reply(404, {"detail": "Not found"})
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(200, service.status())
+            else:
+                self._reply(404, {"detail": "Not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return TriggerHandler
+
+
+if __name__ == "__main__":
+    IngestService().run_forever()
@@ -0,0 +1,220 @@
+"""
+Intraday bars with tiered storage.
+
+Base bars (INTRADAY_INTERVAL) are stored in intraday_bars keyed by
+(symbol, resolution, ts). Every coarser tier in INTRADAY_ROLLUPS is derived
+from the tier below it: when bars land, only the coarser buckets they fall in
+are recomputed, then the change cascades up (1m -> 5m -> 1h -> 1d).
+Retention prunes fine tiers past their horizon, and reads use the coarsest
+tier the symbol has bars in that divides the requested resolution, so bars
+ingested at another interval (main.py --intraday 15m) are still found.
+
+Timestamps are stored as naive UTC; bucket boundaries are UTC-aligned.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from config import (
+    INTRADAY_INTERVAL, INTRADAY_ROLLUPS, INTRADAY_RETENTION, INTRADAY_PERIOD, FETCH_CONCURRENCY
+)
+from logger_config import logger
+from fetch_scheduler import fetch_with_fallback
+from db_manager import INTRADAY_COLUMNS
+
+RESOLUTIONS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "1d": 86400}
+
+
+def parse_resolution(text):
+    """Resolution name (e.g. "5m") to seconds."""
+    if text not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{text}'. Available: {', '.join(RESOLUTIONS)}")
+    return RESOLUTIONS[text]
+
+def resolution_name(seconds):
+    return next(name for name, value in RESOLUTIONS.items() if value == seconds)
+
+def tiers(base=None, rollups=None):
+    """
+    Stored resolutions in seconds, finest first. Each tier must be a multiple
+    of the one below it so buckets nest exactly.
+    """
+    base = parse_resolution(base or INTRADAY_INTERVAL)
+    rollups = INTRADAY_ROLLUPS if rollups is None else rollups
+    chain = [base]
+    for name in filter(None, (part.strip() for part in rollups.split(","))):
+        seconds = parse_resolution(name)
+        if seconds <= chain[-1]:
+            continue
+        if seconds % chain[-1]:
+            raise ValueError(f"Rollup {name} is not a multiple of {resolution_name(chain[-1])}")
+        chain.append(seconds)
+    return chain
+
+def retention(text=None):
+    """{resolution seconds: days to keep} from "1m:7,5m:60"."""
+    text = INTRADAY_RETENTION if text is None else text
+    policy = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, days = item.split(":")
+        policy[parse_resolution(name)] = float(days)
+    return policy
+
+def source_tier(requested, stored=None):
+    """Coarsest stored tier whose buckets nest in the requested resolution, or None."""
+    stored = tiers() if stored is None else stored
+    usable = [t for t in stored if t <= requested and requested % t == 0]
+    return max(usable) if usable else None
+
+
+def to_bars(df):
+    """Fetched price frame (date column, any timezone) to INTRADAY_COLUMNS base bars."""
+    bars = df.rename(columns={"date": "ts"}).copy()
+    ts = pd.to_datetime(bars["ts"])
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+    bars["ts"] = ts
+    bars["bar_count"] = 1
+    return bars.sort_values("ts", kind="stable")[INTRADAY_COLUMNS].reset_index(drop=True)
+
+def aggregate(bars, seconds):
+    """Roll bars up into buckets of `seconds`; partial buckets are included."""
+    if bars.empty:
+        return bars[INTRADAY_COLUMNS]
+    bucket = bars["ts"].dt.floor(f"{seconds}s").rename("ts")
+    out = bars.groupby(bucket, sort=True).agg(
+        open_price=("open_price", "first"),
+        high_price=("high_price", "max"),
+        low_price=("low_price", "min"),
+        close_price=("close_price", "last"),
+        volume=("volume", "sum"),
+        bar_count=("bar_count", "sum"),
+    )
+    return out.reset_index()[INTRADAY_COLUMNS]
+
+
+def roll_up(db, symbol, landed, stored=None):
+    """
+    Recompute the coarser buckets touched by newly written bars, tier by tier.
+
+    Each bucket is rebuilt from all of its stored finer bars, so revised and
+    late bars give the same result as a full recompute.
+
+    Args:
+        landed (DataFrame): Bars just written at the finest stored tier.
+
+    Returns:
+        {resolution seconds: buckets written}
+    """
+    stored = tiers() if stored is None else stored
+    written = {}
+    for fine, coarse in zip(stored, stored[1:]):
+        if landed.empty:
+            break
+        buckets = landed["ts"].dt.floor(f"{coarse}s").unique()
+        lo, hi = buckets.min().to_pydatetime(), (buckets.max() + timedelta(seconds=coarse)).to_pydatetime()
+        source = db.fetch_intraday_bars(symbol, fine, lo, hi)
+        source = source[source["ts"].dt.floor(f"{coarse}s").isin(buckets)]
+        landed = aggregate(source, coarse)
+        written[coarse] = db.upsert_intraday_bars(symbol, coarse, landed)
+    return written
+
+def prune(db, symbols, policy=None, now=None):
+    """Apply retention to every tier with a horizon; returns rows deleted."""
+    policy = retention() if policy is None else policy
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    deleted = 0
+    for resolution, days in policy.items():
+        before = now - timedelta(days=days)
+        for symbol in symbols:
+            deleted += db.prune_intraday_bars(symbol, resolution, before) or 0
+    return deleted
+
+
+def read_bars(db, symbol, resolution, start=None, end=None, limit=None):
+    """
+    Bars at `resolution` seconds for start <= ts < end, read from the coarsest
+    tier stored for the symbol that can produce them and aggregated on the fly
+    if needed. A symbol with no bars yet is resolved against the configured
+    tiers.
+
+    Returns:
+        (bars DataFrame, source tier seconds)
+
+    Raises:
+        ValueError: No stored tier divides `resolution`.
+    """
+    source = source_tier(resolution, db.get_intraday_resolutions(symbol) or tiers())
+    if source is None:
+        raise ValueError(f"{resolution_name(resolution)} bars can't be built from the stored tiers")
+    if start is not None and source != resolution:
+        start = pd.Timestamp(start).floor(f"{resolution}s").to_pydatetime()
+    # Enough source bars for `limit` output buckets
+    source_limit = None if limit is None else limit * (resolution // source)
+    bars = db.fetch_intraday_bars(symbol, source, start, end, source_limit)
+    if source != resolution:
+        bars = aggregate(bars, resolution)
+        if limit is not None and source_limit is not None and len(bars) > limit:
+            bars = bars.iloc[:limit]
+    return bars, source
+
+
+class IntradayIngest:
+    """
+    Fetch base-interval bars for a watchlist, upsert them and roll them up.
+
+    Each symbol is fetched from its last stored base bar (re-fetching that bar,
+    which may still have been forming), or INTRADAY_PERIOD when it has none.
+    """
+
+    def __init__(self, db, fetch=None, interval=None, fetch_workers=None):
+        self.db = db
+        self.fetch = fetch or fetch_with_fallback
+        self.interval = interval or INTRADAY_INTERVAL
+        self.stored = tiers(self.interval)
+        self.fetch_workers = fetch_workers or FETCH_CONCURRENCY
+
+    def _fetch(self, symbol, last_ts):
+        start = None if last_ts is None else last_ts.date()
+        df = self.fetch(symbol, period=INTRADAY_PERIOD, interval=self.interval, start=start)
+        if df is None or df.empty:
+            return None
+        bars = to_bars(df)
+        if last_ts is not None:
+            bars = bars[bars["ts"] >= pd.Timestamp(last_ts)]
+        return bars
+
+    def run(self, symbols):
+        """
+        Returns:
+            {"written": base bars written, "rollups": {resolution name: buckets}, "pruned": rows deleted}
+        """
+        base = self.stored[0]
+        last = self.db.get_last_intraday_ts(symbols, base)
+        summary = {"written": 0, "rollups": {}, "pruned": 0}
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as pool:
+            futures = {symbol: pool.submit(self._fetch, symbol, last.get(symbol)) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    bars = future.result()
+                except Exception as e:
+                    logger.error(f"Intraday fetch failed for {symbol}: {e}")
+                    continue
+                if bars is None or bars.empty:
+                    continue
+                written = self.db.upsert_intraday_bars(symbol, base, bars)
+                if not written:
+                    continue
+                summary["written"] += written
+                for resolution, count in roll_up(self.db, symbol, bars, self.stored).items():
+                    name = resolution_name(resolution)
+                    summary["rollups"][name] = summary["rollups"].get(name, 0) + count
+
+        summary["pruned"] = prune(self.db, symbols, {r: d for r, d in retention().items() if r in self.stored})
+        logger.info(
+            f"Intraday {self.interval}: {summary['written']} bars written, "
+            f"rollups {summary['rollups']}, {summary['pruned']} rows pruned"
+        )
+        return summary
@@ -6,8 +6,9 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.dirname(BASE_DIR)  
 
 LOG_FOLDER = os.path.join(PROJECT_DIR, "logs")
-os.makedirs(LOG_FOLDER, exist_ok=True)
-LOG_FILE = os.path.join(LOG_FOLDER, "app.log")
+# LOG_FILE redirects the log, e.g. for test and benchmark runs
+LOG_FILE = os.getenv("LOG_FILE") or os.path.join(LOG_FOLDER, "app.log")
+os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
 
 
 logging.basicConfig(
@@ -1,21 +1,78 @@
+import time
+
+# Taken before any other import so --profile-startup includes them
+_PROCESS_STARTED = time.perf_counter()
+
 import os
 import sys
+import argparse
+from contextlib import contextmanager
+from config import INCREMENTAL_FETCH, BACKFILL_PERIOD, INTRADAY_INTERVAL, COLUMNAR_STORE_DIR
 from logger_config import logger
-from api_fetcher import fetch_stock_data
-from indicator_calculator import add_indicators
-from db_manager import DBManager
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from setup.setup_db import createDB
 
-def main():
+
+class StartupProfile:
+    """Wall time per startup phase, logged by --profile-startup."""
+
+    def __init__(self):
+        self.phases = [("base imports", time.perf_counter() - _PROCESS_STARTED)]
+
+    @contextmanager
+    def phase(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - began))
+
+    def report(self):
+        for name, seconds in self.phases:
+            logger.info(f"startup {name:<24} {seconds * 1000:8.1f} ms")
+        logger.info(f"startup {'total':<24} {(time.perf_counter() - _PROCESS_STARTED) * 1000:8.1f} ms")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch, compute and store data for the active watchlist.")
+    parser.add_argument("--full-backfill", action="store_true",
+                        help="Ignore stored history and re-fetch the full backfill period for every symbol")
+    parser.add_argument("--period", default=BACKFILL_PERIOD,
+                        help=f"Backfill period for new symbols or --full-backfill (default: {BACKFILL_PERIOD})")
+    parser.add_argument("--intraday", nargs="?", const=INTRADAY_INTERVAL, metavar="INTERVAL",
+                        help=f"Ingest intraday bars (default interval: {INTRADAY_INTERVAL}) with rollups and retention")
+    parser.add_argument("--from-store", action="store_true",
+                        help="Read bars from the local columnar store instead of the network (e.g. to recompute indicators)")
+    parser.add_argument("--setup-db", action="store_true",
+                        help="Run schema setup even if the schema marker is current")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Log import and init time per startup phase, then exit without ingesting")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    profile = StartupProfile()
+    args = parse_args(argv)
     logger.info("Starting Stock Tracker Application")
-    createDB()
 
-    db = DBManager()
+    with profile.phase("import db_manager"):
+        from db_manager import DBManager
+        from setup.setup_db import ensure_schema
+    with profile.phase("schema check"):
+        ensure_schema(force=args.setup_db)
+    with profile.phase("connect"):
+        db = DBManager()
+    with profile.phase("read watchlist"):
+        active_watchlist = db.get_active_watchlist()
+
+    # Fetching and indicator code pulls in pandas and yfinance; skip both when
+    # there is nothing to ingest
+    if args.profile_startup:
+        with profile.phase("import pipeline"):
+            from ingest_pipeline import IngestPipeline
+            import yfinance  # noqa: F401 - imported lazily by the fetcher
+        db.close()
+        profile.report()
+        return
 
-    # Fetch only active symbols from watchlist
-    active_watchlist = db.get_active_watchlist()
     if not active_watchlist:
         logger.info("No active symbols in watchlist. Exiting.")
         db.close()
@@ -23,21 +80,44 @@ def main():
 
     logger.info(f"Active watchlist: {active_watchlist}")
 
-    for ticker in active_watchlist:
-        logger.info(f"Processing {ticker}")
+    from read_cache import bump_data_version
+    import metrics
 
-        try:
-            df = fetch_stock_data(ticker)
-            if df.empty:
-                logger.warning(f"No data fetched for {ticker}")
-                continue
+    if args.intraday:
+        from intraday import IntradayIngest
+        summary = IntradayIngest(db, interval=args.intraday).run(active_watchlist)
+        if summary["written"]:
+            bump_data_version()
+        metrics.record_run(summary)
+        metrics.export()
+        db.close()
+        logger.info("Stock Tracker Application finished")
+        return
+
+    from ingest_pipeline import IngestPipeline
+
+    last_dates = None
+    if INCREMENTAL_FETCH and not args.full_backfill:
+        last_dates = db.get_last_dates(active_watchlist)
+        logger.info(f"Incremental fetch: {len(last_dates)} of {len(active_watchlist)} symbols have stored history")
 
-            df = add_indicators(df)
-            db.insert_stock_data(df, ticker)
-            logger.info(f"Data processed and inserted/updated for {ticker}")
+    pipeline_args = {}
+    if COLUMNAR_STORE_DIR or args.from_store:
+        from columnar_store import ColumnarStore
+        store = ColumnarStore()
+        # Bars read from the store are not appended back to it
+        pipeline_args = {"fetch": store.fetch} if args.from_store else {"store": store}
 
-        except Exception as e:
-            logger.error(f"Failed to process {ticker}: {e}")
+    pipeline = IngestPipeline(db, **pipeline_args)
+    summary = pipeline.run(active_watchlist, last_dates=last_dates, period=args.period)
+    if summary["written"]:
+        bump_data_version()
+    if pipeline.publish:
+        # Deliver the last stream update before the process exits
+        pipeline.publish.close()
+    # Run-level and per-stage metrics for /metrics and the Pushgateway
+    metrics.record_run(summary)
+    metrics.export()
 
     db.close()
     logger.info("Stock Tracker Application finished")
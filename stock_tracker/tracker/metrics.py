@@ -0,0 +1,325 @@
+"""
+Prometheus-style metrics and optional tracing for ingest and the API.
+
+Counters, gauges and histograms live in one process-wide REGISTRY and are
+rendered in the Prometheus text format by render(). Hot paths wrap their
+work in stage(), which times it into tracker_stage_seconds{stage} and, when
+the opentelemetry API is installed, opens a span with the same name so an
+OTel exporter configured by the host process sees every stage.
+
+The API serves its own registry at GET /metrics. The ingest process is
+short-lived, so main() (and the ingest service after every tick) calls
+export() to write its registry to METRICS_FILE, which the API appends to
+/metrics, and to PUT it to a Pushgateway at METRICS_PUSH_URL when set.
+
+Per-symbol labels are only used on counters; histograms are labelled by
+stage so a large watchlist doesn't multiply bucket series.
+"""
+import bisect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from config import METRICS_FILE, METRICS_PUSH_URL, METRICS_JOB
+from logger_config import logger
+
+try:
+    from opentelemetry import trace as _trace
+    _tracer = _trace.get_tracer("stock_tracker")
+except ImportError:
+    _tracer = None
+
+# Seconds; spans a cached read (sub-ms) up to a full backfill
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(state["counts"]), state["sum"], state["count"]) for key, state in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = _format_value(bound if bound == float("inf") else float(bound))
+                samples.append((f"{self.name}_bucket", _format_labels(self.labels, key, [("le", le)]), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labels, key), total))
+            samples.append((f"{self.name}_count", _format_labels(self.labels, key), count))
+        return samples
+
+
+class Registry:
+    """Named metrics plus collectors: callables returning {metric name: value} rendered as gauges."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, prefix, collect):
+        """Expose every numeric leaf of collect()'s (nested) dict as <prefix>_<path> gauges."""
+        self._collectors.append((prefix, collect))
+
+    def _collected(self):
+        lines = []
+        for prefix, collect in self._collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {e}")
+                continue
+            for name, value in sorted(_numeric_leaves(values, prefix).items()):
+                lines.append(f"# TYPE {name} gauge\n{name} {_format_value(value)}")
+        return lines
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        blocks = [metric.render() for metric in metrics if metric.samples()]
+        return "\n".join(blocks + self._collected()) + "\n"
+
+
+def _numeric_leaves(values, prefix):
+    leaves = {}
+    for key, value in values.items():
+        name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}")
+        if isinstance(value, dict):
+            leaves.update(_numeric_leaves(value, name))
+        elif isinstance(value, bool):
+            leaves[name] = int(value)
+        elif isinstance(value, (int, float)):
+            leaves[name] = value
+    return leaves
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("tracker_stage_seconds", "Time spent per pipeline stage call", ["stage"])
+STAGE_ERRORS = REGISTRY.counter("tracker_stage_errors_total", "Stage calls that raised", ["stage"])
+ROWS = REGISTRY.counter("tracker_rows_total", "Rows handled per stage and symbol", ["stage", "symbol"])
+DB_BATCHES = REGISTRY.counter("tracker_db_batches_total", "Bulk upsert batches by outcome", ["status"])
+DB_COMMIT_SECONDS = REGISTRY.histogram("tracker_db_commit_seconds", "Execute and commit time per upsert batch")
+HTTP_REQUESTS = REGISTRY.counter("tracker_http_requests_total", "API requests", ["route", "method", "status"])
+HTTP_SECONDS = REGISTRY.histogram("tracker_http_request_seconds", "API request latency", ["route", "method"])
+RUN_SECONDS = REGISTRY.gauge("tracker_run_seconds", "Duration of the last ingest run")
+RUN_SYMBOLS = REGISTRY.gauge("tracker_run_symbols", "Symbols per outcome in the last ingest run", ["outcome"])
+RUN_ROWS = REGISTRY.gauge("tracker_run_rows", "Rows inserted, updated and skipped by the last ingest run", ["kind"])
+RUN_TIMESTAMP = REGISTRY.gauge("tracker_run_timestamp_seconds", "Unix time the last ingest run finished")
+RUNS = REGISTRY.counter("tracker_runs_total", "Ingest runs finished by this process")
+
+
+@contextmanager
+def stage(name, **attributes):
+    """Time a block into tracker_stage_seconds{stage=name}; also a span when OpenTelemetry is installed."""
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    span = _tracer.start_as_current_span(name, attributes=attributes) if _tracer is not None else nullcontext()
+    began = time.perf_counter()
+    with span:
+        try:
+            yield
+        except BaseException:
+            STAGE_ERRORS.inc(stage=name)
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - began, stage=name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them to the start of the
+    response (so streaming routes aren't timed by how long clients listen),
+    labelled by route template rather than raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        began = time.perf_counter()
+        status = [500]
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                route = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_SECONDS.observe(time.perf_counter() - began, route=route, method=scope["method"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(route=route, method=scope["method"], status=status[0])
+
+
+def count_rows(stage_name, df, symbol=None):
+    """Add a frame's rows to tracker_rows_total, per symbol column value when there is one."""
+    if df is None or len(df) == 0:
+        return
+    if symbol is None and "symbol" in df.columns:
+        for name, rows in df["symbol"].value_counts(sort=False).items():
+            ROWS.inc(int(rows), stage=stage_name, symbol=name)
+    else:
+        ROWS.inc(len(df), stage=stage_name, symbol=symbol or "")
+
+
+def record_run(summary):
+    """Set the run-level gauges from an IngestPipeline / IntradayIngest summary."""
+    RUNS.inc()
+    RUN_TIMESTAMP.set(time.time())
+    if "seconds" in summary:
+        RUN_SECONDS.set(summary["seconds"])
+    for outcome, symbols in summary.items():
+        if isinstance(symbols, list):
+            RUN_SYMBOLS.set(len(symbols), outcome=outcome)
+    for kind, rows in (summary.get("rows") or {}).items():
+        RUN_ROWS.set(rows, kind=kind)
+
+
+def export(path=None, push_url=None):
+    """
+    Write the registry to METRICS_FILE (textfile-collector format) and PUT it
+    to the Pushgateway at METRICS_PUSH_URL; either is skipped when unset.
+    """
+    path = METRICS_FILE if path is None else path
+    push_url = METRICS_PUSH_URL if push_url is None else push_url
+    body = REGISTRY.render()
+    if path:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.error(f"Could not write metrics to {path}: {e}")
+    if push_url:
+        try:
+            import requests
+            url = f"{push_url.rstrip('/')}/metrics/job/{METRICS_JOB}"
+            requests.put(url, data=body.encode(), timeout=5,
+                         headers={"Content-Type": "text/plain; version=0.0.4"}).raise_for_status()
+        except Exception as e:
+            logger.error(f"Could not push metrics to {push_url}: {e}")
+
+
+def read_exported(path=None):
+    """The metrics last written by export(), or "" if there are none."""
+    try:
+        with open(METRICS_FILE if path is None else path) as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def merge(text, extra):
+    """
+    Append the metric families of `extra` to `text`, except those `text`
+    already has; a scrape must not declare one family twice.
+    """
+    kept = []
+    for block in extra.split("# HELP ")[1:]:
+        family = block.split(" ", 1)[0]
+        if f"# TYPE {family} " not in text:
+            kept.append("# HELP " + block)
+    return text + "".join(kept)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import API_CACHE_MAX_ENTRIES, API_CACHE_TTL, DATA_VERSION_FILE
+from logger_config import logger
+
+
+def bump_data_version():
+    """
+    Mark stored data as changed. Called by the ingest process at the end of a
+    run; every API process notices the new version and drops its cached reads.
+    """
+    os.makedirs(os.path.dirname(DATA_VERSION_FILE), exist_ok=True)
+    with open(DATA_VERSION_FILE, "w") as f:
+        f.write(str(time.time_ns()))
+    logger.info("Data version bumped")
+
+
+def current_data_version():
+    try:
+        return os.stat(DATA_VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+class CacheEntry:
+    __slots__ = ("body", "media_type", "headers", "etag", "expires")
+
+    def __init__(self, body, media_type, headers, ttl):
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.expires = time.monotonic() + ttl
+
+
+class ReadCache:
+    """
+    In-process TTL + LRU cache of serialized API responses.
+
+    Keys are tuples whose first element is a namespace ("watchlist", "stocks")
+    so mutations can invalidate just what they touch. The whole cache is
+    dropped when the ingest data version changes.
+
+    Every invalidation bumps a generation counter. A caller takes
+    generation() before loading and hands it to put(), which drops the
+    result if an invalidation happened meanwhile: the load may have read
+    data from before the mutation.
+    """
+
+    def __init__(self, max_entries=None, ttl=None, version=current_data_version):
+        self.max_entries = max_entries or API_CACHE_MAX_ENTRIES
+        self.ttl = API_CACHE_TTL if ttl is None else ttl
+        self._version = version
+        self._seen_version = version()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+                      "invalidations": 0, "not_modified": 0, "stale_loads": 0}
+
+    def _check_version(self):
+        version = self._version()
+        if version != self._seen_version:
+            self._seen_version = version
+            self._generation += 1
+            self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires < time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def generation(self):
+        with self._lock:
+            self._check_version()
+            return self._generation
+
+    def put(self, key, body, media_type, headers=None, generation=None):
+        """
+        Cache a response and return its entry. With `generation` (from
+        generation() before the load), nothing is stored if the cache was
+        invalidated since; the returned entry is still usable for this response.
+        """
+        entry = CacheEntry(body, media_type, headers or {}, self.ttl)
+        with self._lock:
+            self._check_version()
+            if generation is not None and generation != self._generation:
+                self.stats["stale_loads"] += 1
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, *namespaces):
+        """Drop entries in the given namespaces, or everything when none are given."""
+        with self._lock:
+            self._generation += 1
+            if not namespaces:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [k for k in self._entries if k[0] in namespaces]
+                for k in keys:
+                    del self._entries[k]
+                dropped = len(keys)
+            self.stats["invalidations"] += dropped
+
+    def record_not_modified(self):
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
@@ -0,0 +1,155 @@
+"""
+In-process pub/sub fan-out of bar updates for the /stream endpoint.
+
+The ingest process publishes each batch of written bars once (see
+stream_publisher.py); StreamBroker hands every update to the subscribers
+whose symbol filter matches. Each subscriber holds at most one pending
+update per symbol: a consumer that falls behind gets the latest bar for a
+symbol instead of a growing backlog, so publishing never waits on clients
+and memory per client is bounded by the symbols it follows.
+"""
+import asyncio
+import json
+import threading
+
+from config import STREAM_MAX_SUBSCRIBERS
+from logger_config import logger
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    """
+    One client's view of the stream.
+
+    Args:
+        symbols (set): Symbols to receive; None for every symbol.
+        fields (list): Bar fields to send besides symbol and date; None for all.
+    """
+
+    def __init__(self, broker, symbols=None, fields=None):
+        self.broker = broker
+        self.symbols = symbols
+        self.fields = fields
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.coalesced = 0
+
+    def wants(self, symbol):
+        return self.symbols is None or symbol in self.symbols
+
+    def offer(self, bar):
+        """Queue a bar, replacing any undelivered one for the same symbol. Thread-safe."""
+        if self.fields is not None:
+            bar = {key: value for key, value in bar.items() if key in ("symbol", "date") or key in self.fields}
+        with self._lock:
+            if bar["symbol"] in self._pending:
+                self.coalesced += 1
+            self._pending[bar["symbol"]] = bar
+        self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def next(self, timeout=None):
+        """
+        Wait for pending bars and take them all.
+
+        Returns:
+            List of bars, empty if `timeout` seconds passed first.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        with self._lock:
+            self._ready.clear()
+            bars, self._pending = list(self._pending.values()), {}
+        self.delivered += len(bars)
+        return bars
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class StreamBroker:
+    """Fan-out of bar updates to Subscriptions, keeping the latest bar per symbol."""
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers or STREAM_MAX_SUBSCRIBERS
+        self._subscriptions = set()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self.stats = {"published": 0, "offered": 0, "delivered": 0, "coalesced": 0,
+                      "subscribed": 0, "rejected": 0}
+
+    def subscribe(self, symbols=None, fields=None, replay=True):
+        """
+        Register a subscriber; must be called from the event loop that will read it.
+
+        Args:
+            replay (bool): Start with the latest known bar of every matching symbol.
+        """
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                self.stats["rejected"] += 1
+                raise TooManySubscribers(f"Stream is at its limit of {self.max_subscribers} subscribers")
+            subscription = Subscription(self, symbols, fields)
+            self._subscriptions.add(subscription)
+            self.stats["subscribed"] += 1
+            latest = [bar for symbol, bar in self._latest.items() if subscription.wants(symbol)] if replay else []
+        for bar in latest:
+            subscription.offer(bar)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.discard(subscription)
+                self.stats["delivered"] += subscription.delivered
+                self.stats["coalesced"] += subscription.coalesced
+
+    def publish(self, bars):
+        """
+        Fan out bars ({"symbol", "date", ...} dicts) to matching subscribers.
+        Safe to call from any thread; never blocks on subscribers.
+        """
+        with self._lock:
+            for bar in bars:
+                self._latest[bar["symbol"]] = bar
+            subscriptions = list(self._subscriptions)
+            self.stats["published"] += len(bars)
+        offered = 0
+        for subscription in subscriptions:
+            for bar in bars:
+                if subscription.wants(bar["symbol"]):
+                    try:
+                        subscription.offer(bar)
+                        offered += 1
+                    except RuntimeError as e:
+                        # The subscriber's event loop is gone
+                        logger.warning(f"Dropping stream subscriber: {e}")
+                        self.unsubscribe(subscription)
+                        break
+        with self._lock:
+            self.stats["offered"] += offered
+        return offered
+
+    def metrics(self):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            stats = dict(self.stats)
+        return dict(
+            stats,
+            subscribers=len(subscriptions),
+            symbols=len(self._latest),
+            delivered=stats["delivered"] + sum(s.delivered for s in subscriptions),
+            coalesced=stats["coalesced"] + sum(s.coalesced for s in subscriptions),
+        )
+
+
+def sse_event(bars):
+    """Server-Sent Events frame carrying one batch of bars."""
+    return f"event: bars\ndata: {json.dumps(bars, default=str)}\n\n"
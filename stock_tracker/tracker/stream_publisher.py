@@ -0,0 +1,118 @@
+"""
+Ingest-side half of the /stream endpoint.
+
+StreamPublisher turns each batch of written frames into the latest bar per
+symbol and POSTs it to the API's /stream/publish, which fans it out to every
+subscriber. Posting happens on a background thread behind a one-slot
+mailbox that merges unsent batches, so a slow or stopped API never holds up
+the ingest writer.
+"""
+import threading
+
+from config import STREAM_PUBLISH_URL, STREAM_PUBLISH_TOKEN, HTTP_TIMEOUT
+from logger_config import logger
+
+
+def latest_bars(frames):
+    """{symbol: df} -> one JSON-ready dict per symbol for its newest bar."""
+    import pandas as pd
+    bars = []
+    for symbol, df in frames.items():
+        if df is None or df.empty:
+            continue
+        bar = {"symbol": symbol}
+        for key, value in df.iloc[-1].items():
+            if key == "date":
+                value = pd.Timestamp(value).date().isoformat()
+            elif pd.isna(value):
+                value = None
+            elif hasattr(value, "item"):
+                value = value.item()
+            bar[key] = value
+        bars.append(bar)
+    return bars
+
+
+class StreamPublisher:
+    """
+    Args:
+        url (str): The API's /stream/publish endpoint; defaults to STREAM_PUBLISH_URL.
+        send (callable): send(bars) override, e.g. StreamBroker.publish when the
+            broker lives in the same process.
+    """
+
+    def __init__(self, url=None, send=None, timeout=None):
+        self.url = url or STREAM_PUBLISH_URL
+        self._send = send or self._post
+        self.timeout = timeout or min(HTTP_TIMEOUT, 2)
+        self._mailbox = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._failing = False
+        self.stats = {"batches": 0, "bars": 0, "merged": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="stream-publisher", daemon=True)
+        self._thread.start()
+
+    def __call__(self, frames):
+        """Queue the newest bar of each written frame; returns immediately."""
+        bars = latest_bars(frames)
+        if not bars:
+            return
+        with self._cond:
+            for bar in bars:
+                if bar["symbol"] in self._mailbox:
+                    self.stats["merged"] += 1
+                self._mailbox[bar["symbol"]] = bar
+            self._cond.notify()
+
+    def _post(self, bars):
+        from api_fetcher import http_session
+        response = http_session().post(self.url, json={"bars": bars},
+                                       headers={"X-Publish-Token": STREAM_PUBLISH_TOKEN}, timeout=self.timeout)
+        response.raise_for_status()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._mailbox and not self._closed:
+                    self._cond.wait()
+                if not self._mailbox:
+                    return
+                bars, self._mailbox = list(self._mailbox.values()), {}
+            try:
+                self._send(bars)
+                self.stats["batches"] += 1
+                self.stats["bars"] += len(bars)
+                if self._failing:
+                    logger.info("Stream publishing recovered")
+                    self._failing = False
+            except Exception as e:
+                self.stats["errors"] += 1
+                # Log once per outage; the API may simply not be running
+                if not self._failing:
+                    logger.warning(f"Stream publish to {self.url} failed: {e}")
+                    self._failing = True
+
+    def close(self, timeout=None):
+        """Flush what is queued and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(self.timeout if timeout is None else timeout)
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def default_publisher():
+    """Process-wide publisher, or None unless STREAM_PUBLISH_URL and STREAM_PUBLISH_TOKEN are set."""
+    global _publisher
+    if not STREAM_PUBLISH_URL:
+        return None
+    if not STREAM_PUBLISH_TOKEN:
+        logger.warning("STREAM_PUBLISH_URL is set but STREAM_PUBLISH_TOKEN is empty; stream publishing is disabled")
+        return None
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = StreamPublisher()
+        return _publisher
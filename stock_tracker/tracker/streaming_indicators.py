@@ -0,0 +1,294 @@
+import json
+import math
+from collections import deque
+
+import pandas as pd
+from config import SMA_WINDOW, RSI_PERIOD
+from logger_config import logger
+
+NAN = float("nan")
+
+
+class RollingMean:
+    """
+    O(1)-per-value rolling mean.
+
+    Mirrors pandas' rolling().mean() kernel step for step (compensated add and
+    remove sums, sign and repeated-value corrections), so replaying a series
+    yields bit-identical results to calculate_sma/calculate_rsi.
+    """
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_count = 0
+        self.prev_value = NAN
+        self._undo = None
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def update(self, value):
+        value = float(value)
+        self._undo = (self.nobs, self.neg_ct, self.sum_x, self.compensation_add,
+                      self.compensation_remove, self.same_count, self.prev_value, None)
+        if len(self.values) == self.window:
+            removed = self.values.popleft()
+            self._undo = self._undo[:-1] + (removed,)
+            self._remove(removed)
+        self.values.append(value)
+        self._add(value)
+        return self.value
+
+    def undo(self):
+        """Revert the most recent update() (one level only)."""
+        (self.nobs, self.neg_ct, self.sum_x, self.compensation_add,
+         self.compensation_remove, self.same_count, self.prev_value, removed) = self._undo
+        self.values.pop()
+        if removed is not None:
+            self.values.appendleft(removed)
+        self._undo = None
+
+    @property
+    def value(self):
+        if self.nobs < self.min_periods or self.nobs == 0:
+            return NAN
+        result = self.sum_x / self.nobs
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    def to_dict(self):
+        state = dict(self.__dict__)
+        state["values"] = list(self.values)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state["window"], state["min_periods"])
+        obj.__dict__.update(state)
+        obj.values = deque(state["values"])
+        obj._undo = tuple(state["_undo"]) if state.get("_undo") is not None else None
+        return obj
+
+
+class SymbolIndicatorState:
+    """Running SMA and RSI state for one symbol, matching add_indicators()."""
+
+    def __init__(self, sma_window=SMA_WINDOW, rsi_window=RSI_PERIOD):
+        self.sma = RollingMean(sma_window)
+        self.avg_gain = RollingMean(rsi_window, min_periods=1)
+        self.avg_loss = RollingMean(rsi_window, min_periods=1)
+        self.prev_close = NAN
+        self.last_date = None
+        self._undo = None
+
+    def update(self, close):
+        """Advance by one bar and return (sma, rsi) for it."""
+        close = float(close)
+        delta = close - self.prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        self._undo = (self.prev_close, self.last_date)
+        self.prev_close = close
+
+        sma = self.sma.update(close)
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+        return sma, _rsi(avg_gain, avg_loss)
+
+    def apply_bar(self, date, close):
+        """
+        Apply a bar keyed by date. Re-sending the latest date (a still-forming
+        candle) rolls back to the state before that bar and re-applies it;
+        older dates are ignored.
+
+        Returns:
+            (sma, rsi), or None when the bar is older than the state (or
+            revises a bar that can no longer be rolled back).
+        """
+        if self.last_date is not None and date < self.last_date:
+            return None
+        if self.last_date is not None and date == self.last_date:
+            if self._undo is None:
+                return None
+            self.prev_close, self.last_date = self._undo
+            for rolling in (self.sma, self.avg_gain, self.avg_loss):
+                rolling.undo()
+        result = self.update(close)
+        self.last_date = date
+        return result
+
+    def to_dict(self):
+        return {
+            "sma": self.sma.to_dict(),
+            "avg_gain": self.avg_gain.to_dict(),
+            "avg_loss": self.avg_loss.to_dict(),
+            "prev_close": self.prev_close,
+            "last_date": _iso(self.last_date),
+            "undo": [self._undo[0], _iso(self._undo[1])] if self._undo is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state["sma"]["window"], state["avg_gain"]["window"])
+        obj.sma = RollingMean.from_dict(state["sma"])
+        obj.avg_gain = RollingMean.from_dict(state["avg_gain"])
+        obj.avg_loss = RollingMean.from_dict(state["avg_loss"])
+        obj.prev_close = state["prev_close"]
+        obj.last_date = _date(state["last_date"])
+        if state.get("undo") is not None:
+            obj._undo = (state["undo"][0], _date(state["undo"][1]))
+        return obj
+
+
+def _iso(date):
+    return date.isoformat() if date is not None else None
+
+
+def _date(value):
+    return pd.Timestamp(value).date() if value else None
+
+
+def _rsi(avg_gain, avg_loss):
+    # Same IEEE semantics as the pandas expression in calculate_rsi
+    if avg_loss == 0:
+        if avg_gain == 0 or avg_gain != avg_gain:
+            return NAN
+        rs = math.copysign(math.inf, avg_loss)
+    else:
+        rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+class IndicatorEngine:
+    """
+    Per-symbol incremental SMA/RSI. State can be saved to and loaded from a
+    JSON file, or rebuilt by replaying closes from the stocks table.
+
+    IngestPipeline uses one (see for_specs) to advance symbols whose state is
+    in step with the stored bars instead of recomputing their windows.
+    """
+
+    # Columns apply() fills
+    columns = ["sma", "rsi"]
+
+    def __init__(self, sma_window=SMA_WINDOW, rsi_window=RSI_PERIOD):
+        self.sma_window = sma_window
+        self.rsi_window = rsi_window
+        self.states = {}
+
+    @classmethod
+    def for_specs(cls, specs):
+        """
+        An engine producing exactly the columns of `specs` (parsed INDICATORS),
+        or None when they include anything besides sma and rsi.
+        """
+        params = dict(specs)
+        if not params or set(params) - {"sma", "rsi"} or len(params) != len(specs):
+            return None
+        engine = cls(*params.get("sma", (SMA_WINDOW,)), *params.get("rsi", (RSI_PERIOD,)))
+        engine.columns = [name for name, _ in specs]
+        return engine
+
+    def state_for(self, symbol):
+        if symbol not in self.states:
+            self.states[symbol] = SymbolIndicatorState(self.sma_window, self.rsi_window)
+        return self.states[symbol]
+
+    def forget(self, symbol):
+        self.states.pop(symbol, None)
+
+    def in_step(self, symbol, last_date, df):
+        """
+        True when the state for `symbol` ends at `last_date` (the last stored
+        bar) and `df` starts at or before it, so no bar can be missing in
+        between and apply() can revise the stored one.
+        """
+        state = self.states.get(symbol)
+        if state is None or last_date is None or df.empty or state.last_date != last_date:
+            return False
+        return state._undo is not None and pd.Timestamp(df["date"].iloc[0]).date() <= last_date
+
+    def seed(self, symbol, df):
+        """Replace the state for `symbol` with a replay of df's closes."""
+        self.states[symbol] = SymbolIndicatorState(self.sma_window, self.rsi_window)
+        self.apply(df, symbol)
+
+    def apply(self, df, symbol):
+        """
+        Fill sma/rsi for the bars of df not yet seen for symbol (and the
+        latest seen bar if it was revised), in constant time per bar.
+        Bars older than the state are left as NaN and should not be written.
+        """
+        state = self.state_for(symbol)
+        sma, rsi = [], []
+        for date, close in zip(df["date"], df["close_price"]):
+            result = state.apply_bar(pd.Timestamp(date).date(), close)
+            sma.append(result[0] if result else NAN)
+            rsi.append(result[1] if result else NAN)
+        df = df.copy()
+        if "sma" in self.columns:
+            df["sma"] = sma
+        if "rsi" in self.columns:
+            df["rsi"] = rsi
+        return df
+
+    def rebuild(self, db, symbols):
+        """Replay the stored close history of each symbol into fresh state."""
+        for symbol in symbols:
+            history = db.fetch_stock_data(symbol)
+            self.states[symbol] = SymbolIndicatorState(self.sma_window, self.rsi_window)
+            if not history.empty:
+                self.apply(history, symbol)
+        logger.info(f"Rebuilt indicator state for {len(symbols)} symbols from stocks table")
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "sma_window": self.sma_window,
+                "rsi_window": self.rsi_window,
+                "states": {s: st.to_dict() for s, st in self.states.items()},
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        engine = cls(data["sma_window"], data["rsi_window"])
+        engine.states = {s: SymbolIndicatorState.from_dict(st) for s, st in data["states"].items()}
+        return engine
@@ -0,0 +1,131 @@
+"""
+Debounced, non-blocking delivery of ingest triggers.
+
+Watchlist mutations call TriggerDispatcher.request(), which only marks a
+trigger as pending and returns. A background thread waits until no new
+request has arrived for TRIGGER_DEBOUNCE seconds (or TRIGGER_MAX_DELAY has
+passed since the first one), then delivers a single trigger: the resident
+ingest service if it answers, else the Java scheduler. Each target gets a
+timeout and a few retries with backoff, so a slow or stopped scheduler
+never holds up an API request.
+"""
+import threading
+import time
+
+from config import (
+    INGEST_TRIGGER_HOST, INGEST_TRIGGER_PORT, SCHEDULER_TRIGGER_URL,
+    TRIGGER_DEBOUNCE, TRIGGER_MAX_DELAY, TRIGGER_TIMEOUT, TRIGGER_RETRIES
+)
+from logger_config import logger
+
+
+class TriggerDispatcher:
+    """
+    Args:
+        targets (list): URLs tried in order until one accepts the trigger.
+        post (callable): post(url, timeout) raising on failure; injectable for tests.
+    """
+
+    def __init__(self, targets=None, debounce=None, max_delay=None, timeout=None, retries=None,
+                 post=None, sleep=time.sleep):
+        self.targets = targets or [f"http://{INGEST_TRIGGER_HOST}:{INGEST_TRIGGER_PORT}/trigger",
+                                   SCHEDULER_TRIGGER_URL]
+        self.debounce = TRIGGER_DEBOUNCE if debounce is None else debounce
+        self.max_delay = TRIGGER_MAX_DELAY if max_delay is None else max_delay
+        self.timeout = timeout or TRIGGER_TIMEOUT
+        self.retries = TRIGGER_RETRIES if retries is None else retries
+        self._post = post or self._http_post
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self._first = None
+        self._last = None
+        self._waiting = 0
+        self._closed = False
+        self._thread = None
+        self._latencies = []
+        self.stats = {"requested": 0, "coalesced": 0, "delivered": 0, "failed": 0,
+                      "attempts": 0, "last_target": None, "last_error": None}
+
+    def request(self, reason=None):
+        """Ask for an ingest run; returns immediately."""
+        with self._cond:
+            now = time.monotonic()
+            self.stats["requested"] += 1
+            if self._first is None:
+                self._first = now
+            else:
+                self.stats["coalesced"] += 1
+            self._last = now
+            self._waiting += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trigger-dispatcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        if reason:
+            logger.info(f"Ingest trigger requested: {reason}")
+
+    def _due_in(self, now):
+        return min(self._last + self.debounce, self._first + self.max_delay) - now
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and (self._first is None or self._due_in(time.monotonic()) > 0):
+                    self._cond.wait(None if self._first is None else self._due_in(time.monotonic()))
+                if self._first is None:
+                    return
+                first, mutations = self._first, self._waiting
+                self._first = self._last = None
+                self._waiting = 0
+            self._deliver(first, mutations)
+
+    @staticmethod
+    def _http_post(url, timeout):
+        import requests
+        requests.post(url, timeout=timeout).raise_for_status()
+
+    def _deliver(self, first, mutations):
+        error = None
+        for attempt in range(self.retries + 1):
+            for url in self.targets:
+                self.stats["attempts"] += 1
+                try:
+                    self._post(url, self.timeout)
+                except Exception as e:
+                    error = e
+                    continue
+                latency = time.monotonic() - first
+                with self._cond:
+                    self.stats["delivered"] += 1
+                    self.stats["last_target"] = url
+                    self._latencies = (self._latencies + [latency])[-1000:]
+                logger.info(f"Ingest trigger delivered to {url} for {mutations} mutations after {latency:.2f}s")
+                return
+            if attempt < self.retries:
+                self._sleep(min(2 ** attempt, 10) * 0.5)
+        with self._cond:
+            self.stats["failed"] += 1
+            self.stats["last_error"] = str(error)
+        logger.error(f"Failed to trigger ingest after {self.retries + 1} rounds: {error}")
+
+    def close(self, timeout=None):
+        """Deliver any pending trigger now and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(self.timeout * len(self.targets) if timeout is None else timeout)
+
+    def metrics(self):
+        """Counters plus latency from the first coalesced mutation to delivery."""
+        with self._cond:
+            samples = sorted(self._latencies)
+            stats = dict(self.stats, pending=self._waiting)
+        stats["latency_seconds"] = {
+            "count": len(samples),
+            "p50": samples[len(samples) // 2] if samples else 0.0,
+            "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0,
+            "max": samples[-1] if samples else 0.0,
+        }
+        return stats